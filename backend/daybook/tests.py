@@ -1,3 +1,47 @@
+import json
+
 from django.test import TestCase
 
-# Create your tests here.
+from ks_constructions import grid
+from sites import models as sites_models
+from users import models as users_models
+
+from . import models
+from . import views
+
+
+class EntryGridTests(TestCase):
+    def test_head_is_filtered_by_its_name(self):
+        site = sites_models.Site.objects.create(name="A", address="-")
+        user = users_models.CustomUser.objects.create_user(
+            "admin@example.com", role=users_models.Roles.ADMIN
+        )
+        for name in ("Cement", "Transport"):
+            models.Entry.objects.create(
+                description=name,
+                head=models.Head.objects.create(name=name, site=site),
+                site=site,
+                amount_cr=0,
+                amount_db=100,
+                created_by=user,
+            )
+
+        entries = views.ENTRY_GRID.apply(
+            models.Entry.objects.all(),
+            {
+                "filter": json.dumps(
+                    {
+                        "head": {
+                            "filterType": "text",
+                            "type": "contains",
+                            "filter": "cem",
+                        }
+                    }
+                )
+            },
+        )
+        self.assertEqual([entry.description for entry in entries], ["Cement"])
+
+    def test_text_column_on_a_relation_is_refused(self):
+        with self.assertRaises(ValueError):
+            grid.Grid({"head": grid.GridField("head", "text")}, model=models.Entry)
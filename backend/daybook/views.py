@@ -2,6 +2,7 @@ from django.db.models import Q
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets, generics
 
+from ks_constructions import grid
 from sites import models as sites_models
 
 from . import models as models
@@ -34,8 +35,23 @@ class HeadViewset(viewsets.ModelViewSet):
         instance.save()
 
 
-class EntryViewset(viewsets.ModelViewSet):
+ENTRY_GRID = grid.Grid(
+    {
+        "head": grid.GridField("head__name", "text"),
+        "description": grid.GridField("description", "text"),
+        "created_at": grid.GridField("created_at", "datetime"),
+        "reference": grid.GridField("reference", "text"),
+        "payment_type": grid.GridField("payment_type", "number"),
+        "amount_db": grid.GridField("amount_db", "number"),
+        "amount_cr": grid.GridField("amount_cr", "number"),
+    },
+    model=models.Entry,
+)
+
+
+class EntryViewset(grid.GridListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    grid = ENTRY_GRID
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -46,6 +62,9 @@ class EntryViewset(viewsets.ModelViewSet):
         site_id = self.kwargs.get("site_id")
         queryset = models.Entry.objects.filter(site=site_id).order_by("-created_at")
 
+        if self.action == "list":
+            queryset = queryset.select_related("created_by")
+
         return queryset
 
     def perform_create(self, serializer):
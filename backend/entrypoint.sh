@@ -14,5 +14,8 @@ python manage.py makemigrations
 echo "Applying database migrations..."
 python manage.py migrate
 
+echo "Creating cache table..."
+python manage.py createcachetable
+
 echo "Starting server..."
 exec "$@"
@@ -70,6 +70,7 @@ INSTALLED_APPS = [
     "rate_work",
     "labours",
     "daybook",
+    "notifications",
 ]
 
 
@@ -141,6 +142,9 @@ DATABASES = {
     }
 }
 
+# The covering indexes' INCLUDE columns only exist on PostgreSQL
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
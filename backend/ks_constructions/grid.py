@@ -0,0 +1,351 @@
+"""
+Server side filtering, sorting and paging for AG-Grid.
+
+A view declares the columns the grid may filter and sort on in a Grid,
+each with the ORM path it maps to and its filter kind. The grid's filter
+and sort models (the filter and sort query params, as JSON) are compiled
+into a Q and an ordering, anything outside the columns or the operators of
+their kind is rejected. Compiled plans are kept per grid, keyed by a hash
+of the models, so a grid scrolling with the same filters compiles once.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import CharField, Q, TextField
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+GridField = namedtuple("GridField", ["path", "kind"])
+
+# key is a hash of the filter and sort models, the same for the same models,
+# filter_key one of the filter model alone
+GridPlan = namedtuple("GridPlan", ["where", "ordering", "key", "filter_key"])
+
+KINDS = {"text", "number", "date", "datetime", "boolean"}
+
+TEXT_LOOKUPS = {
+    "equals": ("iexact", False),
+    "notEqual": ("iexact", True),
+    "contains": ("icontains", False),
+    "notContains": ("icontains", True),
+    "startsWith": ("istartswith", False),
+    "endsWith": ("iendswith", False),
+}
+
+# Numbers and dates
+COMPARISON_LOOKUPS = {
+    "equals": ("exact", False),
+    "notEqual": ("exact", True),
+    "lessThan": ("lt", False),
+    "lessThanOrEqual": ("lte", False),
+    "greaterThan": ("gt", False),
+    "greaterThanOrEqual": ("gte", False),
+}
+
+
+def _invalid(message):
+    return ValidationError({"filter": [message]})
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise _invalid(f"{value!r} is not a number.")
+    try:
+        return float(value)
+    except ValueError:
+        raise _invalid(f"{value!r} is not a number.")
+
+
+def _date(value):
+    # AG-Grid sends "YYYY-MM-DD hh:mm:ss"
+    try:
+        return datetime.fromisoformat(value).date()
+    except (TypeError, ValueError):
+        raise _invalid(f"{value!r} is not a date.")
+
+
+def _boolean(value):
+    if value in (True, "true", "True", 1, "1"):
+        return True
+    if value in (False, "false", "False", 0, "0"):
+        return False
+    raise _invalid(f"{value!r} is not true or false.")
+
+
+def _final_field(model, path):
+    """The model field a path like "vendor__name" ends in."""
+    field = None
+    for part in path.split("__"):
+        if field is not None:
+            if not field.is_relation:
+                raise ValueError(f"{path} goes through {field.name}, not a relation.")
+            model = field.related_model
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            raise ValueError(f"{model.__name__} has no field {part!r} ({path}).")
+    return field
+
+
+class Grid:
+    """
+    The columns of one grid and the plans compiled for it.
+
+    Given the model, text columns are checked to end in a text field, so a
+    path naming a relation fails when the grid is declared, not when a
+    text filter is first compiled into a lookup the relation doesn't have.
+    Other columns may name annotations.
+    """
+
+    def __init__(self, fields, model=None, cache_size=256):
+        for name, field in fields.items():
+            if field.kind not in KINDS:
+                raise ValueError(f"Unknown kind {field.kind!r} of {name}.")
+            if model is not None and field.kind == "text":
+                final = _final_field(model, field.path)
+                if not isinstance(final, (CharField, TextField)):
+                    raise ValueError(
+                        f"Text column {name} is {field.path}, which isn't text."
+                    )
+        self.fields = fields
+        self.cache_size = cache_size
+        self._plans = OrderedDict()
+
+    def plan(self, filter_model=None, sort_model=None):
+        """The compiled plan of the models, from the cache when it can."""
+        canonical = json.dumps([filter_model, sort_model], sort_keys=True)
+        key = hashlib.sha1(canonical.encode()).hexdigest()
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            return plan
+
+        canonical_filter = json.dumps(filter_model or {}, sort_keys=True)
+        plan = GridPlan(
+            self.compile_filter(filter_model or {}),
+            self.compile_sort(sort_model or []),
+            key,
+            hashlib.sha1(canonical_filter.encode()).hexdigest(),
+        )
+        self._plans[key] = plan
+        if len(self._plans) > self.cache_size:
+            self._plans.popitem(last=False)
+        return plan
+
+    def plan_from_params(self, params):
+        """The plan of the filter and sort query params."""
+        models = []
+        for name in ("filter", "sort"):
+            raw = params.get(name)
+            try:
+                models.append(json.loads(raw) if raw else None)
+            except ValueError:
+                raise ValidationError({name: ["Not valid JSON."]})
+        return self.plan(*models)
+
+    def apply(self, queryset, params):
+        """Filter and sort the queryset by the grid's query params."""
+        plan = self.plan_from_params(params)
+        queryset = queryset.filter(plan.where)
+        if plan.ordering:
+            queryset = queryset.order_by(*plan.ordering)
+        return queryset
+
+    def compile_filter(self, filter_model):
+        if not isinstance(filter_model, dict):
+            raise _invalid("The filter model must be an object.")
+
+        # The advanced filter is one tree of conditions naming their column
+        if filter_model.get("filterType") == "join":
+            return self._join(filter_model)
+
+        where = Q()
+        for column, model in filter_model.items():
+            where &= self._column(column, model)
+        return where
+
+    def compile_sort(self, sort_model):
+        if not isinstance(sort_model, list):
+            raise ValidationError({"sort": ["The sort model must be a list."]})
+
+        ordering = []
+        for item in sort_model:
+            if not isinstance(item, dict) or item.get("sort") not in ("asc", "desc"):
+                raise ValidationError({"sort": [f"Can't sort by {item!r}."]})
+            field = self._field(item.get("colId"), "sort")
+            prefix = "-" if item["sort"] == "desc" else ""
+            ordering.append(f"{prefix}{field.path}")
+        return ordering
+
+    def _field(self, column, param="filter"):
+        field = self.fields.get(column)
+        if field is None:
+            raise ValidationError({param: [f"Unknown column {column!r}."]})
+        return field
+
+    def _join(self, model):
+        operator = model.get("type")
+        if operator not in ("AND", "OR"):
+            raise _invalid(f"Unknown join {operator!r}.")
+
+        where = Q()
+        for condition in model.get("conditions") or []:
+            if not isinstance(condition, dict):
+                raise _invalid("A condition must be an object.")
+            if condition.get("filterType") == "join":
+                compiled = self._join(condition)
+            else:
+                compiled = self._condition(
+                    self._field(condition.get("colId")), condition
+                )
+            where = where & compiled if operator == "AND" else where | compiled
+        return where
+
+    def _column(self, column, model):
+        field = self._field(column)
+        if not isinstance(model, dict):
+            raise _invalid(f"The filter of {column} must be an object.")
+
+        # Several filters on one column, every one must match
+        if model.get("filterType") == "multi":
+            where = Q()
+            for part in model.get("filterModels") or []:
+                if part is not None:
+                    where &= self._column(column, part)
+            return where
+
+        # Two or more conditions joined with AND or OR
+        conditions = model.get("conditions")
+        if conditions is None and "condition1" in model:
+            conditions = [model["condition1"], model.get("condition2")]
+        if conditions is not None:
+            operator = model.get("operator", "AND")
+            if operator not in ("AND", "OR"):
+                raise _invalid(f"Unknown operator {operator!r}.")
+            where = Q()
+            for condition in conditions:
+                if condition is None:
+                    continue
+                if not isinstance(condition, dict):
+                    raise _invalid("A condition must be an object.")
+                compiled = self._condition(field, condition)
+                where = where & compiled if operator == "AND" else where | compiled
+            return where
+
+        return self._condition(field, model)
+
+    def _condition(self, field, model):
+        filter_type = model.get("filterType")
+        operator = model.get("type")
+
+        if filter_type == "set":
+            return self._set(field, model.get("values"))
+
+        if operator in ("blank", "notBlank"):
+            blank = Q(**{f"{field.path}__isnull": True})
+            if field.kind == "text":
+                blank |= Q(**{field.path: ""})
+            return blank if operator == "blank" else ~blank
+
+        if field.kind == "text" and filter_type == "text":
+            if operator not in TEXT_LOOKUPS:
+                raise _invalid(f"Unknown text filter {operator!r}.")
+            lookup, negate = TEXT_LOOKUPS[operator]
+            value = model.get("filter")
+            if not isinstance(value, str):
+                raise _invalid(f"{value!r} is not text.")
+            condition = Q(**{f"{field.path}__{lookup}": value})
+            return ~condition if negate else condition
+
+        if field.kind == "number" and filter_type == "number":
+            return self._comparison(
+                field.path,
+                operator,
+                model.get("filter"),
+                model.get("filterTo"),
+                _number,
+            )
+
+        if field.kind in ("date", "datetime") and filter_type == "date":
+            # Datetimes are compared by their date, like the grid shows them
+            path = f"{field.path}__date" if field.kind == "datetime" else field.path
+            return self._comparison(
+                path, operator, model.get("dateFrom"), model.get("dateTo"), _date
+            )
+
+        if field.kind == "boolean" and filter_type in ("boolean", "text"):
+            return Q(**{field.path: _boolean(model.get("filter"))})
+
+        raise _invalid(f"{filter_type!r} filters don't apply to this column.")
+
+    def _comparison(self, path, operator, value, value_to, convert):
+        if operator == "inRange":
+            return Q(**{f"{path}__range": (convert(value), convert(value_to))})
+        if operator not in COMPARISON_LOOKUPS:
+            raise _invalid(f"Unknown filter {operator!r}.")
+        lookup, negate = COMPARISON_LOOKUPS[operator]
+        condition = Q(**{f"{path}__{lookup}": convert(value)})
+        return ~condition if negate else condition
+
+    def _set(self, field, values):
+        if not isinstance(values, list):
+            raise _invalid("A set filter needs a list of values.")
+
+        convert = {
+            "number": _number,
+            "date": _date,
+            "datetime": _date,
+            "boolean": _boolean,
+        }.get(field.kind, str)
+        path = f"{field.path}__date" if field.kind == "datetime" else field.path
+        chosen = [convert(value) for value in values if value is not None]
+
+        where = Q(**{f"{path}__in": chosen})
+        if None in values:
+            where |= Q(**{f"{field.path}__isnull": True})
+        return where
+
+
+class GridListMixin:
+    """
+    List views paged by AG-Grid's server side row model.
+
+    The grid's filter and sort query params are applied to the list's
+    queryset. Given startRow (and endRow), or always with paged_by_default,
+    the list answers with that slice as rows and the count of all matching
+    rows as totalRows; otherwise the view lists as before.
+    """
+
+    grid = None
+    paged_by_default = False
+    # Most rows one request may ask for
+    max_rows = 1000
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.grid is None or getattr(self, "action", "list") != "list":
+            return queryset
+        return self.grid.apply(queryset, self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if "startRow" not in params and not self.paged_by_default:
+            return super().list(request, *args, **kwargs)
+
+        start_row, end_row = self.get_row_range(params)
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(queryset[start_row:end_row], many=True)
+        return Response({"rows": serializer.data, "totalRows": queryset.count()})
+
+    def get_row_range(self, params):
+        """startRow and endRow, at most max_rows apart."""
+        try:
+            start_row = max(int(params.get("startRow", 0)), 0)
+            end_row = int(params.get("endRow", start_row + 100))
+        except ValueError:
+            raise ValidationError({"startRow": ["Rows must be numbers."]})
+        return start_row, max(min(end_row, start_row + self.max_rows), start_row)
@@ -0,0 +1,137 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_after(ordering, position):
+    """Rows after position: (a, b) > (x, y) is a > x, or a = x and b > y."""
+    condition = Q(pk__in=[])
+    equal = Q()
+    for field, value in zip(ordering, position):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def row_position(row, ordering):
+    """The values of the ordering columns of a row, following relations."""
+    position = []
+    for field in ordering:
+        name = field.lstrip("-")
+        if isinstance(row, dict):
+            value = row[name]
+        else:
+            value = row
+            for part in name.split("__"):
+                value = getattr(value, part) if value is not None else None
+        position.append(value)
+    return position
+
+
+def encode_position(row, ordering):
+    # Dates, uuids and decimals come back as strings the lookups take
+    position = [str(value) for value in row_position(row, ordering)]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_position(encoded, length):
+    """The position in an encoded cursor, None if it isn't one of length."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(position, list) or len(position) != length:
+        return None
+    return position
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Cursor pagination that only starts once the client asks for it with
+    ?page_size= or follows a next/previous link. Without either the view
+    returns its plain list, as before pagination was added.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (
+            self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages that continue after the last row of the previous page, found by
+    comparing every ordering column, instead of skipping rows with OFFSET.
+    The ordering must end in a unique column. Next links only.
+
+    Rows may be model instances or dicts from values().
+    """
+
+    ordering = ("-pk",)
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def after(self, position):
+        return keyset_after(self.ordering, position)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        position = decode_position(encoded, len(self.ordering))
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, row):
+        return encode_position(row, self.ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
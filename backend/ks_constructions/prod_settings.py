@@ -80,6 +80,7 @@ INSTALLED_APPS = [
     "rate_work",
     "labours",
     "daybook",
+    "notifications",
 ]
 
 
@@ -154,6 +155,17 @@ DATABASES = {
     }
 }
 
+# Shared by the gunicorn workers, so a write in one drops what the others
+# cached (the order grids' totals)
+# https://docs.djangoproject.com/en/5.2/topics/cache/#database-caching
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
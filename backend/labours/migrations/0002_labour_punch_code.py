@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labours", "0001_initial"),
+        ("sites", "0003_alter_site_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="labour",
+            name="punch_code",
+            field=models.CharField(
+                blank=True,
+                help_text="Code the site's attendance terminal knows the labourer by.",
+                max_length=32,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="labour",
+            index=models.Index(
+                fields=["site", "punch_code"], name="labours_lab_site_id_a02829_idx"
+            ),
+        ),
+    ]
@@ -45,6 +45,16 @@ class Labour(models.Model):
         force_format="webp",
         blank=True,
     )
+    punch_code = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Code the site's attendance terminal knows the labourer by.",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["site", "punch_code"]),
+        ]
 
     def __str__(self):
         return f"{self.name} {self.site}"
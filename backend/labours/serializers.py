@@ -54,6 +54,7 @@ class LabourCreateUpdateSerializer(serializers.ModelSerializer):
             "ifsc_code",
             "branch_name",
             "photo",
+            "punch_code",
         ]
 
 
@@ -109,6 +110,7 @@ class LabourRetrieveSerializer(serializers.ModelSerializer):
             "ifsc_code",
             "branch_name",
             "photo",
+            "punch_code",
             "documents",
             "rate_work_payments",
             "rate_works",
@@ -6,6 +6,7 @@ from django_filters import rest_framework as filters
 from rest_framework import status, viewsets, generics
 from rest_framework.response import Response
 
+from ks_constructions import grid
 from sites import models as sites_models
 from rate_work import models as rate_work_models
 
@@ -13,8 +14,20 @@ from . import filters as labours_filters
 from . import serializers as serializers
 from . import models as models
 
+LABOUR_GRID = grid.Grid(
+    {
+        "name": grid.GridField("name", "text"),
+        "type": grid.GridField("type", "number"),
+        "gender": grid.GridField("gender", "number"),
+        "amount_paid": grid.GridField("amount_paid", "number"),
+        "rate_work_payment_total": grid.GridField("rate_work_payment_total", "number"),
+    },
+    model=models.Labour,
+)
 
-class LabourViewSet(viewsets.ModelViewSet):
+
+class LabourViewSet(grid.GridListMixin, viewsets.ModelViewSet):
+    grid = LABOUR_GRID
     filter_backends = [
         filters.DjangoFilterBackend,
     ]
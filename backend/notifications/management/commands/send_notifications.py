@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications import outbox
+from notifications.transports import TRANSPORTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the queued push notifications, polling the outbox until "
+        "stopped. --transport fake sends nothing, for local runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transport", choices=TRANSPORTS, default="firebase")
+        parser.add_argument(
+            "--interval", type=float, default=2, help="Seconds between polls."
+        )
+        parser.add_argument("--limit", type=int, default=100, help="Rows per poll.")
+        parser.add_argument(
+            "--once", action="store_true", help="Drain what is due and stop."
+        )
+
+    def handle(self, *args, **options):
+        transport = TRANSPORTS[options["transport"]]()
+        while True:
+            close_old_connections()
+            sent, devices = outbox.drain(transport, options["limit"])
+            if sent:
+                self.stdout.write(f"Sent {sent} notifications to {devices} devices")
+            if options["once"]:
+                return
+            # A full poll means more are due
+            if sent < options["limit"]:
+                time.sleep(options["interval"])
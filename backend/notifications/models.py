@@ -0,0 +1,42 @@
+import uuid
+
+from django.db import models
+from django.utils import timezone
+
+
+class NotificationStatus(models.IntegerChoices):
+    PENDING = 1, "Pending"
+    SENT = 2, "Sent"
+    FAILED = 3, "Failed"
+
+
+class Notification(models.Model):
+    """
+    A push notification waiting to be sent, written in the transaction of
+    the change it tells about and sent by the send_notifications worker.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=150)
+    body = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    # Sent to the active devices of users with these roles
+    roles = models.JSONField(default=list)
+    # The devices still to send to, filled in on the first attempt
+    tokens = models.JSONField(null=True, blank=True)
+
+    status = models.PositiveSmallIntegerField(
+        choices=NotificationStatus.choices, default=NotificationStatus.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,169 @@
+"""
+The notification outbox.
+
+Requests only add a row with enqueue, in their own transaction, so a
+notification goes out exactly when the change it tells about commits and
+FCM is never waited on. The send_notifications worker drains the due
+rows: each is claimed for a lease, so a second worker skips it and a
+crashed one gives it back, then sent to its devices as multicast batches.
+
+Devices FCM says are gone are deactivated, the way fcm_django does.
+Devices that failed for a passing reason (FCM unavailable, over quota)
+are kept on the row and tried again after an exponential back-off, until
+MAX_ATTEMPTS, when the row is marked failed. Any other error while sending
+a row is recorded on it and retried the same way, so one bad row can't
+stop the rows after it. The tokens still to send are saved after every
+batch, so a retry after such an error doesn't repeat the batches that
+went out before it.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from fcm_django.models import FCMDevice
+from firebase_admin import exceptions, messaging
+
+from . import models as models
+
+# FCM takes at most 500 tokens per multicast
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 6
+FIRST_RETRY = timedelta(seconds=30)
+LONGEST_RETRY = timedelta(hours=1)
+# Long enough for any batch to be sent
+LEASE = timedelta(minutes=5)
+
+# Worth trying again later, anything else won't get better
+PASSING_ERRORS = (
+    exceptions.UnavailableError,
+    exceptions.InternalError,
+    exceptions.ResourceExhaustedError,
+    exceptions.DeadlineExceededError,
+    exceptions.UnknownError,
+)
+
+
+def enqueue(title, body, roles, data=None):
+    """Queue a notification to the users with roles, one insert."""
+    return models.Notification.objects.create(
+        title=title, body=body, roles=list(roles), data=data or {}
+    )
+
+
+def retry_delay(attempts):
+    """The wait before the next attempt, doubling after each one."""
+    return min(FIRST_RETRY * 2 ** (attempts - 1), LONGEST_RETRY)
+
+
+def claim(limit, now=None):
+    """
+    Lease up to limit due notifications to this worker. A row whose last
+    attempt was the final one and never came back, its worker crashed, is
+    marked failed instead.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = list(
+            models.Notification.objects.select_for_update(skip_locked=True)
+            .filter(status=models.NotificationStatus.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:limit]
+        )
+        claimed = []
+        for notification in due:
+            if notification.attempts >= MAX_ATTEMPTS:
+                notification.status = models.NotificationStatus.FAILED
+                notification.last_error = "The last attempt never finished."
+                continue
+            notification.attempts += 1
+            notification.next_attempt_at = now + LEASE
+            claimed.append(notification)
+        models.Notification.objects.bulk_update(
+            due, ["attempts", "next_attempt_at", "status", "last_error"]
+        )
+    return claimed
+
+
+def deliver(notification, transport):
+    """
+    Send a claimed notification and record how it went. Returns how many
+    devices it reached.
+    """
+    tokens = notification.tokens
+    if tokens is None:
+        tokens = list(
+            FCMDevice.objects.filter(
+                active=True, user__role__in=notification.roles
+            ).values_list("registration_id", flat=True)
+        )
+
+    delivered = 0
+    retry = []
+    error = ""
+    for start in range(0, len(tokens), BATCH_SIZE):
+        batch = tokens[start : start + BATCH_SIZE]
+        message = messaging.MulticastMessage(
+            tokens=batch,
+            notification=messaging.Notification(
+                title=notification.title, body=notification.body
+            ),
+            data=notification.data,
+        )
+        try:
+            responses = transport.send(message)
+        except exceptions.FirebaseError as failure:
+            retry.extend(batch)
+            error = repr(failure)
+        else:
+            FCMDevice.objects.deactivate_devices_with_error_results(batch, responses)
+            for token, response in zip(batch, responses):
+                if response.success:
+                    delivered += 1
+                elif isinstance(response.exception, PASSING_ERRORS):
+                    retry.append(token)
+                    error = repr(response.exception)
+
+        remaining = tokens[start + BATCH_SIZE :]
+        if remaining:
+            _save_progress(notification, retry + remaining, error)
+
+    _record(notification, retry, error)
+    return delivered
+
+
+def _save_progress(notification, tokens, error):
+    """Save the tokens a claimed row has left, still leased to this worker."""
+    notification.tokens = tokens
+    notification.last_error = error
+    notification.save(update_fields=["tokens", "last_error"])
+
+
+def _record(notification, retry, error):
+    """Save how an attempt went: sent, failed for good, or due again."""
+    now = timezone.now()
+    notification.tokens = retry
+    notification.last_error = error
+    if retry == []:
+        notification.status = models.NotificationStatus.SENT
+        notification.sent_at = now
+    elif notification.attempts >= MAX_ATTEMPTS:
+        notification.status = models.NotificationStatus.FAILED
+    else:
+        notification.next_attempt_at = now + retry_delay(notification.attempts)
+    notification.save(
+        update_fields=["tokens", "last_error", "status", "sent_at", "next_attempt_at"]
+    )
+
+
+def drain(transport, limit=100):
+    """Send the due notifications, up to limit. Returns (sent, devices)."""
+    claimed = claim(limit)
+    devices = 0
+    for notification in claimed:
+        try:
+            devices += deliver(notification, transport)
+        except Exception as failure:
+            # The tokens left after the last batch that went out, the ones
+            # it had before the attempt if none did (None to look them up)
+            _record(notification, notification.tokens, repr(failure))
+    return len(claimed), devices
@@ -0,0 +1,153 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from fcm_django.models import FCMDevice
+
+from users import models as users_models
+
+from . import models
+from . import outbox
+from .transports import FakeTransport
+
+
+class BrokenTransport:
+    def send(self, message):
+        raise RuntimeError("Bad message.")
+
+
+class DrainTests(TestCase):
+    def setUp(self):
+        user = users_models.CustomUser.objects.create_user(
+            "admin@example.com", role=users_models.Roles.ADMIN
+        )
+        for token in ("good", "gone", "busy"):
+            FCMDevice.objects.create(
+                registration_id=token, user=user, type="android", active=True
+            )
+
+    def enqueue(self):
+        return outbox.enqueue("Order", "Created", [users_models.Roles.ADMIN])
+
+    def make_due(self, notification):
+        models.Notification.objects.filter(id=notification.id).update(
+            next_attempt_at=timezone.now()
+        )
+
+    def test_sent_once_to_every_device(self):
+        notification = self.enqueue()
+        transport = FakeTransport()
+        self.assertEqual(outbox.drain(transport), (1, 3))
+        self.assertEqual(outbox.drain(transport), (0, 0))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, models.NotificationStatus.SENT)
+        self.assertEqual(len(transport.sent), 1)
+
+    def test_gone_devices_are_deactivated(self):
+        notification = self.enqueue()
+        outbox.drain(FakeTransport(unregistered=["gone"]))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, models.NotificationStatus.SENT)
+        self.assertFalse(FCMDevice.objects.get(registration_id="gone").active)
+        self.assertTrue(FCMDevice.objects.get(registration_id="good").active)
+
+    def test_unavailable_devices_are_retried_with_back_off(self):
+        notification = self.enqueue()
+        transport = FakeTransport(unavailable=["busy"])
+        started = timezone.now()
+        self.assertEqual(outbox.drain(transport), (1, 2))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, models.NotificationStatus.PENDING)
+        self.assertEqual(notification.tokens, ["busy"])
+        self.assertIn("UnavailableError", notification.last_error)
+        self.assertGreaterEqual(
+            notification.next_attempt_at, started + outbox.FIRST_RETRY
+        )
+        # Not due yet
+        self.assertEqual(outbox.drain(transport), (0, 0))
+
+        for attempt in range(2, outbox.MAX_ATTEMPTS + 1):
+            self.make_due(notification)
+            outbox.drain(transport)
+            notification.refresh_from_db()
+            self.assertEqual(notification.attempts, attempt)
+            # Only the device that failed is tried again
+            self.assertEqual(transport.sent[-1].tokens, ["busy"])
+        self.assertEqual(notification.status, models.NotificationStatus.FAILED)
+
+    def test_an_error_is_recorded_and_the_other_rows_still_sent(self):
+        broken = self.enqueue()
+        self.make_due(broken)
+        models.Notification.objects.filter(id=broken.id).update(tokens=["bad"])
+        other = self.enqueue()
+
+        class Transport(FakeTransport):
+            def send(self, message):
+                if message.tokens == ["bad"]:
+                    return BrokenTransport().send(message)
+                return super().send(message)
+
+        self.assertEqual(outbox.drain(Transport()), (2, 3))
+
+        broken.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(broken.status, models.NotificationStatus.PENDING)
+        self.assertEqual(broken.tokens, ["bad"])
+        self.assertIn("Bad message.", broken.last_error)
+        self.assertEqual(other.status, models.NotificationStatus.SENT)
+
+    def test_errors_fail_the_row_after_the_last_attempt(self):
+        notification = self.enqueue()
+        for _ in range(outbox.MAX_ATTEMPTS):
+            self.make_due(notification)
+            outbox.drain(BrokenTransport())
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, models.NotificationStatus.FAILED)
+        self.assertEqual(notification.attempts, outbox.MAX_ATTEMPTS)
+
+    def test_a_last_attempt_that_never_finished_fails_the_row(self):
+        notification = self.enqueue()
+        models.Notification.objects.filter(id=notification.id).update(
+            attempts=outbox.MAX_ATTEMPTS,
+            next_attempt_at=timezone.now() - timedelta(minutes=1),
+        )
+        self.assertEqual(outbox.drain(FakeTransport()), (0, 0))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, models.NotificationStatus.FAILED)
+
+    def test_batches_sent_before_an_error_are_not_sent_again(self):
+        notification = self.enqueue()
+        models.Notification.objects.filter(id=notification.id).update(
+            tokens=["good", "busy", "gone"]
+        )
+
+        class Transport(FakeTransport):
+            def send(self, message):
+                if message.tokens == ["gone"]:
+                    return BrokenTransport().send(message)
+                return super().send(message)
+
+        with mock.patch.object(outbox, "BATCH_SIZE", 1):
+            outbox.drain(Transport(unavailable=["busy"]))
+
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, models.NotificationStatus.PENDING)
+            # good went out, busy is retried and gone raised
+            self.assertEqual(notification.tokens, ["busy", "gone"])
+            self.assertIn("Bad message.", notification.last_error)
+
+            self.make_due(notification)
+            transport = FakeTransport()
+            self.assertEqual(outbox.drain(transport), (1, 2))
+
+        self.assertEqual(
+            [message.tokens for message in transport.sent], [["busy"], ["gone"]]
+        )
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, models.NotificationStatus.SENT)
@@ -0,0 +1,43 @@
+"""
+How notifications leave the server.
+
+A transport sends one MulticastMessage and returns a SendResponse per
+token, in the order of the tokens, as firebase_admin does. Failing tokens
+get the response's exception; an error of the whole request is raised.
+"""
+
+from firebase_admin import exceptions, messaging
+
+
+class FirebaseTransport:
+    def send(self, message):
+        return messaging.send_each_for_multicast(message).responses
+
+
+class FakeTransport:
+    """
+    Sends nothing, keeps the messages in sent. Tokens in unregistered fail
+    as devices that are gone, tokens in unavailable as FCM being down.
+    """
+
+    def __init__(self, unregistered=(), unavailable=()):
+        self.sent = []
+        self.unregistered = set(unregistered)
+        self.unavailable = set(unavailable)
+
+    def send(self, message):
+        self.sent.append(message)
+        responses = []
+        for token in message.tokens:
+            if token in self.unregistered:
+                error = messaging.UnregisteredError("Requested entity was not found.")
+            elif token in self.unavailable:
+                error = exceptions.UnavailableError("The service is unavailable.")
+            else:
+                error = None
+            name = None if error else f"projects/fake/messages/{len(self.sent)}"
+            responses.append(messaging.SendResponse({"name": name}, error))
+        return responses
+
+
+TRANSPORTS = {"firebase": FirebaseTransport, "fake": FakeTransport}
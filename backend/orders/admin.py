@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Order, OrderImage
+from .models import Order, OrderImage, OrderNumberCounter
 
 
 @admin.register(Order)
@@ -11,3 +11,8 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderImage)
 class OrderImageAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OrderNumberCounter)
+class OrderNumberCounterAdmin(admin.ModelAdmin):
+    pass
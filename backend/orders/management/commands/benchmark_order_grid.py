@@ -0,0 +1,152 @@
+import json
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ks_constructions import pagination
+from orders import models
+from orders import paging
+from orders.views import ORDER_GRID
+from sites import models as sites_models
+from vendors import models as vendors_models
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Scroll a site's order grid to its last row page by page, keyset "
+        "pages against OFFSET pages, and show both query plans. The orders "
+        "are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=50000)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument(
+            "--sort",
+            default="[]",
+            help="The grid's sort model as JSON, the default order by default.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        size = options["page_size"]
+        site = sites_models.Site.objects.create(name="Benchmark", address="-")
+        vendor = vendors_models.Vendor.objects.create(name="Benchmark", address="-")
+        self.stdout.write(f"Creating {options['orders']} orders...")
+        models.Order.objects.bulk_create(
+            models.Order.assign_numbers(
+                [
+                    models.Order(
+                        name=f"Benchmark {i}",
+                        site=site,
+                        vendor=vendor,
+                        cost=i % 997,
+                        is_completed=i % 3 == 0,
+                    )
+                    for i in range(options["orders"])
+                ]
+            ),
+            batch_size=500,
+        )
+
+        plan = ORDER_GRID.plan(None, json.loads(options["sort"]))
+        columns = paging.ordering(plan)
+        queryset = models.Order.objects.select_related("site", "vendor").filter(
+            site=site
+        )
+        scope = f"site:{site.id}"
+        paging.orders_changed()
+
+        # Scroll like the grid does, every page asked for by startRow
+        timings = {}
+        started = perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            for start_row in range(0, options["orders"], size):
+                page_started = perf_counter()
+                _rows, total, _cursor = paging.page(
+                    queryset, plan, scope, start_row, start_row + size
+                )
+                timings[start_row] = perf_counter() - page_started
+        scrolled = perf_counter() - started
+        if total != options["orders"]:
+            raise CommandError(f"totalRows is {total}, not {options['orders']}.")
+        self.stdout.write(
+            f"Scrolled {len(timings)} keyset pages in {scrolled:.2f}s with "
+            f"{len(queries)} queries (one count)"
+        )
+
+        self.stdout.write(f"{'row':>8} {'keyset ms':>10} {'offset ms':>10}")
+        last_row = (options["orders"] - 1) // size * size
+        sampled = {
+            0,
+            last_row // 10 // size * size,
+            last_row // 2 // size * size,
+            last_row,
+        }
+        for start_row in sorted(sampled):
+            keyset = self.keyset_page(queryset, plan, scope, start_row, size)
+            offset = self.offset_page(queryset, columns, start_row, size)
+            if [row.id for row in keyset[0]] != [row.id for row in offset[0]]:
+                raise CommandError(f"The pages at row {start_row} differ.")
+            self.stdout.write(
+                f"{start_row:>8} {self.time(keyset[1], options['repeat']):>10.2f} "
+                f"{self.time(offset[1], options['repeat']):>10.2f}"
+            )
+
+        cursor = pagination.decode_position(
+            paging.page(queryset, plan, scope, last_row - size, last_row)[2],
+            len(columns),
+        )
+        self.stdout.write(f"\nKeyset plan at row {last_row}:")
+        self.stdout.write(
+            queryset.filter(pagination.keyset_after(columns, cursor))
+            .order_by(*columns)[:size]
+            .explain(**self.explain_options())
+        )
+        self.stdout.write(f"\nOFFSET plan at row {last_row}:")
+        self.stdout.write(
+            queryset.order_by(*columns)[last_row : last_row + size].explain(
+                **self.explain_options()
+            )
+        )
+
+    def keyset_page(self, queryset, plan, scope, start_row, size):
+        def read():
+            return paging.page(queryset, plan, scope, start_row, start_row + size)[0]
+
+        return read(), read
+
+    def offset_page(self, queryset, columns, start_row, size):
+        def read():
+            rows = queryset.order_by(*columns)[start_row : start_row + size]
+            return list(rows), queryset.count()
+
+        return read()[0], read
+
+    def time(self, read, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = perf_counter()
+            read()
+            timings.append(perf_counter() - started)
+        return mean(timings) * 1000
+
+    def explain_options(self):
+        if connection.vendor == "postgresql":
+            return {"analyze": True, "buffers": True}
+        return {}
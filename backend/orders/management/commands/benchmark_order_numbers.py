@@ -0,0 +1,112 @@
+import threading
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from orders import models
+from sites import models as sites_models
+from vendors import models as vendors_models
+
+
+class Command(BaseCommand):
+    help = (
+        "Create orders from many threads at once and check that every order "
+        "got its own number with one allocation query. The orders are "
+        "deleted afterwards but the numbers they used are not given back, "
+        "so don't run it on production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--orders", type=int, default=50, help="Per thread.")
+        parser.add_argument(
+            "--block",
+            type=int,
+            default=0,
+            help="Also bulk create this many orders from one reserved block.",
+        )
+
+    def handle(self, *args, **options):
+        site = sites_models.Site.objects.create(name="Benchmark", address="-")
+        vendor = vendors_models.Vendor.objects.create(name="Benchmark", address="-")
+        table = models.OrderNumberCounter._meta.db_table
+        failures = []
+        allocations = []
+
+        def count_allocations(execute, sql, params, many, context):
+            if sql.startswith(f"UPDATE {table}"):
+                allocations.append(1)
+            return execute(sql, params, many, context)
+
+        def create_orders(thread):
+            try:
+                with connection.execute_wrapper(count_allocations):
+                    for i in range(options["orders"]):
+                        try:
+                            with transaction.atomic():
+                                models.Order.objects.create(
+                                    name=f"Benchmark {thread}-{i}",
+                                    site=site,
+                                    vendor=vendor,
+                                )
+                        except Exception as error:
+                            failures.append(error)
+            finally:
+                connection.close()
+
+        try:
+            started = perf_counter()
+            threads = [
+                threading.Thread(target=create_orders, args=(thread,))
+                for thread in range(options["threads"])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = perf_counter() - started
+
+            if options["block"]:
+                with transaction.atomic(), connection.execute_wrapper(
+                    count_allocations
+                ):
+                    models.Order.objects.bulk_create(
+                        models.Order.assign_numbers(
+                            [
+                                models.Order(
+                                    name=f"Benchmark block {i}",
+                                    site=site,
+                                    vendor=vendor,
+                                )
+                                for i in range(options["block"])
+                            ]
+                        )
+                    )
+
+            numbers = list(
+                models.Order.objects.filter(site=site).values_list("no", flat=True)
+            )
+        finally:
+            site.delete()
+            vendor.delete()
+
+        expected = options["threads"] * options["orders"] + options["block"]
+        created = options["threads"] * options["orders"] - len(failures)
+        self.stdout.write(
+            f"{created} orders from {options['threads']} threads in "
+            f"{elapsed:.2f}s, {len(allocations)} allocation queries"
+        )
+        if failures:
+            raise CommandError(f"{len(failures)} orders failed: {failures[0]!r}")
+        if len(numbers) != expected or len(set(numbers)) != expected:
+            raise CommandError(f"Expected {expected} distinct numbers.")
+        if max(numbers) - min(numbers) + 1 != expected:
+            raise CommandError("The numbers have gaps.")
+        if len(allocations) != created + bool(options["block"]):
+            raise CommandError("Some orders took more than one allocation.")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{expected} distinct numbers without gaps, one allocation each."
+            )
+        )
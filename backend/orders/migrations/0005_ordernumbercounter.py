@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:52
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def create_counter(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderNumberCounter = apps.get_model("orders", "OrderNumberCounter")
+
+    # Carries on from the highest number handed out so far
+    last = Order.objects.aggregate(last=Max("no"))["last"] or 0
+    OrderNumberCounter.objects.create(id=1, last=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_remove_order_number_order_no"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNumberCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
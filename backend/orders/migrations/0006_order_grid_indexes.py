@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_ordernumbercounter"),
+        ("sites", "0003_alter_site_options"),
+        ("vendors", "0004_alter_vendor_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["site", "-created_at", "-id"],
+                name="orders_orde_site_id_62fc64_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["vendor", "-created_at", "-id"],
+                name="orders_orde_vendor__34294f_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import connection, models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django_resized import ResizedImageField
@@ -8,6 +8,41 @@ from sites.models import Site
 from vendors.models import Vendor
 
 
+class OrderNumberCounter(models.Model):
+    """
+    The last order number handed out, kept in a single row.
+
+    Numbers are taken with one UPDATE ... RETURNING on that row. The row
+    stays locked until the transaction ends, so concurrent orders queue on
+    it instead of racing to the same number. Taken inside an order's
+    transaction, every other order waits for that whole transaction; taken
+    before it, in autocommit, the lock lasts one statement but an order
+    that then fails leaves a gap in the numbers. Orders created through the
+    API take theirs before, gaps are the price of not queueing.
+    """
+
+    ROW_ID = 1
+
+    last = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, count=1):
+        """Reserve count consecutive order numbers, returned as a range."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {cls._meta.db_table} SET last = last + %s "
+                "WHERE id = %s RETURNING last",
+                [count, cls.ROW_ID],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise cls.DoesNotExist("The order number counter row is missing.")
+        return range(row[0] - count + 1, row[0] + 1)
+
+    def __str__(self):
+        return f"Last order number {self.last}"
+
+
 class Order(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     no = models.PositiveIntegerField(unique=True, editable=False, null=True)
@@ -31,11 +66,15 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        # The site and vendor grids' default order, read as keyset pages
+        indexes = [
+            models.Index(fields=["site", "-created_at", "-id"]),
+            models.Index(fields=["vendor", "-created_at", "-id"]),
+        ]
 
     def save(self, *args, **kwargs):
         if self.no is None:
-            last = Order.objects.order_by("-no").values_list("no", flat=True).first()
-            self.no = (last or 0) + 1
+            self.no = OrderNumberCounter.allocate().start
         if self.is_completed and self.completed_at is None:
             self.completed_at = timezone.now()
         elif not self.is_completed:
@@ -43,6 +82,16 @@ class Order(models.Model):
             self.completed_by = None
         super().save(*args, **kwargs)
 
+    @classmethod
+    def assign_numbers(cls, orders):
+        """Number unsaved orders from one reserved block, for bulk_create."""
+        unnumbered = [order for order in orders if order.no is None]
+        if unnumbered:
+            block = OrderNumberCounter.allocate(len(unnumbered))
+            for order, no in zip(unnumbered, block):
+                order.no = no
+        return orders
+
     @property
     def number(self):
         return f"KS{self.no:02d}"
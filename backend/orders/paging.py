@@ -0,0 +1,163 @@
+"""
+Keyset pages and cached totals for the order grids.
+
+Pages are read after the last row of the previous page, comparing the
+grid's sort columns plus id, instead of skipping startRow rows with
+OFFSET, so row 50 000 costs what row 0 costs. The grid scrolls by
+startRow, so the cursor ending each page is kept under the row it ends
+at and the next request for that row picks it up; a client may also send
+it back as cursor. Rows without a kept cursor are read with OFFSET.
+
+totalRows comes with the footer totals of the filtered rows, their cost
+and how many are completed, from one aggregate query. Facets, the names
+a column takes in the list for the grid's set filters, are one grouped
+query per column.
+
+Totals are cached per list (site or vendor) and filter, whatever the
+sort, the kept cursors per list, sort and filter, facets per list. Committing a write to any order bumps a
+version that is part of every key, so nothing stale is read after a
+write. A request reads the version once, before its first query, and
+caches everything under it: what it read is at least as new as that
+version, and a write committing meanwhile bumps it past what it cached.
+"""
+
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from rest_framework.exceptions import NotFound
+
+from ks_constructions import pagination
+
+from .models import Order
+
+VERSION_KEY = "orders:grid:version"
+CACHE_TIMEOUT = 60 * 60
+
+
+def version():
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        cache.add(VERSION_KEY, 1, None)
+        current = cache.get(VERSION_KEY, 1)
+    return current
+
+
+def orders_changed():
+    """Drop the cached totals, facets and cursors of every order grid."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+
+
+def _key(kind, current, scope, *extra):
+    return ":".join(str(part) for part in ("orders:grid", current, kind, scope, *extra))
+
+
+@contextmanager
+def snapshot():
+    """
+    One transaction for a page, its totals and facets. On PostgreSQL it is
+    repeatable read, so all of them see the same orders. Yields the
+    version to cache them under, read before the transaction's first query.
+    """
+    current = version()
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield current
+
+
+def ordering(plan):
+    """The plan's ordering, or the orders' own, ended by id to be unique."""
+    return [*(plan.ordering or Order._meta.ordering), "-id"]
+
+
+def totals(queryset, plan, scope, current):
+    """
+    totalRows and the footer totals of the filtered rows, the same for
+    every sort of the same filter.
+    """
+    key = _key("totals", current, scope, plan.filter_key)
+    found = cache.get(key)
+    if found is None:
+        found = queryset.aggregate(
+            totalRows=Count("id"),
+            cost=Sum("cost", default=0),
+            completed=Count("id", filter=Q(is_completed=True)),
+        )
+        found["cost"] = float(found["cost"])
+        found["notCompleted"] = found["totalRows"] - found["completed"]
+        cache.set(key, found, CACHE_TIMEOUT)
+    return found
+
+
+def facets(queryset, scope, columns, current=None):
+    """
+    The values of each of columns, a dict of column names to ORM paths, in
+    the whole list with how many orders have them. current is the version
+    from snapshot(), read here when not given.
+    """
+    if current is None:
+        current = version()
+    found = {}
+    for name, path in columns.items():
+        key = _key("facet", current, scope, name)
+        values = cache.get(key)
+        if values is None:
+            values = [
+                {"value": row[path], "count": row["count"]}
+                for row in queryset.order_by(path)
+                .values(path)
+                .annotate(count=Count("id"))
+            ]
+            cache.set(key, values, CACHE_TIMEOUT)
+        found[name] = values
+    return found
+
+
+def page(queryset, plan, scope, start_row, end_row, cursor=None, current=None):
+    """
+    Rows start_row to end_row of the filtered queryset in the plan's order.
+
+    Returns the rows, the totals and the cursor the page ends at, None on
+    the last page. current is the version from snapshot(), read here
+    before any row when not given.
+    """
+    if current is None:
+        current = version()
+    columns = ordering(plan)
+    size = end_row - start_row
+    if cursor is None and start_row:
+        cursor = cache.get(_key("cursor", current, scope, plan.key, start_row))
+
+    position = pagination.decode_position(cursor, len(columns)) if cursor else None
+    if cursor and position is None:
+        raise NotFound(pagination.KeysetPagination.invalid_cursor_message)
+
+    if position is not None:
+        rows = queryset.filter(pagination.keyset_after(columns, position))
+        rows = list(rows.order_by(*columns)[:size])
+    else:
+        rows = list(queryset.order_by(*columns)[start_row:end_row])
+
+    next_cursor = None
+    # A NULL in the sort columns can't be compared, scrolling past it is by
+    # OFFSET
+    if (
+        rows
+        and len(rows) == size
+        and None not in pagination.row_position(rows[-1], columns)
+    ):
+        next_cursor = pagination.encode_position(rows[-1], columns)
+        cache.set(
+            _key("cursor", current, scope, plan.key, end_row),
+            next_cursor,
+            CACHE_TIMEOUT,
+        )
+
+    return rows, totals(queryset, plan, scope, current), next_cursor
@@ -1,13 +1,12 @@
 from decimal import Decimal
 from django.db import transaction
 from rest_framework import serializers
-from fcm_django.models import FCMDevice
-from firebase_admin.messaging import Message, Notification
 
+from notifications import outbox
 from users.serializers import UserSerializer
 from users.models import Roles
 
-from .models import Material, Order, OrderImage
+from .models import Material, Order, OrderImage, OrderNumberCounter
 
 
 class OrderImageListSerializer(serializers.ModelSerializer):
@@ -96,6 +95,10 @@ class OrderSerializer(serializers.ModelSerializer):
         materials_data = validated_data.pop("materials")
         total_cost = Decimal("0.00")
 
+        # Numbered in a statement of its own, so the counter isn't locked
+        # while the materials are written. A failed order leaves a gap.
+        validated_data["no"] = OrderNumberCounter.allocate().start
+
         with transaction.atomic():
             order = Order.objects.create(**validated_data)
 
@@ -130,40 +133,39 @@ class OrderSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        # 3️⃣ Update materials ONLY if provided
-        if materials_data is not None:
-            instance.materials.all().delete()
-            Material.objects.bulk_create(
-                [Material(order=instance, **material) for material in materials_data]
-            )
-            instance.cost = sum(
-                material["quantity"] * material["price"] for material in materials_data
-            )
-
-        is_completed = validated_data.pop("is_completed", None)
-
-        if is_completed is not None and is_completed:
-            request = self.context.get("request")
-            user = request.user if request else None
-            user_name = user.get_full_name() if user else "Someone"
-
-            FCMDevice.objects.filter(
-                user__role__in=[
-                    Roles.HEAD_OFFICE,
-                    Roles.ADMIN,
-                ]
-            ).send_message(
-                Message(
-                    notification=Notification(
-                        title="Order Updated",
-                        body=f"Order {instance.name} is marked as completed by {user_name}",
-                    ),
+        # The order, its materials and the notification commit together
+        with transaction.atomic():
+            # 3️⃣ Update materials ONLY if provided
+            if materials_data is not None:
+                instance.materials.all().delete()
+                Material.objects.bulk_create(
+                    [
+                        Material(order=instance, **material)
+                        for material in materials_data
+                    ]
+                )
+                instance.cost = sum(
+                    material["quantity"] * material["price"]
+                    for material in materials_data
+                )
+
+            is_completed = validated_data.pop("is_completed", None)
+
+            if is_completed is not None and is_completed:
+                request = self.context.get("request")
+                user = request.user if request else None
+                user_name = user.get_full_name() if user else "Someone"
+
+                # Sent by the send_notifications worker
+                outbox.enqueue(
+                    title="Order Updated",
+                    body=f"Order {instance.name} is marked as completed by {user_name}",
+                    roles=[Roles.HEAD_OFFICE, Roles.ADMIN],
                     data={"internalRoute": f"orders/{instance.id}"},
                 )
-            )
-            instance.completed_by = request.user
+                instance.completed_by = request.user
 
-        instance.save()
+            instance.save()
         return instance
 
 
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sites.models import Site
+from vendors.models import Vendor
+
+from . import paging as paging
+from .models import Order
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+# The grids filter and sort by the site's and vendor's names too
+@receiver(post_save, sender=Site)
+@receiver(post_save, sender=Vendor)
+def invalidate_order_grids(sender, **kwargs):
+    # Bumped before the commit, a request could cache the old orders under
+    # the new version until the write commits
+    transaction.on_commit(paging.orders_changed)
@@ -1,3 +1,309 @@
-from django.test import TestCase
+import json
+import threading
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from sites import models as sites_models
+from users import models as users_models
+from vendors import models as vendors_models
+
+from . import models
+from . import paging
+from . import serializers
+from . import views
+
+# Silk explains the queries of the last request it saw, which shouldn't count
+WITHOUT_SILK = [name for name in settings.MIDDLEWARE if not name.startswith("silk.")]
+
+
+def order_data(site, vendor, name="Cement"):
+    return {
+        "name": name,
+        "site": site.id,
+        "vendor": vendor.id,
+        "materials": [{"name": "Cement", "quantity": 10, "unit": "bag", "price": 400}],
+    }
+
+
+def create_order(data):
+    serializer = serializers.OrderSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+class OrderNumberTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.vendor = vendors_models.Vendor.objects.create(name="V", address="-")
+
+    def test_order_is_numbered_outside_its_transaction(self):
+        first = create_order(order_data(self.site, self.vendor))
+
+        with mock.patch.object(
+            models.Material.objects, "bulk_create", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                create_order(order_data(self.site, self.vendor))
+
+        # The failed order's number isn't handed out again
+        second = create_order(order_data(self.site, self.vendor))
+        self.assertEqual(second.no, first.no + 2)
+        self.assertEqual(models.Order.objects.count(), 2)
+
+    def counter_queries(self, queries):
+        # Without the EXPLAINs silk adds after a request it has seen
+        table = models.OrderNumberCounter._meta.db_table
+        return [
+            query["sql"]
+            for query in queries.captured_queries
+            if table in query["sql"] and not query["sql"].startswith("EXPLAIN")
+        ]
+
+    def test_every_allocation_is_one_round_trip(self):
+        numbers = []
+        for _ in range(5):
+            with CaptureQueriesContext(connection) as queries:
+                numbers.append(models.OrderNumberCounter.allocate().start)
+            self.assertEqual(len(self.counter_queries(queries)), 1)
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 5)))
+
+        # A block for bulk_create is still one
+        orders = [
+            models.Order(name=f"Order {i}", site=self.site, vendor=self.vendor)
+            for i in range(50)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            models.Order.assign_numbers(orders)
+        self.assertEqual(len(self.counter_queries(queries)), 1)
+        self.assertEqual(
+            [order.no for order in orders],
+            list(range(numbers[-1] + 1, numbers[-1] + 51)),
+        )
+
+    def test_an_order_takes_one_number(self):
+        for i in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                create_order(order_data(self.site, self.vendor, f"Order {i}"))
+            self.assertEqual(len(self.counter_queries(queries)), 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs row locks.")
+class ConcurrentOrderNumberTests(TransactionTestCase):
+    # Hundreds of orders, so the threads really queue on the counter row
+    THREADS = 8
+    ORDERS = 50
+
+    def test_concurrent_orders_get_distinct_numbers(self):
+        # Flushed between transactional tests with the migration's row
+        models.OrderNumberCounter.objects.get_or_create(
+            id=models.OrderNumberCounter.ROW_ID
+        )
+        site = sites_models.Site.objects.create(name="A", address="-")
+        vendor = vendors_models.Vendor.objects.create(name="V", address="-")
+        failures = []
+
+        def create_orders(thread):
+            try:
+                for i in range(self.ORDERS):
+                    create_order(order_data(site, vendor, f"Order {thread}-{i}"))
+            except Exception as error:
+                failures.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=create_orders, args=(thread,))
+            for thread in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        numbers = sorted(models.Order.objects.values_list("no", flat=True))
+        self.assertEqual(
+            numbers, list(range(numbers[0], numbers[0] + self.THREADS * self.ORDERS))
+        )
+
+
+class GridVersionTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.vendor = vendors_models.Vendor.objects.create(name="V", address="-")
+        self.plan = views.ListOrder.grid.plan()
+
+    def test_version_is_bumped_when_the_write_commits(self):
+        before = paging.version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_order(order_data(self.site, self.vendor))
+            self.assertEqual(paging.version(), before)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(paging.version(), before)
+
+    def test_totals_read_before_a_write_are_not_kept_after_it(self):
+        orders = models.Order.objects.filter(site=self.site)
+        with paging.snapshot() as current:
+            # A write committing while the request reads
+            paging.orders_changed()
+            paging.page(orders, self.plan, "test", 0, 10, current=current)
+
+        key = paging._key("totals", paging.version(), "test", self.plan.filter_key)
+        self.assertIsNone(cache.get(key))
+        key = paging._key("totals", current, "test", self.plan.filter_key)
+        self.assertEqual(cache.get(key)["totalRows"], 0)
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class GridTotalsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site, other_site = (
+            sites_models.Site.objects.create(name=name, address="-")
+            for name in ("A", "B")
+        )
+        self.vendor, other_vendor = (
+            vendors_models.Vendor.objects.create(name=name, address="-")
+            for name in ("Ultratech", "Tata")
+        )
+        for site, vendor, cost, is_completed in (
+            (self.site, self.vendor, "100", True),
+            (self.site, self.vendor, "250.50", False),
+            (self.site, other_vendor, "40", True),
+            (self.site, other_vendor, "10", False),
+            (other_site, self.vendor, "999", True),
+        ):
+            models.Order.objects.create(
+                name="Cement",
+                site=site,
+                vendor=vendor,
+                cost=cost,
+                is_completed=is_completed,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def get(self, url, filter_model=None, sort_model=None, facets=None):
+        params = {}
+        if filter_model:
+            params["filter"] = json.dumps(filter_model)
+        if sort_model:
+            params["sort"] = json.dumps(sort_model)
+        if facets:
+            params["facets"] = facets
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"{url}?{urlencode(params)}")
+        self.assertEqual(response.status_code, 200)
+        return response.json(), queries
+
+    def site_url(self, site=None):
+        return f"/api/sites/{(site or self.site).id}/orders/"
+
+    def vendor_filter(self):
+        return {
+            "vendor": {"filterType": "text", "type": "equals", "filter": "Ultratech"}
+        }
+
+    def test_totals_are_of_the_filtered_rows(self):
+        data, _queries = self.get(self.site_url())
+        self.assertEqual(data["totalRows"], 4)
+        self.assertEqual(
+            data["totals"], {"cost": 400.5, "completed": 2, "notCompleted": 2}
+        )
+
+        data, _queries = self.get(self.site_url(), self.vendor_filter())
+        self.assertEqual(data["totalRows"], 2)
+        self.assertEqual(
+            data["totals"], {"cost": 350.5, "completed": 1, "notCompleted": 1}
+        )
+
+        data, _queries = self.get(f"/api/vendors/{self.vendor.id}/orders/")
+        self.assertEqual(data["totalRows"], 3)
+        self.assertEqual(
+            data["totals"], {"cost": 1349.5, "completed": 2, "notCompleted": 1}
+        )
+
+    def test_totals_are_shared_by_every_sort_of_a_filter(self):
+        cost = [{"colId": "cost", "sort": "asc"}]
+        cost_desc = [{"colId": "cost", "sort": "desc"}]
+        plans = [
+            views.ORDER_GRID.plan(self.vendor_filter(), sort)
+            for sort in (cost, cost_desc)
+        ]
+        self.assertNotEqual(plans[0].key, plans[1].key)
+        self.assertEqual(plans[0].filter_key, plans[1].filter_key)
+
+        first, first_queries = self.get(self.site_url(), self.vendor_filter(), cost)
+        second, second_queries = self.get(
+            self.site_url(), self.vendor_filter(), cost_desc
+        )
+        self.assertEqual(second["totals"], first["totals"])
+        # The same queries but the totals' aggregate
+        self.assertEqual(
+            len(second_queries.captured_queries),
+            len(first_queries.captured_queries) - 1,
+        )
+        self.assertEqual([row["cost"] for row in first["rows"]], [100, 250.5])
+        self.assertEqual([row["cost"] for row in second["rows"]], [250.5, 100])
+
+        # Another filter has its own
+        data, _queries = self.get(self.site_url(), sort_model=cost)
+        self.assertEqual(data["totalRows"], 4)
+
+    def test_facets_list_every_value_of_the_list(self):
+        data, _queries = self.get(
+            self.site_url(), self.vendor_filter(), facets="vendor,site"
+        )
+        # Whatever the grid's filter
+        self.assertEqual(
+            data["facets"],
+            {
+                "vendor": [
+                    {"value": "Tata", "count": 2},
+                    {"value": "Ultratech", "count": 2},
+                ],
+                "site": [{"value": "A", "count": 4}],
+            },
+        )
+
+        data, _queries = self.get(
+            f"/api/vendors/{self.vendor.id}/orders/", facets="site"
+        )
+        self.assertEqual(
+            data["facets"],
+            {"site": [{"value": "A", "count": 2}, {"value": "B", "count": 1}]},
+        )
+
+    def test_facets_are_cached_per_list(self):
+        self.get(self.site_url(), facets="vendor")
+        other = vendors_models.Vendor.objects.create(name="Birla", address="-")
+        # Not committed, so the version isn't bumped
+        models.Order.objects.create(name="Sand", site=self.site, vendor=other, cost=5)
+
+        data, queries = self.get(self.site_url(), facets="vendor")
+        self.assertNotIn("Birla", [row["value"] for row in data["facets"]["vendor"]])
+        self.assertFalse(
+            [query for query in queries.captured_queries if "GROUP BY" in query["sql"]]
+        )
+
+        # Another list has its own
+        data, _queries = self.get(
+            self.site_url(sites_models.Site.objects.get(name="B")), facets="vendor"
+        )
+        self.assertEqual(data["facets"]["vendor"], [{"value": "Ultratech", "count": 1}])
+
+        paging.orders_changed()
+        data, _queries = self.get(self.site_url(), facets="vendor")
+        self.assertEqual(data["facets"]["vendor"][0], {"value": "Birla", "count": 1})
@@ -1,14 +1,13 @@
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.db import transaction
 from rest_framework.generics import GenericAPIView, get_object_or_404, DestroyAPIView
 from rest_framework.viewsets import ModelViewSet
-from datetime import time, datetime
 from rest_framework import generics
-from django.db.models import Q
-from django.http import JsonResponse
-import json
 
+from ks_constructions import grid
+from . import paging as paging
 from .models import Order, OrderImage
 
 from .serializers import (
@@ -35,141 +34,77 @@ class OrderViewSet(ModelViewSet):
         return OrderSerializer
 
 
-class ListOrder(generics.ListAPIView):
-    serializer_class = OrderListSerializer
+ORDER_GRID = grid.Grid(
+    {
+        "name": grid.GridField("name", "text"),
+        "vendor": grid.GridField("vendor__name", "text"),
+        "site": grid.GridField("site__name", "text"),
+        "createdAt": grid.GridField("created_at", "datetime"),
+        "isCompleted": grid.GridField("is_completed", "boolean"),
+        "number": grid.GridField("no", "number"),
+        "cost": grid.GridField("cost", "number"),
+        "remarks": grid.GridField("remarks", "text"),
+    },
+    model=Order,
+)
 
-    def get_queryset(self):
-        queryset = Order.objects.select_related("site", "vendor")
-
-        # -----------------------------
-        # AG-GRID FILTERING
-        # -----------------------------
-        filter_params = self.request.GET.get("filter")
-
-        if filter_params:
-            filters = json.loads(filter_params)
-            q_objects = Q()
-
-            FIELD_MAP = {
-                "name": "name",
-                "vendor": "vendor__name",
-                "site": "site__name",
-                "createdAt": "created_at",
-                "isCompleted": "is_completed",
-            }
 
-            for key, filter_info in filters.items():
-                field = FIELD_MAP.get(key, key)
-
-                filter_type = filter_info.get("filterType")  # IMPORTANT
-                operator = filter_info.get("type")
-
-                # --------------------
-                # TEXT FILTERS
-                # --------------------
-                if filter_type == "text":
-                    value = filter_info.get("filter")
-
-                    if operator == "contains":
-                        q_objects &= Q(**{f"{field}__icontains": value})
-
-                    elif operator == "equals":
-                        q_objects &= Q(**{f"{field}__iexact": value})
-
-                    elif operator == "notEqual":
-                        q_objects &= ~Q(**{f"{field}__iexact": value})
-
-                    elif operator == "startsWith":
-                        q_objects &= Q(**{f"{field}__istartswith": value})
-
-                    elif operator == "endsWith":
-                        q_objects &= Q(**{f"{field}__iendswith": value})
-
-                # --------------------
-                # NUMBER FILTERS
-                # --------------------
-                elif filter_type == "number":
-                    value = filter_info.get("filter")
-                    value_to = filter_info.get("filterTo")
-
-                    if operator == "equals":
-                        q_objects &= Q(**{field: value})
-
-                    elif operator == "greaterThan":
-                        q_objects &= Q(**{f"{field}__gt": value})
-
-                    elif operator == "lessThan":
-                        q_objects &= Q(**{f"{field}__lt": value})
-
-                    elif operator == "inRange":
-                        q_objects &= Q(**{f"{field}__range": (value, value_to)})
-
-                # --------------------
-                # DATE FILTERS ✅ FIX HERE
-                # --------------------
-                elif filter_type == "date":
-                    date_from = filter_info.get("dateFrom")
-                    date_to = filter_info.get("dateTo")
-
-                    if not date_from:
-                        continue
-
-                    # Convert string → date
-                    date_from = datetime.fromisoformat(date_from).date()
-
-                    # Create naive datetimes (NO timezone)
-                    start_dt = datetime.combine(date_from, time.min)
-                    end_dt = datetime.combine(date_from, time.max)
-
-                    if operator == "equals":
-                        q_objects &= Q(
-                            **{
-                                f"{field}__gte": start_dt,
-                                f"{field}__lte": end_dt,
-                            }
-                        )
-
-                    elif operator == "inRange" and date_to:
-                        date_to = datetime.fromisoformat(date_to).date()
-                        range_start = datetime.combine(date_from, time.min)
-                        range_end = datetime.combine(date_to, time.max)
-
-                        q_objects &= Q(
-                            **{
-                                f"{field}__gte": range_start,
-                                f"{field}__lte": range_end,
-                            }
-                        )
-            queryset = queryset.filter(q_objects)
-
-        sort_params = self.request.GET.get("sort")
-
-        if sort_params:
-            sort_objects = json.loads(sort_params)
-            sort_fields = []
-
-            SORT_FIELD_MAP = {
-                "name": "name",
-                "vendor": "vendor__name",
-                "site": "site__name",
-                "createdAt": "created_at",
-                "isCompleted": "is_completed",
-            }
+class ListOrder(grid.GridListMixin, generics.ListAPIView):
+    serializer_class = OrderListSerializer
+    grid = ORDER_GRID
+    # The order grids always ask for rows
+    paged_by_default = True
 
-            for sort_object in sort_objects:
-                col_id = sort_object["colId"]
-                sort_order = sort_object["sort"]
+    # Totals and cursors are cached per scope, see orders.paging
+    scope = "all"
+    # Columns whose values the grid's set filters may ask for with ?facets=
+    facet_columns = ["vendor", "site"]
 
-                field = SORT_FIELD_MAP.get(col_id, col_id)
+    def get_queryset(self):
+        return Order.objects.select_related("site", "vendor")
 
-                if sort_order == "asc":
-                    sort_fields.append(field)
-                else:
-                    sort_fields.append(f"-{field}")
+    def get_scope(self):
+        return self.scope
 
-            queryset = queryset.order_by(*sort_fields)
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        start_row, end_row = self.get_row_range(params)
+        # The page is ordered by paging, plan.ordering plus id
+        plan = self.grid.plan_from_params(params)
+        facet_columns = self.get_facet_columns(params)
+
+        with paging.snapshot() as current:
+            rows, totals, cursor = paging.page(
+                self.filter_queryset(self.get_queryset()),
+                plan,
+                self.get_scope(),
+                start_row,
+                end_row,
+                params.get("cursor"),
+                current,
+            )
+            serializer = self.get_serializer(rows, many=True)
+            data = {
+                "rows": serializer.data,
+                "totalRows": totals["totalRows"],
+                "totals": {
+                    name: totals[name] for name in ("cost", "completed", "notCompleted")
+                },
+                "nextCursor": cursor,
+            }
+            if facet_columns:
+                data["facets"] = paging.facets(
+                    self.get_queryset(), self.get_scope(), facet_columns, current
+                )
+        return Response(data)
 
-        return queryset
+    def get_facet_columns(self, params):
+        """The columns of ?facets=vendor,site, with their ORM paths."""
+        names = [name for name in params.get("facets", "").split(",") if name]
+        unknown = [name for name in names if name not in self.facet_columns]
+        if unknown:
+            raise ValidationError({"facets": [f"Unknown column {unknown[0]!r}."]})
+        return {name: self.grid.fields[name].path for name in names}
 
 
 class ListOrderBySite(ListOrder):
@@ -178,17 +113,8 @@ class ListOrderBySite(ListOrder):
         queryset = super().get_queryset().filter(site_id=site_id)
         return queryset
 
-    def list(self, request, *args, **kwargs):
-        start_row = int(request.GET.get("startRow", 0))
-        end_row = int(request.GET.get("endRow", 100))
-
-        queryset = self.get_queryset()
-        total_rows = queryset.count()
-        queryset = queryset[start_row:end_row]
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        return JsonResponse({"rows": serializer.data, "totalRows": total_rows})
+    def get_scope(self):
+        return f"site:{self.kwargs.get('site_id')}"
 
 
 class ListOrderByVendor(ListOrder):
@@ -197,17 +123,8 @@ class ListOrderByVendor(ListOrder):
         queryset = super().get_queryset().filter(vendor_id=vendor_id)
         return queryset
 
-    def list(self, request, *args, **kwargs):
-        start_row = int(request.GET.get("startRow", 0))
-        end_row = int(request.GET.get("endRow", 100))
-
-        queryset = self.get_queryset()
-        total_rows = queryset.count()
-        queryset = queryset[start_row:end_row]
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        return JsonResponse({"rows": serializer.data, "totalRows": total_rows})
+    def get_scope(self):
+        return f"vendor:{self.kwargs.get('vendor_id')}"
 
 
 class OrderImageUploadView(GenericAPIView):
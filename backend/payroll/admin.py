@@ -6,6 +6,11 @@ from .models import (
     LabourAttendance,
     DailyEntry,
     WeekLabourAssignment,
+    LabourLedgerEntry,
+    WeekLabourBalanceSnapshot,
+    WeekLabourSummary,
+    ArchivedLabourAttendance,
+    AttendanceMutation,
 )
 
 
@@ -32,3 +37,28 @@ class WeekLabourAssignmentAdmin(admin.ModelAdmin):
 @admin.register(LabourPayment)
 class LabourPaymentAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(LabourLedgerEntry)
+class LabourLedgerEntryAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(WeekLabourBalanceSnapshot)
+class WeekLabourBalanceSnapshotAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(WeekLabourSummary)
+class WeekLabourSummaryAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(ArchivedLabourAttendance)
+class ArchivedLabourAttendanceAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(AttendanceMutation)
+class AttendanceMutationAdmin(admin.ModelAdmin):
+    pass
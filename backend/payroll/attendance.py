@@ -0,0 +1,145 @@
+from django.db.models import OuterRef, Subquery
+
+from . import models as models
+
+ATTENDANCE_FIELDS = [
+    "is_present",
+    "advance_taken",
+    "payment_type",
+    "multiplier",
+]
+
+
+def attendance_model(week):
+    """The table holding a week's attendance rows, the archive once compacted."""
+    if week.is_compacted:
+        return models.ArchivedLabourAttendance
+    return models.LabourAttendance
+
+
+def save_day(daily_entry, items):
+    """
+    Make a day's attendance match items, touching only what changed.
+
+    New and changed labourers are upserted on (daily_entry, labour, date) in one
+    statement, labourers missing from items are deleted and the rest is
+    left alone, so row ids stay the same across saves. Rows written carry
+    the labourer's daily wage for the week.
+    Returns how many rows were inserted, updated, deleted and unchanged,
+    and the ids of the labourers whose attendance changed.
+    """
+    site_id = daily_entry.week.site_id
+    wages = dict(
+        models.WeekLabourAssignment.objects.filter(
+            week=daily_entry.week_id
+        ).values_list("labour", "weekly_daily_wage")
+    )
+    existing = {
+        row["labour"]: row
+        for row in models.LabourAttendance.objects.filter(
+            daily_entry=daily_entry
+        ).values("id", "labour", *ATTENDANCE_FIELDS)
+    }
+    # A labourer sent twice keeps the last values
+    wanted = {item["labour"]: item for item in items}
+
+    changes = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    upserts = []
+    for labour_id, item in wanted.items():
+        current = existing.get(labour_id)
+        if current is None:
+            changes["inserted"] += 1
+        elif any(current[field] != item[field] for field in ATTENDANCE_FIELDS):
+            changes["updated"] += 1
+        else:
+            changes["unchanged"] += 1
+            continue
+
+        upserts.append(
+            models.LabourAttendance(
+                daily_entry=daily_entry,
+                labour_id=labour_id,
+                date=daily_entry.date,
+                week_id=daily_entry.week_id,
+                site_id=site_id,
+                daily_wage=wages.get(labour_id),
+                **{field: item[field] for field in ATTENDANCE_FIELDS},
+            )
+        )
+
+    if upserts:
+        models.LabourAttendance.objects.bulk_create(
+            upserts,
+            update_conflicts=True,
+            unique_fields=["daily_entry", "labour", "date"],
+            update_fields=[*ATTENDANCE_FIELDS, "daily_wage"],
+        )
+
+    removed = existing.keys() - wanted.keys()
+    if removed:
+        changes["deleted"], _ = models.LabourAttendance.objects.filter(
+            daily_entry=daily_entry,
+            labour__in=removed,
+        ).delete()
+
+    touched = {attendance.labour_id for attendance in upserts} | removed
+    return changes, touched
+
+
+def populate(assignments, batch_size=1000):
+    """
+    Create blank attendance for labourers on every day of their week.
+
+    assignments is an iterable of (week_id, labour_id). It is one query for
+    the days, one for the wages and one insert per batch however many
+    labourers join, rows that already exist are left as they are.
+    """
+    labours_by_week = {}
+    for week_id, labour_id in assignments:
+        labours_by_week.setdefault(week_id, set()).add(labour_id)
+    if not labours_by_week:
+        return []
+
+    days = models.DailyEntry.objects.filter(week__in=labours_by_week.keys())
+    wages = {
+        (week_id, labour_id): wage
+        for week_id, labour_id, wage in models.WeekLabourAssignment.objects.filter(
+            week__in=labours_by_week.keys()
+        ).values_list("week", "labour", "weekly_daily_wage")
+    }
+    return models.LabourAttendance.objects.bulk_create(
+        [
+            models.LabourAttendance(
+                daily_entry_id=day_id,
+                labour_id=labour_id,
+                date=date,
+                week_id=week_id,
+                site_id=site_id,
+                daily_wage=wages.get((week_id, labour_id)),
+            )
+            for week_id, day_id, date, site_id in days.values_list(
+                "week", "id", "date", "week__site"
+            )
+            for labour_id in labours_by_week[week_id]
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def assignment_wage():
+    """The daily wage of the attendance row's labourer for the row's week."""
+    return Subquery(
+        models.WeekLabourAssignment.objects.filter(
+            week=OuterRef("week"),
+            labour=OuterRef("labour"),
+        ).values("weekly_daily_wage")[:1]
+    )
+
+
+def sync_wages(week, labour_ids=None):
+    """Copy the week's daily wages onto its attendance rows, in one update."""
+    rows = models.LabourAttendance.objects.filter(week=week)
+    if labour_ids is not None:
+        rows = rows.filter(labour__in=labour_ids)
+    return rows.update(daily_wage=assignment_wage())
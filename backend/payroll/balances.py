@@ -0,0 +1,110 @@
+from django.db.models import (
+    Count,
+    DecimalField,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+
+from . import ledger as ledger
+from . import models as models
+
+
+def week_balances(week):
+    """
+    The week's assignments with everything the week sheet and payment
+    screens show about a labourer's money worked out.
+
+    Sets hist_earned, hist_advance and hist_paid (everything before the
+    week, from the ledger and snapshots), curr_earned and curr_advance
+    (this week, from its grouped attendance or compacted summary) and the
+    opening_balance, current_week_net and total_due_to_date built on them.
+    The number of queries doesn't depend on how many labourers there are.
+    """
+    assignments = list(
+        models.WeekLabourAssignment.objects.filter(week=week).select_related(
+            "labour", "week_payment"
+        )
+    )
+    if not assignments:
+        return []
+
+    current = ledger.attendance_totals([week.id])
+    history = ledger.opening_totals(
+        week, [assignment.labour_id for assignment in assignments]
+    )
+
+    for assignment in assignments:
+        before = history.get(assignment.labour_id, ledger.EMPTY)
+        during = current.get((week.id, assignment.labour_id)) or {}
+
+        assignment.hist_earned = before.earned
+        assignment.hist_advance = before.advance
+        assignment.hist_paid = before.paid
+        assignment.curr_earned = ledger.earnings(during)
+        assignment.curr_advance = during.get("advance") or ledger.ZERO
+
+        assignment.opening_balance = (
+            assignment.labour.previous_balance
+            + assignment.hist_earned
+            - (assignment.hist_advance + assignment.hist_paid)
+        )
+        assignment.current_week_net = assignment.curr_earned - assignment.curr_advance
+        assignment.total_due_to_date = (
+            assignment.opening_balance + assignment.current_week_net
+        )
+
+    return assignments
+
+
+def _per_week(queryset, aggregate, output_field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(week=OuterRef("pk"))
+            .order_by()
+            .values("week")
+            .annotate(total=aggregate)
+            .values("total"),
+            output_field=output_field,
+        ),
+        0,
+        output_field=output_field,
+    )
+
+
+def week_summaries(weeks):
+    """
+    Annotate weeks with their headcount and what was earned, advanced and
+    paid in them, all in the query that lists the weeks.
+
+    The money comes from the ledger, whose rows of a week add up to the
+    week's current totals, so no attendance is read. The days come along
+    in one more query for their saved and unlocked flags.
+
+    Each total is a correlated subquery rather than a join grouped by
+    week: joining both the assignments and the ledger would multiply
+    their rows, and the subqueries only run for the weeks of the page a
+    cursor returns instead of every week of the site.
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    entries = models.LabourLedgerEntry.objects.all()
+    return weeks.annotate(
+        headcount=_per_week(
+            models.WeekLabourAssignment.objects.all(),
+            Count("id"),
+            IntegerField(),
+        ),
+        earned=_per_week(entries, Sum("earned"), money),
+        advance=_per_week(entries, Sum("advance"), money),
+        paid=_per_week(entries, Sum("paid"), money),
+    ).prefetch_related(
+        Prefetch(
+            "days",
+            queryset=models.DailyEntry.objects.only(
+                "id", "week", "date", "is_saved", "admin_unlocked"
+            ),
+        )
+    )
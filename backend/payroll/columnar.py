@@ -0,0 +1,92 @@
+from labours import models as labours_models
+
+from .attendance import ATTENDANCE_FIELDS, attendance_model
+
+
+def _day_columns(width):
+    return {field: [None] * width for field in ATTENDANCE_FIELDS}
+
+
+def _fill(columns, index, values):
+    is_present, advance_taken, payment_type, multiplier = values
+    columns["is_present"][index] = is_present
+    columns["advance_taken"][index] = float(advance_taken)
+    columns["payment_type"][index] = payment_type
+    columns["multiplier"][index] = multiplier
+
+
+def week_columns(week):
+    """
+    A week's attendance as parallel arrays per day.
+
+    labour_ids is sent once, every day then has one array per field with
+    the value of labour_ids[i] at position i (null if there's no row).
+    Built straight from one values_list query, without a serializer per
+    attendance row.
+    """
+    rows = list(
+        attendance_model(week)
+        .objects.filter(week=week)
+        .order_by("labour")
+        .values_list("daily_entry", "labour", *ATTENDANCE_FIELDS)
+    )
+
+    index = {}
+    for _day_id, labour_id, *_values in rows:
+        index.setdefault(labour_id, len(index))
+
+    days = list(week.days.all())
+    columns = {day.id: _day_columns(len(index)) for day in days}
+    for day_id, labour_id, *values in rows:
+        _fill(columns[day_id], index[labour_id], values)
+
+    return {
+        "labour_ids": list(index),
+        "daily_entry": [
+            {
+                "id": day.id,
+                "date": day.date,
+                "is_editable": day.is_editable,
+                **columns[day.id],
+            }
+            for day in days
+        ],
+    }
+
+
+def day_columns(daily_entry):
+    """
+    A day's labourers and attendance as parallel arrays.
+
+    The labourers of the week are sent once as columns (id, name, type,
+    gender) and the attendance arrays line up with them.
+    """
+    labours = list(
+        daily_entry.week.labours.order_by("name").values_list(
+            "id", "name", "type", "gender"
+        )
+    )
+    index = {labour[0]: i for i, labour in enumerate(labours)}
+
+    columns = _day_columns(len(labours))
+    for labour_id, *values in (
+        attendance_model(daily_entry.week)
+        .objects.filter(
+            daily_entry=daily_entry,
+            labour__in=index.keys(),
+        )
+        .values_list("labour", *ATTENDANCE_FIELDS)
+    ):
+        _fill(columns, index[labour_id], values)
+
+    types = dict(labours_models.LabourType.choices)
+    genders = dict(labours_models.GenderType.choices)
+    return {
+        "labours": {
+            "id": [labour[0] for labour in labours],
+            "name": [labour[1] for labour in labours],
+            "type": [types[labour[2]] for labour in labours],
+            "gender": [genders[labour[3]] for labour in labours],
+        },
+        "attendance": columns,
+    }
@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import balances as balances
+from . import ledger as ledger
+from . import models as models
+from .attendance import ATTENDANCE_FIELDS
+
+# Columns copied between attendance and its archive, ids included
+ROW_FIELDS = [
+    "id",
+    "daily_entry_id",
+    "labour_id",
+    "week_id",
+    "site_id",
+    "date",
+    *ATTENDANCE_FIELDS,
+    "daily_wage",
+]
+
+
+class CompactionError(Exception):
+    pass
+
+
+def compactable_weeks(older_than=timedelta(weeks=8), today=None):
+    """Locked, fully paid weeks that ended more than older_than ago."""
+    today = today or timezone.now().date()
+    return (
+        models.Week.objects.filter(
+            admin_unlocked=False,
+            is_compacted=False,
+            start_date__lt=today - older_than - timedelta(days=6),
+        )
+        .exclude(weeklabourassignment__week_payment__isnull=True)
+        .order_by("start_date")
+    )
+
+
+def _balances(week):
+    """What compaction must not change: the week's totals and balances."""
+    return (
+        ledger.week_totals([week.id]),
+        {
+            assignment.labour_id: (
+                assignment.opening_balance,
+                assignment.total_due_to_date,
+            )
+            for assignment in balances.week_balances(week)
+        },
+    )
+
+
+def _move(week, verify, move_rows):
+    with transaction.atomic():
+        locked = models.Week.objects.select_for_update().get(id=week.id)
+        before = _balances(locked) if verify else None
+
+        moved = move_rows(locked)
+
+        if verify and _balances(locked) != before:
+            raise CompactionError(f"Balances of {week} changed, nothing was moved.")
+
+    # The caller's instance must not save the old flag back
+    week.is_compacted = locked.is_compacted
+    return moved
+
+
+def compact_week(week, verify=False):
+    """
+    Roll a locked week's attendance into one summary row per labourer.
+
+    The attendance rows move to the archive table untouched. With verify
+    the week's totals and balances are compared before and after, and
+    everything is rolled back if they differ. Returns the number of
+    summaries written and rows archived.
+    """
+
+    def move_rows(week):
+        if week.is_compacted:
+            raise CompactionError(f"{week} is already compacted.")
+        if week.admin_unlocked:
+            raise CompactionError(f"{week} is open, lock it first.")
+
+        rows = models.LabourAttendance.objects.filter(week=week)
+        summaries = models.WeekLabourSummary.objects.bulk_create(
+            [
+                models.WeekLabourSummary(
+                    week=week,
+                    labour_id=row["labour"],
+                    days_present=row["days_present"],
+                    units=row["units"] or 0,
+                    earned=row["earned"] or ledger.ZERO,
+                    advance=row["advance"] or ledger.ZERO,
+                )
+                for row in ledger.grouped_attendance(rows).annotate(
+                    days_present=Count("id", filter=Q(is_present=True))
+                )
+            ]
+        )
+        archived = models.ArchivedLabourAttendance.objects.bulk_create(
+            [models.ArchivedLabourAttendance(**row) for row in rows.values(*ROW_FIELDS)]
+        )
+        rows.delete()
+
+        week.is_compacted = True
+        week.save(update_fields=["is_compacted"])
+        return len(summaries), len(archived)
+
+    return _move(week, verify, move_rows)
+
+
+def expand_week(week, verify=False):
+    """
+    Undo compact_week: put the archived rows back and drop the summaries.
+    Does nothing for a week that isn't compacted. Returns the number of
+    rows restored.
+    """
+    if not week.is_compacted:
+        return 0
+
+    def move_rows(week):
+        if not week.is_compacted:
+            return 0
+
+        archived = models.ArchivedLabourAttendance.objects.filter(week=week)
+        restored = models.LabourAttendance.objects.bulk_create(
+            [models.LabourAttendance(**row) for row in archived.values(*ROW_FIELDS)]
+        )
+        archived.delete()
+        models.WeekLabourSummary.objects.filter(week=week).delete()
+
+        week.is_compacted = False
+        week.save(update_fields=["is_compacted"])
+        return len(restored)
+
+    return _move(week, verify, move_rows)
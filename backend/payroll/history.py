@@ -0,0 +1,93 @@
+"""
+One labourer's payroll week by week, newest first.
+
+Every week the labourer is on comes from their assignments, with what the
+ledger moved in it, zero for a week without any movement, and the running
+balance summed over the weeks by a window function. Keyset pages filter
+out the newer weeks only, so the window still sees every week before the
+page and the balance is right on any page. Days and units are read for
+the weeks of the page alone.
+"""
+
+from itertools import chain
+
+from django.db.models import (
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    Window,
+)
+from django.db.models.functions import Coalesce
+
+from . import ledger as ledger
+from . import models as models
+
+
+def _moved(labour, field):
+    """What the ledger moved in field for the labourer in the outer week."""
+    return Coalesce(
+        Subquery(
+            models.LabourLedgerEntry.objects.filter(
+                labour=labour, week=OuterRef("week")
+            )
+            .values("week")
+            .annotate(total=Sum(field))
+            .values("total")
+        ),
+        Value(ledger.ZERO),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def weeks(labour):
+    """The labourer's weeks with what was earned, advanced and paid in them."""
+    # Weeks of the same start are ordered by id, so every week has its own
+    # place in the running sum
+    return (
+        models.WeekLabourAssignment.objects.filter(labour=labour)
+        .values("week", "week__site__name", week_start=F("week__start_date"))
+        .annotate(
+            week_earned=_moved(labour, "earned"),
+            week_advance=_moved(labour, "advance"),
+            week_paid=_moved(labour, "paid"),
+        )
+        .annotate(
+            running_net=Window(
+                Sum(F("week_earned") - F("week_advance") - F("week_paid")),
+                order_by=[F("week_start").asc(), F("week").asc()],
+            ),
+        )
+    )
+
+
+def with_attendance(labour, rows):
+    """
+    Add days, units, daily wage and the balance after the week to a page
+    of weeks() rows. Three queries whatever the page size.
+    """
+    week_ids = [row["week"] for row in rows]
+    live = ledger.grouped_attendance(
+        models.LabourAttendance.objects.filter(week__in=week_ids, labour=labour)
+    ).annotate(days_present=Count("id", filter=Q(is_present=True)))
+    summaries = models.WeekLabourSummary.objects.filter(
+        week__in=week_ids, labour=labour
+    ).values("week", "days_present", *ledger.ATTENDANCE_AGGREGATES)
+    attendance = {row["week"]: row for row in chain(live, summaries)}
+    wages = dict(
+        models.WeekLabourAssignment.objects.filter(
+            week__in=week_ids, labour=labour
+        ).values_list("week", "weekly_daily_wage")
+    )
+
+    for row in rows:
+        days = attendance.get(row["week"]) or {}
+        row["days"] = days.get("days_present") or 0
+        row["units"] = days.get("units") or 0
+        row["wage"] = wages.get(row["week"])
+        row["balance"] = labour.previous_balance + row["running_net"]
+    return rows
@@ -0,0 +1,307 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db.models import (
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Cast
+
+from labours import models as labours_models
+
+from . import models as models
+
+Totals = namedtuple("Totals", ["earned", "advance", "paid"])
+
+ZERO = Decimal("0.00")
+EMPTY = Totals(ZERO, ZERO, ZERO)
+
+# Billable units (multipliers of present days), pay and advances of attendance
+ATTENDANCE_AGGREGATES = {
+    "units": Sum("multiplier", filter=Q(is_present=True)),
+    # Multipliers are floats, like 1/3 or 0.125. The pay is multiplied at
+    # that precision and only the sum is rounded to paise.
+    "earned": Cast(
+        Sum(
+            ExpressionWrapper(
+                F("daily_wage") * F("multiplier"), output_field=FloatField()
+            ),
+            filter=Q(is_present=True),
+        ),
+        DecimalField(max_digits=14, decimal_places=2),
+    ),
+    "advance": Sum("advance_taken"),
+}
+
+
+def earnings(row):
+    """Pay of an attendance_totals row: daily wage times each day's multiplier."""
+    return (row.get("earned") or ZERO).quantize(ZERO)
+
+
+def grouped_attendance(attendance):
+    """The attendance queryset grouped per (week, labour) with the aggregates."""
+    return attendance.values("week", "labour").annotate(**ATTENDANCE_AGGREGATES)
+
+
+def attendance_totals(week_ids=None, labour_ids=None):
+    """
+    Billable units, pay and advances per (week, labour).
+
+    Grouped from the attendance rows, plus the summary rows of compacted
+    weeks which have the same fields. Two queries.
+    """
+    attendance = models.LabourAttendance.objects.all()
+    summaries = models.WeekLabourSummary.objects.all()
+    if week_ids is not None:
+        attendance = attendance.filter(week__in=week_ids)
+        summaries = summaries.filter(week__in=week_ids)
+    if labour_ids is not None:
+        attendance = attendance.filter(labour__in=labour_ids)
+        summaries = summaries.filter(labour__in=labour_ids)
+
+    totals = {
+        (row["week"], row["labour"]): row for row in grouped_attendance(attendance)
+    }
+    # A labourer's week has either attendance rows or a summary
+    for row in summaries.values("week", "labour", *ATTENDANCE_AGGREGATES):
+        totals[(row["week"], row["labour"])] = row
+    return totals
+
+
+def week_totals(week_ids=None, labour_ids=None):
+    """
+    Earnings, advances and payments per (week, labour) from the raw tables.
+
+    Attendance rows carry their daily wage, so the pay is summed with the
+    rest of the grouped attendance totals and the assignments only add
+    the payments.
+    """
+    assignments = models.WeekLabourAssignment.objects.all()
+    if week_ids is not None:
+        assignments = assignments.filter(week__in=week_ids)
+    if labour_ids is not None:
+        assignments = assignments.filter(labour__in=labour_ids)
+
+    grouped = attendance_totals(week_ids, labour_ids)
+
+    totals = {}
+    for week_id, labour_id, paid in assignments.values_list(
+        "week", "labour", "week_payment__amount_paid"
+    ):
+        row = grouped.pop((week_id, labour_id), None) or {}
+        totals[(week_id, labour_id)] = Totals(
+            earnings(row),
+            row.get("advance") or ZERO,
+            paid or ZERO,
+        )
+
+    # Attendance without an assignment has no wage, advances still count
+    for key, row in grouped.items():
+        totals[key] = Totals(ZERO, row["advance"] or ZERO, ZERO)
+
+    return totals
+
+
+def _sum_by_labour(entries):
+    return {
+        row["labour"]: Totals(row["earned"], row["advance"], row["paid"])
+        for row in entries.values("labour").annotate(
+            earned=Sum("earned"),
+            advance=Sum("advance"),
+            paid=Sum("paid"),
+        )
+    }
+
+
+def recorded_week_totals(week, labour_ids=None):
+    """Sum of the ledger movements already recorded for a week, per labour."""
+    entries = models.LabourLedgerEntry.objects.filter(week=week)
+    if labour_ids is not None:
+        entries = entries.filter(labour__in=labour_ids)
+    return _sum_by_labour(entries)
+
+
+def week_start_totals(week_start, labour_ids):
+    """
+    Ledger movements of every week starting on week_start, per labour, on
+    whichever site.
+    """
+    return _sum_by_labour(
+        models.LabourLedgerEntry.objects.filter(
+            labour__in=labour_ids, week_start=week_start
+        )
+    )
+
+
+def latest_entries(labour_ids):
+    """The newest ledger row of every labourer, keyed by labour id."""
+    last_ids = (
+        models.LabourLedgerEntry.objects.filter(labour__in=labour_ids)
+        .values("labour")
+        .annotate(last=Max("id"))
+        .values("last")
+    )
+    return {
+        entry.labour_id: entry
+        for entry in models.LabourLedgerEntry.objects.filter(id__in=last_ids)
+    }
+
+
+def append(week, deltas, source):
+    """
+    Append one ledger row per labourer in deltas ({labour_id: Totals}).
+
+    Must run inside a transaction, the labour rows are locked so two
+    requests can't compute running totals from the same previous row.
+    """
+    deltas = {labour_id: delta for labour_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return []
+
+    list(
+        labours_models.Labour.objects.select_for_update()
+        .filter(id__in=deltas.keys())
+        .values_list("id", flat=True)
+    )
+    latest = latest_entries(deltas.keys())
+
+    entries = []
+    for labour_id, delta in deltas.items():
+        previous = latest.get(labour_id)
+        entries.append(
+            models.LabourLedgerEntry(
+                labour_id=labour_id,
+                week=week,
+                week_start=week.start_date,
+                source=source,
+                earned=delta.earned,
+                advance=delta.advance,
+                paid=delta.paid,
+                total_earned=(previous.total_earned if previous else ZERO)
+                + delta.earned,
+                total_advance=(previous.total_advance if previous else ZERO)
+                + delta.advance,
+                total_paid=(previous.total_paid if previous else ZERO) + delta.paid,
+            )
+        )
+
+    # Snapshots from this week on no longer match what was paid out
+    models.WeekLabourBalanceSnapshot.objects.filter(
+        labour__in=deltas.keys(),
+        week_start__gte=week.start_date,
+    ).delete()
+
+    return models.LabourLedgerEntry.objects.bulk_create(entries)
+
+
+def sync_week(week, labour_ids=None, source=models.LedgerSource.ATTENDANCE):
+    """
+    Bring the ledger in line with the raw tables for one week.
+
+    Call it in the same transaction as any change to attendance, wages or
+    payments of the week; only the difference gets appended.
+    """
+    actual = {
+        labour_id: totals
+        for (_week_id, labour_id), totals in week_totals([week.id], labour_ids).items()
+    }
+    recorded = recorded_week_totals(week, labour_ids)
+
+    deltas = {}
+    for labour_id in actual.keys() | recorded.keys():
+        now = actual.get(labour_id, EMPTY)
+        before = recorded.get(labour_id, EMPTY)
+        deltas[labour_id] = Totals(
+            now.earned - before.earned,
+            now.advance - before.advance,
+            now.paid - before.paid,
+        )
+
+    return append(week, deltas, source)
+
+
+def reverse_week(week):
+    """Cancel out everything recorded for a week that is about to be deleted."""
+    deltas = {
+        labour_id: Totals(-totals.earned, -totals.advance, -totals.paid)
+        for labour_id, totals in recorded_week_totals(week).items()
+    }
+    return append(week, deltas, models.LedgerSource.WEEK_DELETED)
+
+
+def opening_totals(week, labour_ids):
+    """
+    What each labourer had earned, taken and been paid before a week.
+
+    Labourers with a locked week before this one start from its snapshot
+    and add the ledger movements of the weeks after it. Everyone else
+    starts from their newest ledger row, which holds the all-time totals,
+    and takes back the movements of this week and the ones after it.
+    Either way it is a handful of rows no matter how long they've worked.
+    Only the week's start date is used, so the labourers may come from
+    weeks of different sites that start on the same day.
+    """
+    labour_ids = list(labour_ids)
+
+    last_snapshot_start = (
+        models.WeekLabourBalanceSnapshot.objects.filter(
+            labour=OuterRef("labour"),
+            week_start__lt=week.start_date,
+        )
+        .order_by("-week_start")
+        .values("week_start")[:1]
+    )
+    # Snapshots of weeks starting the same day hold the same totals, the
+    # newest wins
+    snapshots = {
+        snapshot.labour_id: snapshot
+        for snapshot in models.WeekLabourBalanceSnapshot.objects.filter(
+            labour__in=labour_ids,
+            week_start=Subquery(last_snapshot_start),
+        ).order_by("created_at")
+    }
+
+    totals = {}
+    if snapshots:
+        since_snapshot = _sum_by_labour(
+            models.LabourLedgerEntry.objects.filter(
+                labour__in=snapshots.keys(),
+                week_start__lt=week.start_date,
+                week_start__gt=Subquery(last_snapshot_start),
+            )
+        )
+        for labour_id, snapshot in snapshots.items():
+            after = since_snapshot.get(labour_id, EMPTY)
+            totals[labour_id] = Totals(
+                snapshot.total_earned + after.earned,
+                snapshot.total_advance + after.advance,
+                snapshot.total_paid + after.paid,
+            )
+
+    labour_ids = [labour_id for labour_id in labour_ids if labour_id not in totals]
+    if not labour_ids:
+        return totals
+
+    latest = latest_entries(labour_ids)
+    later = _sum_by_labour(
+        models.LabourLedgerEntry.objects.filter(
+            labour__in=latest.keys(),
+            week_start__gte=week.start_date,
+        )
+    )
+    for labour_id, entry in latest.items():
+        after = later.get(labour_id, EMPTY)
+        totals[labour_id] = Totals(
+            entry.total_earned - after.earned,
+            entry.total_advance - after.advance,
+            entry.total_paid - after.paid,
+        )
+    return totals
@@ -0,0 +1,116 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import ledger as ledger
+from . import models as models
+
+
+def _empty_totals():
+    return {
+        "labours": 0,
+        "total_due": ledger.ZERO,
+        "due_bank_transfer": ledger.ZERO,
+        "due_cash": ledger.ZERO,
+        "advance": ledger.ZERO,
+        "advance_bank_transfer": ledger.ZERO,
+        "advance_cash": ledger.ZERO,
+        "paid": ledger.ZERO,
+    }
+
+
+def _split(totals, prefix, payment_type, amount):
+    if payment_type == models.PaymentType.CASH:
+        totals[f"{prefix}_cash"] += amount
+    else:
+        totals[f"{prefix}_bank_transfer"] += amount
+
+
+def payroll_liability(today=None):
+    """
+    What every active site owes its labourers for the week running today.
+
+    Returns per-site and grand totals of the amount due (the week sheet's
+    total_due_to_date summed over labourers), the advances given this week
+    and both split into bank transfer and cash. Due amounts are split by
+    the payment type of the week's payment, bank transfer if nothing has
+    been paid yet, advances by the payment type of the day.
+
+    Every week starts on a Saturday, so all current weeks share a start
+    date and the history of every labourer on every site comes from one
+    ledger read. The query count doesn't grow with sites or labourers.
+    """
+    today = today or timezone.now().date()
+
+    weeks = list(
+        models.Week.objects.filter(
+            site__is_active=True,
+            site__is_deleted=False,
+            start_date__lte=today,
+            start_date__gt=today - timedelta(days=7),
+        )
+        .select_related("site")
+        .order_by("site__name")
+    )
+    if not weeks:
+        return {"start_date": None, "sites": [], "totals": _empty_totals()}
+
+    assignments = list(
+        models.WeekLabourAssignment.objects.filter(week__in=weeks).values(
+            "week",
+            "labour",
+            "labour__previous_balance",
+            "week_payment__amount_paid",
+            "week_payment__payment_type",
+        )
+    )
+
+    grand_totals = _empty_totals()
+    per_week = defaultdict(_empty_totals)
+    # Pay is summed per (week, labour) and rounded once, like the week
+    # sheet. Only the advances are grouped by payment type, for the split.
+    attendance = ledger.attendance_totals([week.id for week in weeks])
+    for row in (
+        models.LabourAttendance.objects.filter(week__in=weeks)
+        .values("week", "payment_type")
+        .annotate(advance=Sum("advance_taken"))
+    ):
+        advance = row["advance"] or ledger.ZERO
+        totals = per_week[row["week"]]
+        totals["advance"] += advance
+        _split(totals, "advance", row["payment_type"], advance)
+
+    history = ledger.opening_totals(
+        weeks[0], [assignment["labour"] for assignment in assignments]
+    )
+
+    for assignment in assignments:
+        key = (assignment["week"], assignment["labour"])
+        before = history.get(assignment["labour"], ledger.EMPTY)
+        row = attendance.get(key, {})
+        due = (
+            assignment["labour__previous_balance"]
+            + before.earned
+            - (before.advance + before.paid)
+            + ledger.earnings(row)
+            - (row.get("advance") or ledger.ZERO)
+        )
+
+        totals = per_week[assignment["week"]]
+        totals["labours"] += 1
+        totals["total_due"] += due
+        totals["paid"] += assignment["week_payment__amount_paid"] or ledger.ZERO
+        _split(totals, "due", assignment["week_payment__payment_type"], due)
+
+    sites = []
+    for week in weeks:
+        totals = per_week[week.id]
+        sites.append(
+            {"site": week.site_id, "name": week.site.name, "week": week.id, **totals}
+        )
+        for field, value in totals.items():
+            grand_totals[field] += value
+
+    return {"start_date": weeks[0].start_date, "sites": sites, "totals": grand_totals}
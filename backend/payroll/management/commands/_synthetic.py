@@ -0,0 +1,128 @@
+"""
+Synthetic payroll data for the benchmark commands.
+
+Everything is written with bulk inserts, callers are expected to run it
+inside a transaction they roll back afterwards.
+"""
+
+import random
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+
+from labours import models as labours_models
+from payroll import models
+from sites import models as sites_models
+
+
+class Rollback(Exception):
+    """Raised at the end of a benchmark to throw its data away."""
+
+
+def last_saturday():
+    today = date.today()
+    return today - timedelta(days=(today.weekday() - 5) % 7)
+
+
+def build_site(labour_count, week_count, seed=0, batch_size=5000):
+    """
+    A site with labour_count labourers who all worked every one of the last
+    week_count weeks. Every week but the newest is locked and paid, and the
+    ledger and snapshots are rebuilt at the end like after a migration.
+    """
+    rng = random.Random(seed)
+
+    site = sites_models.Site.objects.create(name="Benchmark", address="-")
+    labours = labours_models.Labour.objects.bulk_create(
+        [
+            labours_models.Labour(
+                site=site,
+                name=f"Labour {i}",
+                type=labours_models.LabourType.DAILY_WORK,
+                gender=labours_models.GenderType.MALE,
+                previous_balance=Decimal(rng.randrange(0, 5000)),
+            )
+            for i in range(labour_count)
+        ]
+    )
+
+    first_start = last_saturday() - timedelta(weeks=week_count - 1)
+    weeks = models.Week.objects.bulk_create(
+        [
+            models.Week(
+                site=site,
+                start_date=first_start + timedelta(weeks=i),
+                admin_unlocked=i == week_count - 1,
+            )
+            for i in range(week_count)
+        ]
+    )
+    days = models.DailyEntry.objects.bulk_create(
+        [
+            models.DailyEntry(
+                week=week,
+                date=week.start_date + timedelta(days=i),
+                is_saved=True,
+            )
+            for week in weeks
+            for i in range(7)
+        ],
+        batch_size=batch_size,
+    )
+
+    assignments = models.WeekLabourAssignment.objects.bulk_create(
+        [
+            models.WeekLabourAssignment(
+                week=week,
+                labour=labour,
+                weekly_daily_wage=Decimal(rng.choice([500, 600, 750, 900])),
+            )
+            for week in weeks
+            for labour in labours
+        ],
+        batch_size=batch_size,
+    )
+    models.LabourPayment.objects.bulk_create(
+        [
+            models.LabourPayment(
+                labour=assignment,
+                amount_paid=Decimal(rng.randrange(2000, 4000)),
+                payment_type=rng.choice(models.PaymentType.values),
+            )
+            for assignment in assignments
+            if assignment.week_id != weeks[-1].id
+        ],
+        batch_size=batch_size,
+    )
+
+    wages = {
+        (assignment.week_id, assignment.labour_id): assignment.weekly_daily_wage
+        for assignment in assignments
+    }
+
+    attendance = []
+    for day in days:
+        for labour in labours:
+            attendance.append(
+                models.LabourAttendance(
+                    daily_entry=day,
+                    labour=labour,
+                    date=day.date,
+                    week_id=day.week_id,
+                    site=site,
+                    daily_wage=wages[(day.week_id, labour.id)],
+                    is_present=rng.random() < 0.85,
+                    advance_taken=Decimal(rng.choice([0, 0, 0, 100, 200])),
+                    multiplier=rng.choice([1, 1, 1, 0.5, 1.5]),
+                )
+            )
+            if len(attendance) >= batch_size:
+                models.LabourAttendance.objects.bulk_create(attendance)
+                attendance = []
+    models.LabourAttendance.objects.bulk_create(attendance)
+
+    call_command("rebuild_labour_ledger", site=str(site.id), stdout=StringIO())
+
+    return site, weeks
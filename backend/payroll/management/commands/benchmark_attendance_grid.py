@@ -0,0 +1,84 @@
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from payroll import models
+from payroll import serializers
+
+from ._synthetic import Rollback, build_site
+
+
+def nested_week(week):
+    week = models.Week.objects.prefetch_related("days__attendances").get(id=week.id)
+    return serializers.WeekRetrieveSerializer(week).data
+
+
+def columnar_week(week):
+    week = models.Week.objects.get(id=week.id)
+    return serializers.WeekColumnarRetrieveSerializer(week).data
+
+
+def nested_day(day):
+    day = models.DailyEntry.objects.prefetch_related(
+        "attendances", "week__labours"
+    ).get(id=day.id)
+    return serializers.DailyEntryWithLabourRetrieveSerializer(day).data
+
+
+def columnar_day(day):
+    day = models.DailyEntry.objects.select_related("week").get(id=day.id)
+    return serializers.DailyEntryColumnarRetrieveSerializer(day).data
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries, time and payload size of the nested and columnar "
+        "attendance grid responses on a synthetic site (rolled back)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--labours", type=int, default=200)
+        parser.add_argument("--weeks", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"Building {options['labours']} labourers x "
+                    f"{options['weeks']} weeks..."
+                )
+                _site, weeks = build_site(options["labours"], options["weeks"])
+                week = weeks[-1]
+                day = week.days.order_by("date").first()
+
+                for name, compute, instance in (
+                    ("week nested", nested_week, week),
+                    ("week columnar", columnar_week, week),
+                    ("day nested", nested_day, day),
+                    ("day columnar", columnar_day, day),
+                ):
+                    queries, seconds, size = self.measure(
+                        compute, instance, options["repeat"]
+                    )
+                    self.stdout.write(
+                        f"{name:<15} {queries:>4} queries "
+                        f"{seconds * 1000:>10.1f} ms {size / 1024:>10.1f} KiB"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, compute, instance, repeat):
+        renderer = JSONRenderer()
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = perf_counter()
+                body = renderer.render(compute(instance))
+                timings.append(perf_counter() - started)
+        return len(queries), mean(timings), len(body)
@@ -0,0 +1,75 @@
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from payroll import balances
+from payroll import columnar
+from payroll import ledger
+from payroll import models
+from payroll import partitions
+
+from ._synthetic import Rollback, build_site
+
+
+def current_week_queries(week):
+    list(ledger.grouped_attendance(models.LabourAttendance.objects.filter(week=week)))
+    balances.week_balances(week)
+    columnar.week_columns(week)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the current week's attendance queries before and after "
+        "partitioning attendance by date, on a synthetic site in a "
+        "transaction that is rolled back. PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--labours", type=int, default=200)
+        parser.add_argument("--weeks", type=int, default=156)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--interval",
+            choices=sorted(partitions.INTERVALS),
+            default="month",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            partitions.check_postgresql()
+        except partitions.PartitionError as error:
+            raise CommandError(error)
+        if partitions.is_partitioned():
+            raise CommandError("Attendance is already partitioned.")
+
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"Building {options['labours']} labourers x "
+                    f"{options['weeks']} weeks..."
+                )
+                _site, weeks = build_site(options["labours"], options["weeks"])
+                week = weeks[-1]
+
+                self.measure("single table", week, options["repeat"])
+                partitions.convert(options["interval"], 1, week.start_date)
+                self.measure(
+                    f"{len(partitions.partitions())} partitions",
+                    week,
+                    options["repeat"],
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, name, week, repeat):
+        # One warm-up run so both sides start with a warm cache
+        current_week_queries(week)
+        timings = []
+        for _ in range(repeat):
+            started = perf_counter()
+            current_week_queries(week)
+            timings.append(perf_counter() - started)
+        self.stdout.write(f"{name:<20} {mean(timings) * 1000:>10.1f} ms")
@@ -0,0 +1,90 @@
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast
+
+from payroll import ledger
+from payroll import models
+
+from ._synthetic import Rollback, build_site
+
+
+def looked_up_wages(week):
+    """History pay with the wage looked up per attendance row, as before."""
+    wage = models.WeekLabourAssignment.objects.filter(
+        week=OuterRef("daily_entry__week"),
+        labour=OuterRef("labour"),
+    ).values("weekly_daily_wage")[:1]
+
+    return {
+        row["labour"]: (row["earned"] or ledger.ZERO).quantize(ledger.ZERO)
+        for row in models.LabourAttendance.objects.filter(
+            daily_entry__date__lt=week.start_date, is_present=True
+        )
+        .annotate(base_wage=Subquery(wage, output_field=DecimalField()))
+        .values("labour")
+        .annotate(
+            earned=Sum(
+                F("base_wage")
+                * Cast("multiplier", DecimalField(max_digits=5, decimal_places=2)),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            )
+        )
+    }
+
+
+def stored_wages(week):
+    """History pay summed from the wage copied onto each attendance row."""
+    return {
+        row["labour"]: ledger.earnings(row)
+        for row in models.LabourAttendance.objects.filter(date__lt=week.start_date)
+        .values("labour")
+        .annotate(earned=ledger.ATTENDANCE_AGGREGATES["earned"])
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare summing history pay with a wage lookup per attendance row "
+        "against the wage stored on the row, on a synthetic site with three "
+        "years of weeks (rolled back)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--labours", type=int, default=100)
+        parser.add_argument("--weeks", type=int, default=156)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"Building {options['labours']} labourers x "
+                    f"{options['weeks']} weeks..."
+                )
+                _site, weeks = build_site(options["labours"], options["weeks"])
+                week = weeks[-1]
+
+                results = {}
+                for name, compute in (
+                    ("wage lookup", looked_up_wages),
+                    ("stored wage", stored_wages),
+                ):
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        started = perf_counter()
+                        results[name] = compute(week)
+                        timings.append(perf_counter() - started)
+                    self.stdout.write(f"{name:<15} {mean(timings) * 1000:>10.1f} ms")
+
+                mismatched = sum(
+                    results["wage lookup"].get(labour_id) != earned
+                    for labour_id, earned in results["stored wage"].items()
+                )
+                self.stdout.write(f"history pay mismatches: {mismatched}")
+                raise Rollback
+        except Rollback:
+            pass
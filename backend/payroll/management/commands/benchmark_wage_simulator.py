@@ -0,0 +1,96 @@
+from time import perf_counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from payroll import simulator
+
+from ._synthetic import Rollback, build_site
+
+SCENARIOS = [
+    {"name": "+5%", "wage_factor": 1.05},
+    {"name": "+10%", "wage_factor": 1.10},
+    {"name": "+50 a day", "wage_increase": 50},
+    {"name": "minimum 600", "minimum_wage": 600},
+    {"name": "overtime x2", "multipliers": {"1.5": 2}},
+    {"name": "+10% from a year ago", "wage_factor": 1.10, "from_date": None},
+]
+
+
+def synthetic_history(labour_count, week_count, seed=0):
+    """
+    A History shaped like a busy site's: every labourer works every week,
+    with one to three multipliers a week.
+    """
+    rng = np.random.default_rng(seed)
+    groups = labour_count * week_count * 2
+
+    week_starts = np.datetime64("2024-01-06") + np.arange(week_count) * 7
+    labour = rng.integers(0, labour_count, groups, dtype=np.int32)
+    week = rng.integers(0, week_count, groups, dtype=np.int32)
+    wage = rng.choice([500.0, 600.0, 750.0, 900.0], groups)
+
+    return simulator.History(
+        labour_ids=list(range(labour_count)),
+        week_starts=week_starts,
+        labour=labour,
+        week=week,
+        multiplier=rng.choice([0.5, 1.0, 1.5], groups),
+        wage=wage,
+        days=rng.integers(1, 7, groups).astype(np.float64),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time loading a synthetic site's history from the database and the "
+        "wage simulator's scenarios on it, separately (rolled back). "
+        "--in-memory skips the database and simulates a generated history, "
+        "for sizes too big to seed (5000 labourers x 3 years)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--labours", type=int, default=200)
+        parser.add_argument("--weeks", type=int, default=156)
+        parser.add_argument("--in-memory", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["in_memory"]:
+            self.simulate(synthetic_history(options["labours"], options["weeks"]))
+            return
+
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"Building {options['labours']} labourers x "
+                    f"{options['weeks']} weeks..."
+                )
+                site, _weeks = build_site(options["labours"], options["weeks"])
+
+                started = perf_counter()
+                history = simulator.History.load(site.id)
+                seconds = perf_counter() - started
+                self.stdout.write(
+                    f"load: {len(history.labour):,} groups in {seconds * 1000:.1f} ms"
+                )
+
+                self.simulate(history)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def simulate(self, history):
+        scenarios = [dict(scenario) for scenario in SCENARIOS]
+        scenarios[-1]["from_date"] = str(history.week_starts[-52])
+
+        started = perf_counter()
+        deltas = np.stack([history.simulate(scenario) for scenario in scenarios])
+        seconds = perf_counter() - started
+
+        self.stdout.write(
+            f"simulate: {len(history.labour):,} groups, {len(scenarios)} "
+            f"scenarios in {seconds * 1000:.1f} ms"
+        )
+        for scenario, total in zip(scenarios, deltas.sum(axis=1)):
+            self.stdout.write(f"  {scenario['name']:<25} {total:>18,.2f}")
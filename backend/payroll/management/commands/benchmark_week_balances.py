@@ -0,0 +1,172 @@
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import (
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.test.utils import CaptureQueriesContext
+
+from payroll import balances
+from payroll import models
+
+from ._synthetic import Rollback, build_site
+
+
+def legacy_week_balances(week):
+    """The five correlated subqueries the week sheet used before the engine."""
+    start_date = week.start_date
+
+    wage_lookup_sql = models.WeekLabourAssignment.objects.filter(
+        week=OuterRef("daily_entry__week"),
+        labour=OuterRef("labour"),
+    ).values("weekly_daily_wage")[:1]
+
+    history_earned_subquery = (
+        models.LabourAttendance.objects.filter(
+            labour=OuterRef("labour"),
+            daily_entry__date__lt=start_date,
+            is_present=True,
+        )
+        .annotate(base_wage=Subquery(wage_lookup_sql, output_field=DecimalField()))
+        .annotate(
+            day_pay=ExpressionWrapper(
+                F("base_wage") * F("multiplier"), output_field=DecimalField()
+            )
+        )
+        .values("labour")
+        .annotate(total=Sum("day_pay"))
+        .values("total")
+    )
+    history_advance_subquery = (
+        models.LabourAttendance.objects.filter(
+            labour=OuterRef("labour"),
+            daily_entry__date__lt=start_date,
+        )
+        .values("labour")
+        .annotate(total=Sum("advance_taken"))
+        .values("total")
+    )
+    history_paid_subquery = (
+        models.LabourPayment.objects.filter(
+            labour__labour=OuterRef("labour"),
+            labour__week__start_date__lt=start_date,
+        )
+        .values("labour__labour")
+        .annotate(total=Sum("amount_paid"))
+        .values("total")
+    )
+    current_advance_subquery = (
+        models.LabourAttendance.objects.filter(
+            labour=OuterRef("labour"),
+            daily_entry__week=week,
+        )
+        .values("labour")
+        .annotate(total=Sum("advance_taken"))
+        .values("total")
+    )
+    current_billable_units_subquery = (
+        models.LabourAttendance.objects.filter(
+            labour=OuterRef("labour"),
+            daily_entry__week=week,
+            is_present=True,
+        )
+        .values("labour")
+        .annotate(total_units=Sum("multiplier"))
+        .values("total_units")
+    )
+
+    def coalesced(subquery):
+        return Coalesce(
+            Subquery(subquery, output_field=DecimalField()),
+            Value(0, output_field=DecimalField()),
+        )
+
+    assignments = (
+        models.WeekLabourAssignment.objects.filter(week=week)
+        .select_related("labour")
+        .prefetch_related("week_payment")
+        .annotate(
+            hist_earned=coalesced(history_earned_subquery),
+            hist_advance=coalesced(history_advance_subquery),
+            hist_paid=coalesced(history_paid_subquery),
+            curr_advance=coalesced(current_advance_subquery),
+            curr_earned=ExpressionWrapper(
+                coalesced(current_billable_units_subquery) * F("weekly_daily_wage"),
+                output_field=DecimalField(),
+            ),
+        )
+        .annotate(
+            opening_balance=(
+                F("labour__previous_balance")
+                + F("hist_earned")
+                - (F("hist_advance") + F("hist_paid"))
+            ),
+        )
+    )
+
+    if not assignments.exists():
+        return []
+    return list(assignments)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare query count and time of the week balance engine with the "
+        "old per-labourer subqueries on a synthetic site (rolled back)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--labours", type=int, default=200)
+        parser.add_argument("--weeks", type=int, default=52)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"Building {options['labours']} labourers x "
+                    f"{options['weeks']} weeks..."
+                )
+                _site, weeks = build_site(options["labours"], options["weeks"])
+                week = weeks[-1]
+
+                legacy = self.measure(legacy_week_balances, week, options["repeat"])
+                engine = self.measure(balances.week_balances, week, options["repeat"])
+
+                mismatched = sum(
+                    abs(old.opening_balance - new.opening_balance) > 0.01
+                    for old, new in zip(
+                        sorted(legacy[2], key=lambda a: a.id),
+                        sorted(engine[2], key=lambda a: a.id),
+                    )
+                )
+
+                for name, (queries, seconds, _rows) in (
+                    ("legacy subqueries", legacy),
+                    ("balance engine", engine),
+                ):
+                    self.stdout.write(
+                        f"{name:<20} {queries:>4} queries {seconds * 1000:>10.1f} ms"
+                    )
+                self.stdout.write(f"opening balance mismatches: {mismatched}")
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, compute, week, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = perf_counter()
+                rows = compute(week)
+                timings.append(perf_counter() - started)
+        return len(queries), mean(timings), rows
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll import compaction
+from payroll import models
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll the attendance of locked, paid weeks into one summary row per "
+        "labourer and archive the rows, or bring them back with --expand."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=8,
+            help="Only weeks that ended more than this many weeks ago.",
+        )
+        parser.add_argument("--site", help="Limit to one site (uuid).")
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Compare every week's totals and balances before and after, "
+            "and undo the week if they differ.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the weeks that would be compacted.",
+        )
+        parser.add_argument(
+            "--expand",
+            action="append",
+            metavar="WEEK",
+            help="Un-compact this week (uuid), can be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        if options["expand"]:
+            for week in models.Week.objects.filter(id__in=options["expand"]):
+                restored = self.run(compaction.expand_week, week, options["verify"])
+                self.stdout.write(f"{week}: {restored} rows restored")
+            return
+
+        weeks = compaction.compactable_weeks(timedelta(weeks=options["older_than"]))
+        if options["site"]:
+            weeks = weeks.filter(site=options["site"])
+
+        summaries = archived = 0
+        for week in weeks.select_related("site"):
+            if options["dry_run"]:
+                self.stdout.write(f"{week.site.name}: {week}")
+                continue
+            written, moved = self.run(compaction.compact_week, week, options["verify"])
+            summaries += written
+            archived += moved
+            self.stdout.write(f"{week.site.name}: {week}, {moved} rows -> {written}")
+
+        if not options["dry_run"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Archived {archived} attendance rows into {summaries} summaries."
+                )
+            )
+
+    def run(self, move, week, verify):
+        try:
+            return move(week, verify=verify)
+        except compaction.CompactionError as error:
+            raise CommandError(error)
@@ -0,0 +1,73 @@
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll import history
+from payroll import ledger
+from payroll import models
+from payroll import muster
+
+# The table the denormalized attendance columns let these queries skip
+DAILY_ENTRY_TABLE = models.DailyEntry._meta.db_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the query plans of the payroll queries behind the week "
+        "sheet, payments, ledger, labour history and muster roll, and fail if "
+        "any of them still joins the daily entries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--week", help="Week to plan for, the latest if left out")
+
+    def handle(self, *args, **options):
+        week = models.Week.objects.order_by("-start_date")
+        if options["week"]:
+            week = week.filter(id=options["week"])
+        # Without data the plans are made for made up ids
+        week = week.first() or models.Week(
+            id=uuid.uuid4(), site_id=uuid.uuid4(), start_date=date.today()
+        )
+        labour_ids = list(
+            models.WeekLabourAssignment.objects.filter(week=week.id).values_list(
+                "labour", flat=True
+            )
+        ) or [uuid.uuid4()]
+
+        queries = {
+            # balances.week_balances, used by the week sheet and payments
+            "week sheet and payments": ledger.grouped_attendance(
+                models.LabourAttendance.objects.filter(week=week.id)
+            ),
+            # ledger.week_totals when a week's attendance is saved
+            "ledger sync": ledger.grouped_attendance(
+                models.LabourAttendance.objects.filter(
+                    week__in=[week.id], labour__in=labour_ids
+                )
+            ),
+            "history pay": ledger.grouped_attendance(
+                models.LabourAttendance.objects.filter(
+                    labour__in=labour_ids, date__lt=week.start_date
+                )
+            ),
+            # The labour payroll history page, keyset filters only trim it
+            "labour payroll history": history.weeks(labour_ids[0]).order_by(
+                "-week_start", "-week"
+            )[:20],
+            "muster roll": muster.muster_rows(
+                week.site_id, week.start_date - timedelta(days=365), week.start_date
+            ),
+        }
+
+        joined = []
+        for name, queryset in queries.items():
+            plan = queryset.explain()
+            self.stdout.write(f"-- {name}\n{plan}\n")
+            if DAILY_ENTRY_TABLE in plan:
+                joined.append(name)
+
+        if joined:
+            raise CommandError(f"{DAILY_ENTRY_TABLE} is joined by: {', '.join(joined)}")
+        self.stdout.write(self.style.SUCCESS(f"No query joins {DAILY_ENTRY_TABLE}."))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll import punches
+from sites import models as sites_models
+
+
+class Command(BaseCommand):
+    help = (
+        "Import an attendance terminal's CSV punch log into a site's "
+        "attendance, or only show what would change with --dry-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="The CSV punch log.")
+        parser.add_argument("--site", required=True, help="The site (uuid).")
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--full-day-hours",
+            type=float,
+            default=punches.DEFAULT_RULES.full_day_hours,
+        )
+        parser.add_argument(
+            "--half-day-hours",
+            type=float,
+            default=punches.DEFAULT_RULES.half_day_hours,
+        )
+        parser.add_argument(
+            "--overtime-hours",
+            type=float,
+            default=punches.DEFAULT_RULES.overtime_hours,
+            help="Hours beyond a full day that add half a day.",
+        )
+
+    def handle(self, *args, **options):
+        if not sites_models.Site.objects.filter(id=options["site"]).exists():
+            raise CommandError(f"No site {options['site']}.")
+
+        rules = punches.PunchRules(
+            options["full_day_hours"],
+            options["half_day_hours"],
+            options["overtime_hours"],
+        )
+        try:
+            with open(options["file"], encoding="utf-8-sig", newline="") as lines:
+                report = punches.import_punches(
+                    options["site"], lines, rules, dry_run=options["dry_run"]
+                )
+        except (OSError, punches.PunchImportError) as error:
+            raise CommandError(error)
+
+        if options["verbosity"] > 1:
+            for change in report["diff"]:
+                self.stdout.write(
+                    f"{change['date']} {change['name']}: "
+                    f"{change['before']} -> {change['after']}"
+                )
+        for reason, skipped in report["skipped"].items():
+            if skipped:
+                self.stdout.write(f"Skipped {reason.replace('_', ' ')}: {skipped}")
+
+        verb = "Would write" if options["dry_run"] else "Wrote"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {report['punches']} punches. {verb} {report['inserted']} "
+                f"new and {report['updated']} changed days, "
+                f"{report['unchanged']} unchanged."
+            )
+        )
@@ -0,0 +1,76 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payroll import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the date partitions of attendance on PostgreSQL: convert "
+        "the table once with --convert, then run regularly to create the "
+        "coming partitions and detach old ones with --detach-before. "
+        "Only partitions of compacted weeks are detached, payroll reads "
+        "their archived rows and summaries instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Turn the attendance table into a partitioned one first.",
+        )
+        parser.add_argument(
+            "--interval",
+            choices=sorted(partitions.INTERVALS),
+            default="month",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Partitions to have ready after the current one.",
+        )
+        parser.add_argument(
+            "--detach-before",
+            type=date.fromisoformat,
+            help="Detach the partitions ending on or before this date.",
+        )
+        parser.add_argument(
+            "--archive-schema",
+            help="Schema to move detached partitions to.",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        interval = options["interval"]
+
+        try:
+            partitions.check_postgresql()
+
+            if options["convert"]:
+                if partitions.is_partitioned():
+                    raise CommandError("Attendance is already partitioned.")
+                partitions.convert(interval, options["ahead"], today)
+                self.stdout.write(self.style.SUCCESS("Attendance is now partitioned."))
+            elif not partitions.is_partitioned():
+                raise CommandError("Attendance isn't partitioned, use --convert.")
+
+            start = partitions.period_start(today, interval)
+            end = start
+            for _ in range(options["ahead"] + 1):
+                end = partitions.next_period(end, interval)
+            for name in partitions.ensure_partitions(start, end, interval):
+                self.stdout.write(f"Created {name}")
+
+            if options["detach_before"]:
+                for name in partitions.detach(
+                    options["detach_before"], options["archive_schema"]
+                ):
+                    self.stdout.write(f"Detached {name}")
+        except partitions.PartitionError as error:
+            raise CommandError(error)
+
+        for name, start, end in partitions.partitions():
+            self.stdout.write(f"{name:<40} {start} .. {end}")
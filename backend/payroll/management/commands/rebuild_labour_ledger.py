@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from labours import models as labours_models
+from payroll import ledger
+from payroll import models
+from payroll import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the labour ledger from attendance, assignments and payments, "
+        "or check it and the locked week snapshots against them with --check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare the ledger with the raw tables, don't write.",
+        )
+        parser.add_argument(
+            "--site",
+            help="Limit to the labourers of one site (uuid).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        labours = labours_models.Labour.objects.all()
+        if options["site"]:
+            labours = labours.filter(site=options["site"])
+        labour_ids = list(labours.values_list("id", flat=True))
+
+        week_starts = dict(models.Week.objects.values_list("id", "start_date"))
+        raw = ledger.week_totals(labour_ids=labour_ids)
+
+        if options["check"]:
+            self.check_ledger(labour_ids, raw)
+        else:
+            self.rebuild(labour_ids, raw, week_starts, options["batch_size"])
+
+    def rebuild(self, labour_ids, raw, week_starts, batch_size):
+        per_labour = defaultdict(list)
+        for (week_id, labour_id), totals in raw.items():
+            per_labour[labour_id].append((week_starts[week_id], week_id, totals))
+
+        entries = []
+        for labour_id, weeks in per_labour.items():
+            running = ledger.EMPTY
+            for week_start, week_id, totals in sorted(weeks):
+                if not any(totals):
+                    continue
+                running = ledger.Totals(*(a + b for a, b in zip(running, totals)))
+                entries.append(
+                    models.LabourLedgerEntry(
+                        labour_id=labour_id,
+                        week_id=week_id,
+                        week_start=week_start,
+                        source=models.LedgerSource.REBUILD,
+                        earned=totals.earned,
+                        advance=totals.advance,
+                        paid=totals.paid,
+                        total_earned=running.earned,
+                        total_advance=running.advance,
+                        total_paid=running.paid,
+                    )
+                )
+
+        locked_weeks = (
+            models.Week.objects.filter(admin_unlocked=False, labours__in=labour_ids)
+            .distinct()
+            .order_by("start_date")
+        )
+
+        with transaction.atomic():
+            models.LabourLedgerEntry.objects.filter(labour__in=labour_ids).delete()
+            models.LabourLedgerEntry.objects.bulk_create(entries, batch_size=batch_size)
+
+            # Oldest first, each week's snapshot starts from the one before
+            models.WeekLabourBalanceSnapshot.objects.filter(
+                labour__in=labour_ids
+            ).delete()
+            frozen = sum(len(snapshots.freeze_week(week)) for week in locked_weeks)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {len(entries)} ledger entries for {len(per_labour)} "
+                f"labourers and {frozen} snapshots."
+            )
+        )
+
+    def check_ledger(self, labour_ids, raw):
+        recorded = {
+            (row["week"], row["labour"]): ledger.Totals(
+                row["earned"], row["advance"], row["paid"]
+            )
+            for row in models.LabourLedgerEntry.objects.filter(labour__in=labour_ids)
+            .values("week", "labour")
+            .annotate(
+                earned=Sum("earned"),
+                advance=Sum("advance"),
+                paid=Sum("paid"),
+            )
+        }
+
+        mismatches = 0
+        for key in raw.keys() | recorded.keys():
+            expected = raw.get(key, ledger.EMPTY)
+            found = recorded.get(key, ledger.EMPTY)
+            if expected != found:
+                mismatches += 1
+                week_id, labour_id = key
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Week {week_id} labour {labour_id}: "
+                        f"expected {tuple(expected)}, ledger has {tuple(found)}"
+                    )
+                )
+
+        expected_totals = defaultdict(lambda: ledger.EMPTY)
+        for (_week_id, labour_id), totals in raw.items():
+            expected_totals[labour_id] = ledger.Totals(
+                *(a + b for a, b in zip(expected_totals[labour_id], totals))
+            )
+
+        for labour_id, entry in ledger.latest_entries(labour_ids).items():
+            running = ledger.Totals(
+                entry.total_earned, entry.total_advance, entry.total_paid
+            )
+            if running != expected_totals[labour_id]:
+                mismatches += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Labour {labour_id}: running totals {tuple(running)}, "
+                        f"expected {tuple(expected_totals[labour_id])}"
+                    )
+                )
+
+        mismatches += self.check_snapshots(labour_ids, raw)
+
+        if mismatches:
+            raise CommandError(f"Ledger is out of sync ({mismatches} mismatches).")
+
+        self.stdout.write(self.style.SUCCESS("Ledger matches the raw tables."))
+
+    def check_snapshots(self, labour_ids, raw):
+        week_starts = dict(models.Week.objects.values_list("id", "start_date"))
+        per_labour = defaultdict(list)
+        for (week_id, labour_id), totals in raw.items():
+            per_labour[labour_id].append((week_starts[week_id], totals))
+
+        mismatches = 0
+        for snapshot in models.WeekLabourBalanceSnapshot.objects.filter(
+            labour__in=labour_ids
+        ):
+            expected = ledger.EMPTY
+            for week_start, totals in per_labour[snapshot.labour_id]:
+                if week_start <= snapshot.week_start:
+                    expected = ledger.Totals(*(a + b for a, b in zip(expected, totals)))
+
+            found = ledger.Totals(
+                snapshot.total_earned, snapshot.total_advance, snapshot.total_paid
+            )
+            if found != expected:
+                mismatches += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Snapshot {snapshot.id}: totals {tuple(found)}, "
+                        f"expected {tuple(expected)}"
+                    )
+                )
+
+        return mismatches
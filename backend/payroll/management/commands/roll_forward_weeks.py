@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll import rollforward
+
+
+class Command(BaseCommand):
+    help = (
+        "Open next week for every active site, carrying over the labourers "
+        "and wages of each site's previous week."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start-date",
+            type=date.fromisoformat,
+            help="Saturday the week starts on (default: the coming Saturday).",
+        )
+        parser.add_argument(
+            "--site",
+            action="append",
+            dest="sites",
+            help="Only this site (uuid), can be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        start_date = options["start_date"] or rollforward.next_saturday()
+        if start_date.weekday() != 5:
+            raise CommandError("The start date must be a Saturday.")
+
+        report = rollforward.roll_forward(start_date, options["sites"])
+
+        for row in report:
+            if row.get("skipped"):
+                status = self.style.WARNING(row["skipped"])
+            else:
+                status = self.style.SUCCESS(f"{row['labours']} labourers")
+            self.stdout.write(f"{row['name']:<30} {row['seconds']:>8.3f}s  {status}")
+
+        total = sum(row["seconds"] for row in report)
+        self.stdout.write(f"Week of {start_date}: {len(report)} sites in {total:.3f}s")
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labours", "0001_initial"),
+        ("payroll", "0005_labourattendance_multiplier"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LabourLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("week_start", models.DateField()),
+                (
+                    "source",
+                    models.IntegerField(
+                        choices=[
+                            (1, "Attendance"),
+                            (2, "Payment"),
+                            (3, "Assignment"),
+                            (4, "Week Deleted"),
+                            (5, "Rebuild"),
+                        ]
+                    ),
+                ),
+                (
+                    "earned",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "advance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "paid",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "total_earned",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total_advance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total_paid",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "labour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entries",
+                        to="labours.labour",
+                    ),
+                ),
+                (
+                    "week",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ledger_entries",
+                        to="payroll.week",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["labour", "-id"], name="payroll_lab_labour__8aa935_idx"
+                    ),
+                    models.Index(
+                        fields=["labour", "week_start"],
+                        name="payroll_lab_labour__40877c_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
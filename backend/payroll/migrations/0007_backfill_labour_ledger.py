@@ -0,0 +1,114 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:24
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import (
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Cast
+
+
+def backfill_ledger(apps, schema_editor):
+    Week = apps.get_model("payroll", "Week")
+    LabourAttendance = apps.get_model("payroll", "LabourAttendance")
+    WeekLabourAssignment = apps.get_model("payroll", "WeekLabourAssignment")
+    LabourLedgerEntry = apps.get_model("payroll", "LabourLedgerEntry")
+
+    zero = Decimal("0.00")
+
+    # Pay summed at the multipliers' precision and rounded once, the same
+    # as ledger.ATTENDANCE_AGGREGATES with the wage looked up per row
+    wage = WeekLabourAssignment.objects.filter(
+        week=OuterRef("daily_entry__week"), labour=OuterRef("labour")
+    ).values("weekly_daily_wage")[:1]
+    attendance = {
+        (row["daily_entry__week"], row["labour"]): row
+        for row in LabourAttendance.objects.values(
+            "daily_entry__week", "labour"
+        ).annotate(
+            earned=Cast(
+                Sum(
+                    ExpressionWrapper(
+                        Subquery(wage) * F("multiplier"), output_field=FloatField()
+                    ),
+                    filter=Q(is_present=True),
+                ),
+                DecimalField(max_digits=14, decimal_places=2),
+            ),
+            advance=Sum("advance_taken"),
+        )
+    }
+
+    per_labour = defaultdict(list)
+    assignments = WeekLabourAssignment.objects.values(
+        "week",
+        "week__start_date",
+        "labour",
+        "weekly_daily_wage",
+        "week_payment__amount_paid",
+    )
+    for assignment in assignments.iterator():
+        key = (assignment["week"], assignment["labour"])
+        row = attendance.pop(key, None) or {}
+        per_labour[assignment["labour"]].append(
+            (
+                assignment["week__start_date"],
+                assignment["week"],
+                row.get("earned") or zero,
+                row.get("advance") or zero,
+                assignment["week_payment__amount_paid"] or zero,
+            )
+        )
+
+    # Attendance without an assignment has no wage, advances still count
+    week_starts = dict(Week.objects.values_list("id", "start_date"))
+    for (week_id, labour_id), row in attendance.items():
+        per_labour[labour_id].append(
+            (week_starts[week_id], week_id, zero, row["advance"] or zero, zero)
+        )
+
+    entries = []
+    for labour_id, weeks in per_labour.items():
+        total_earned = total_advance = total_paid = zero
+        for week_start, week_id, earned, advance, paid in sorted(weeks):
+            if not (earned or advance or paid):
+                continue
+            total_earned += earned
+            total_advance += advance
+            total_paid += paid
+            entries.append(
+                LabourLedgerEntry(
+                    labour_id=labour_id,
+                    week_id=week_id,
+                    week_start=week_start,
+                    source=5,
+                    earned=earned,
+                    advance=advance,
+                    paid=paid,
+                    total_earned=total_earned,
+                    total_advance=total_advance,
+                    total_paid=total_paid,
+                )
+            )
+
+    LabourLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payroll", "0006_labourledgerentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
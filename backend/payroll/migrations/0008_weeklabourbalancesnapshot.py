@@ -0,0 +1,88 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:23
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labours", "0001_initial"),
+        ("payroll", "0007_backfill_labour_ledger"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeekLabourBalanceSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("week_start", models.DateField()),
+                (
+                    "opening_balance",
+                    models.DecimalField(decimal_places=2, max_digits=14),
+                ),
+                (
+                    "earned",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "advance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "paid",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "closing_balance",
+                    models.DecimalField(decimal_places=2, max_digits=14),
+                ),
+                (
+                    "total_earned",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total_advance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total_paid",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "assignment",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_snapshot",
+                        to="payroll.weeklabourassignment",
+                    ),
+                ),
+                (
+                    "labour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_snapshots",
+                        to="labours.labour",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["labour", "week_start"],
+                        name="payroll_wee_labour__a2d28d_idx",
+                    )
+                ],
+            },
+        ),
+    ]
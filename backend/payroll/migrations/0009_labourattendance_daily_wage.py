@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payroll", "0008_weeklabourbalancesnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="labourattendance",
+            name="daily_wage",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Copy of the labourer's daily wage for the week of this day.",
+                max_digits=10,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:34
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_daily_wage(apps, schema_editor):
+    LabourAttendance = apps.get_model("payroll", "LabourAttendance")
+    WeekLabourAssignment = apps.get_model("payroll", "WeekLabourAssignment")
+
+    # Rows without an assignment keep no wage, they never earned anything
+    LabourAttendance.objects.update(
+        daily_wage=Subquery(
+            WeekLabourAssignment.objects.filter(
+                week__days=OuterRef("daily_entry"),
+                labour=OuterRef("labour"),
+            ).values("weekly_daily_wage")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payroll", "0009_labourattendance_daily_wage"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_wage, migrations.RunPython.noop),
+    ]
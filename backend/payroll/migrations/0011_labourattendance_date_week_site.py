@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payroll", "0010_backfill_attendance_daily_wage"),
+        ("sites", "0003_alter_site_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="labourattendance",
+            name="date",
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="labourattendance",
+            name="site",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="labour_attendances",
+                to="sites.site",
+            ),
+        ),
+        migrations.AddField(
+            model_name="labourattendance",
+            name="week",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="attendances",
+                to="payroll.week",
+            ),
+        ),
+    ]
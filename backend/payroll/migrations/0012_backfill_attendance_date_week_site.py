@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:36
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_date_week_site(apps, schema_editor):
+    DailyEntry = apps.get_model("payroll", "DailyEntry")
+    LabourAttendance = apps.get_model("payroll", "LabourAttendance")
+
+    day = DailyEntry.objects.filter(id=OuterRef("daily_entry"))
+    LabourAttendance.objects.update(
+        date=Subquery(day.values("date")[:1]),
+        week=Subquery(day.values("week")[:1]),
+        site=Subquery(day.values("week__site")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payroll", "0011_labourattendance_date_week_site"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_date_week_site, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labours", "0001_initial"),
+        ("payroll", "0012_backfill_attendance_date_week_site"),
+        ("sites", "0003_alter_site_options"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="labourattendance",
+            name="date",
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name="labourattendance",
+            name="site",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="labour_attendances",
+                to="sites.site",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="labourattendance",
+            name="week",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="attendances",
+                to="payroll.week",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="labourattendance",
+            index=models.Index(
+                fields=["labour", "date"],
+                include=("is_present", "multiplier", "advance_taken", "daily_wage"),
+                name="payroll_att_labour_date_cov",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="labourattendance",
+            index=models.Index(
+                fields=["week", "labour"],
+                include=("is_present", "multiplier", "advance_taken", "daily_wage"),
+                name="payroll_att_week_labour_cov",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="labourattendance",
+            index=models.Index(fields=["site", "date"], name="payroll_att_site_date"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labours", "0001_initial"),
+        ("payroll", "0013_labourattendance_covering_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="labourattendance",
+            unique_together={("daily_entry", "labour", "date")},
+        ),
+    ]
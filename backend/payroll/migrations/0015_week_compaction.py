@@ -0,0 +1,134 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:40
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labours", "0001_initial"),
+        ("payroll", "0014_labourattendance_unique_with_date"),
+        ("sites", "0003_alter_site_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="week",
+            name="is_compacted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="ArchivedLabourAttendance",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("date", models.DateField()),
+                ("is_present", models.BooleanField(default=False)),
+                (
+                    "payment_type",
+                    models.IntegerField(
+                        choices=[(1, "Bank Transfer"), (2, "Cash")], default=1
+                    ),
+                ),
+                (
+                    "advance_taken",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("multiplier", models.FloatField(default=1)),
+                (
+                    "daily_wage",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "daily_entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_attendances",
+                        to="payroll.dailyentry",
+                    ),
+                ),
+                (
+                    "labour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_attendance_records",
+                        to="labours.labour",
+                    ),
+                ),
+                (
+                    "site",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_labour_attendances",
+                        to="sites.site",
+                    ),
+                ),
+                (
+                    "week",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_attendances",
+                        to="payroll.week",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["site", "date"], name="payroll_arc_site_id_63b742_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="WeekLabourSummary",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("days_present", models.PositiveSmallIntegerField(default=0)),
+                ("units", models.FloatField(default=0)),
+                (
+                    "earned",
+                    models.DecimalField(decimal_places=4, default=0, max_digits=16),
+                ),
+                (
+                    "advance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "labour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="week_summaries",
+                        to="labours.labour",
+                    ),
+                ),
+                (
+                    "week",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="labour_summaries",
+                        to="payroll.week",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("week", "labour")},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:46
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labours", "0001_initial"),
+        ("payroll", "0015_week_compaction"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttendanceMutation",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("key", models.CharField(max_length=64)),
+                ("client_timestamp", models.DateTimeField()),
+                (
+                    "status",
+                    models.IntegerField(
+                        choices=[
+                            (1, "Applied"),
+                            (2, "Stale"),
+                            (3, "Locked"),
+                            (4, "Invalid"),
+                        ]
+                    ),
+                ),
+                ("detail", models.CharField(blank=True, max_length=255)),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "daily_entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mutations",
+                        to="payroll.dailyentry",
+                    ),
+                ),
+                (
+                    "labour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attendance_mutations",
+                        to="labours.labour",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attendance_mutations",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["daily_entry", "labour", "client_timestamp"],
+                        name="payroll_att_daily_e_77f193_idx",
+                    )
+                ],
+                "unique_together": {("user", "key")},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payroll", "0016_attendancemutation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="labourledgerentry",
+            name="source",
+            field=models.IntegerField(
+                choices=[
+                    (1, "Attendance"),
+                    (2, "Payment"),
+                    (3, "Assignment"),
+                    (4, "Week Deleted"),
+                    (5, "Rebuild"),
+                    (6, "Wage Revision"),
+                ]
+            ),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
 from datetime import timedelta
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
@@ -37,6 +38,13 @@ class DailyEntry(models.Model):
             return True
         return self.date == timezone.now().date() and not self.is_saved
 
+    @property
+    def attendance_rows(self):
+        # A compacted week's rows are in the archive
+        if self.week.is_compacted:
+            return self.archived_attendances.all()
+        return self.attendances.all()
+
     class Meta:
         unique_together = ["week", "date"]
         ordering = ["date"]
@@ -63,6 +71,8 @@ class Week(models.Model):
         through="WeekLabourAssignment",
     )
     admin_unlocked = models.BooleanField(default=True)
+    # Attendance rolled into WeekLabourSummary rows, see compaction.py
+    is_compacted = models.BooleanField(default=False)
 
     @property
     def is_editable(self):
@@ -164,13 +174,58 @@ class LabourAttendance(models.Model):
         default=0,
     )
     multiplier = models.FloatField(default=1, blank=True)
+    daily_wage = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Copy of the labourer's daily wage for the week of this day.",
+    )
+    # Copies of the day's date, week and site so payroll queries don't have
+    # to join DailyEntry, set by save() and the bulk writers in attendance.py
+    date = models.DateField(editable=False)
+    week = models.ForeignKey(
+        Week,
+        on_delete=models.CASCADE,
+        related_name="attendances",
+        editable=False,
+    )
+    site = models.ForeignKey(
+        sites_models.Site,
+        on_delete=models.CASCADE,
+        related_name="labour_attendances",
+        editable=False,
+    )
 
     class Meta:
-        # Prevent double entry for same person same day
+        # Prevent double entry for same person same day, the date is part of
+        # it so the key still works when the table is partitioned by date
         unique_together = [
             "daily_entry",
             "labour",
+            "date",
         ]
+        # Covering indexes so history and week totals can be read from the
+        # index alone (INCLUDE is only used on PostgreSQL)
+        indexes = [
+            models.Index(
+                fields=["labour", "date"],
+                include=["is_present", "multiplier", "advance_taken", "daily_wage"],
+                name="payroll_att_labour_date_cov",
+            ),
+            models.Index(
+                fields=["week", "labour"],
+                include=["is_present", "multiplier", "advance_taken", "daily_wage"],
+                name="payroll_att_week_labour_cov",
+            ),
+            models.Index(fields=["site", "date"], name="payroll_att_site_date"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.date = self.daily_entry.date
+        self.week_id = self.daily_entry.week_id
+        self.site_id = self.daily_entry.week.site_id
+        super().save(*args, **kwargs)
 
     @property
     def net_pay(self):
@@ -179,3 +234,224 @@ class LabourAttendance(models.Model):
 
     def __str__(self):
         return f"{self.labour.name} on {self.daily_entry.date}"
+
+
+class LedgerSource(models.IntegerChoices):
+    ATTENDANCE = 1, "Attendance"
+    PAYMENT = 2, "Payment"
+    ASSIGNMENT = 3, "Assignment"
+    WEEK_DELETED = 4, "Week Deleted"
+    REBUILD = 5, "Rebuild"
+    WAGE_REVISION = 6, "Wage Revision"
+
+
+class LabourLedgerEntry(models.Model):
+    """
+    Append-only journal of a labourer's wage movements.
+
+    Each row records how much a labourer's earnings, advances and payments
+    for one week changed, plus the running totals across all weeks after
+    applying it. The latest row of a labourer is therefore their balance.
+    """
+
+    labour = models.ForeignKey(
+        labours_models.Labour,
+        on_delete=models.CASCADE,
+        related_name="ledger_entries",
+    )
+    week = models.ForeignKey(
+        Week,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="ledger_entries",
+    )
+    week_start = models.DateField()
+    source = models.IntegerField(choices=LedgerSource)
+    earned = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    advance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_advance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["labour", "-id"]),
+            models.Index(fields=["labour", "week_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.labour_id} {self.week_start} ({self.get_source_display()})"
+
+
+class WeekLabourBalanceSnapshot(models.Model):
+    """
+    Closing balance of a labourer frozen when their week got locked.
+
+    The totals are everything earned, taken and paid up to the end of the
+    week, so later weeks can start from here instead of from the first day
+    the labourer worked.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assignment = models.OneToOneField(
+        WeekLabourAssignment,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshot",
+    )
+    labour = models.ForeignKey(
+        labours_models.Labour,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshots",
+    )
+    week_start = models.DateField()
+    opening_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    earned = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    advance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    total_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_advance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["labour", "week_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.assignment} closed at {self.closing_balance}"
+
+
+class WeekLabourSummary(models.Model):
+    """
+    One labourer's attendance totals for a compacted week.
+
+    Stands in for the labourer's attendance rows of the week, which move
+    to ArchivedLabourAttendance, so balances read one row instead of seven.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    week = models.ForeignKey(
+        Week,
+        on_delete=models.CASCADE,
+        related_name="labour_summaries",
+    )
+    labour = models.ForeignKey(
+        labours_models.Labour,
+        on_delete=models.CASCADE,
+        related_name="week_summaries",
+    )
+    days_present = models.PositiveSmallIntegerField(default=0)
+    units = models.FloatField(default=0)
+    # Not rounded, same as the sum over the rows it replaces
+    earned = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    advance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ["week", "labour"]
+
+    def __str__(self):
+        return f"{self.labour_id} {self.week} ({self.units} units)"
+
+
+class ArchivedLabourAttendance(models.Model):
+    """Attendance rows of compacted weeks, kept as they were for audits."""
+
+    # Same id as the attendance row it was
+    id = models.UUIDField(primary_key=True, editable=False)
+    daily_entry = models.ForeignKey(
+        DailyEntry,
+        on_delete=models.CASCADE,
+        related_name="archived_attendances",
+    )
+    labour = models.ForeignKey(
+        labours_models.Labour,
+        on_delete=models.CASCADE,
+        related_name="archived_attendance_records",
+    )
+    week = models.ForeignKey(
+        Week,
+        on_delete=models.CASCADE,
+        related_name="archived_attendances",
+    )
+    site = models.ForeignKey(
+        sites_models.Site,
+        on_delete=models.CASCADE,
+        related_name="archived_labour_attendances",
+    )
+    date = models.DateField()
+    is_present = models.BooleanField(default=False)
+    payment_type = models.IntegerField(
+        choices=PaymentType,
+        default=PaymentType.BANK_TRANSFER,
+    )
+    advance_taken = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    multiplier = models.FloatField(default=1)
+    daily_wage = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["site", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.labour_id} on {self.date} (archived)"
+
+
+class SyncStatus(models.IntegerChoices):
+    APPLIED = 1, "Applied"
+    STALE = 2, "Stale"
+    LOCKED = 3, "Locked"
+    INVALID = 4, "Invalid"
+
+
+class AttendanceMutation(models.Model):
+    """
+    One attendance change sent by the mobile app while it was offline.
+
+    The key is chosen by the app, so a batch that is sent again after a
+    dropped connection gets the recorded outcome back instead of being
+    applied twice. See sync.py.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="attendance_mutations",
+    )
+    key = models.CharField(max_length=64)
+    daily_entry = models.ForeignKey(
+        DailyEntry,
+        on_delete=models.CASCADE,
+        related_name="mutations",
+    )
+    labour = models.ForeignKey(
+        labours_models.Labour,
+        on_delete=models.CASCADE,
+        related_name="attendance_mutations",
+    )
+    client_timestamp = models.DateTimeField()
+    status = models.IntegerField(choices=SyncStatus)
+    detail = models.CharField(max_length=255, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ["user", "key"]
+        indexes = [
+            models.Index(fields=["daily_entry", "labour", "client_timestamp"]),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.get_status_display()})"
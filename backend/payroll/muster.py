@@ -0,0 +1,86 @@
+from array import array
+from datetime import timedelta
+
+from . import models as models
+
+# Marks a day the labourer has no attendance row for
+MISSING = -1
+
+
+def _dates(start_date, end_date):
+    return [
+        start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)
+    ]
+
+
+def muster_rows(site_id, start_date, end_date):
+    """
+    (labour, name, date, present, multiplier, advance) of every row,
+    archived rows of compacted weeks included.
+    """
+    fields = [
+        "labour",
+        "labour__name",
+        "date",
+        "is_present",
+        "multiplier",
+        "advance_taken",
+    ]
+    live, archived = (
+        model.objects.filter(site=site_id, date__range=(start_date, end_date))
+        .order_by()
+        .values_list(*fields)
+        for model in (models.LabourAttendance, models.ArchivedLabourAttendance)
+    )
+    return live.union(archived, all=True)
+
+
+def muster_roll(site_id, start_date, end_date):
+    """
+    Attendance of a site between two dates as a labourer x date matrix.
+
+    All rows come from one query and are pivoted in memory into flat arrays
+    per labourer (present, multiplier, advance), one slot per date.
+    """
+    dates = _dates(start_date, end_date)
+    column = {day: i for i, day in enumerate(dates)}
+    width = len(dates)
+
+    rows = muster_rows(site_id, start_date, end_date)
+
+    labours = {}
+    for labour_id, name, day, is_present, multiplier, advance in rows.iterator(
+        chunk_size=5000
+    ):
+        labour = labours.get(labour_id)
+        if labour is None:
+            labour = labours[labour_id] = {
+                "name": name,
+                "present": array("b", [MISSING]) * width,
+                "multiplier": array("d", [0]) * width,
+                "advance": array("d", [0]) * width,
+            }
+        i = column[day]
+        labour["present"][i] = is_present
+        labour["multiplier"][i] = multiplier if is_present else 0
+        labour["advance"][i] = advance
+
+    matrix = []
+    for labour_id, labour in sorted(labours.items(), key=lambda item: item[1]["name"]):
+        present = labour["present"]
+        matrix.append(
+            {
+                "id": labour_id,
+                "name": labour["name"],
+                "present": [
+                    None if value == MISSING else bool(value) for value in present
+                ],
+                "multiplier": labour["multiplier"].tolist(),
+                "advance": labour["advance"].tolist(),
+                "total_days": present.count(1),
+                "total_units": sum(labour["multiplier"]),
+                "total_advance": sum(labour["advance"]),
+            }
+        )
+
+    return {"dates": dates, "labours": matrix}
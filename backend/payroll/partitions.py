@@ -0,0 +1,232 @@
+"""
+Optional PostgreSQL range partitioning of attendance by date.
+
+The model doesn't change: the table keeps its name and columns, its rows
+just live in one partition per month or quarter. PostgreSQL wants the
+partition key in every unique constraint, so the primary key becomes
+(id, date) and the unique key (daily_entry, labour, date), which the
+model already declares. The ORM keeps working as before.
+"""
+
+import re
+from datetime import date
+
+from django.db import connection, transaction
+
+from . import models as models
+
+TABLE = models.LabourAttendance._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Months per partition
+INTERVALS = {"month": 1, "quarter": 3}
+
+BOUND = re.compile(r"FROM \('(?P<start>[\d-]+)'\) TO \('(?P<end>[\d-]+)'\)")
+
+
+class PartitionError(Exception):
+    pass
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def check_postgresql():
+    if connection.vendor != "postgresql":
+        raise PartitionError("Partitioning needs PostgreSQL.")
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def period_start(day, interval):
+    months = INTERVALS[interval]
+    return date(day.year, (day.month - 1) // months * months + 1, 1)
+
+
+def next_period(start, interval):
+    month = start.month - 1 + INTERVALS[interval]
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(start, interval):
+    if interval == "quarter":
+        return f"{TABLE}_{start.year}q{(start.month - 1) // 3 + 1}"
+    return f"{TABLE}_{start.year}m{start.month:02d}"
+
+
+def partitions():
+    """(name, start, end) of every range partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+
+    found = []
+    for name, bound in rows:
+        # The default partition has no range
+        match = BOUND.search(bound)
+        if match:
+            found.append(
+                (
+                    name,
+                    date.fromisoformat(match["start"]),
+                    date.fromisoformat(match["end"]),
+                )
+            )
+    return sorted(found, key=lambda partition: partition[1])
+
+
+def ensure_partitions(start, end, interval, table=TABLE):
+    """
+    Create the partitions covering start up to end that don't exist yet.
+    Periods already covered by a partition of any interval are skipped.
+    Returns the names of the partitions created.
+    """
+    existing = partitions() if table == TABLE else []
+    created = []
+    period = period_start(start, interval)
+    with connection.cursor() as cursor:
+        while period < end:
+            following = next_period(period, interval)
+            overlaps = any(
+                first < following and period < last for _name, first, last in existing
+            )
+            if not overlaps:
+                name = partition_name(period, interval)
+                cursor.execute(
+                    f"CREATE TABLE {_quote(name)} PARTITION OF {_quote(table)} "
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [period, following],
+                )
+                created.append(name)
+            period = following
+    return created
+
+
+def convert(interval, ahead, today):
+    """
+    Turn the attendance table into a partitioned one, rows included.
+
+    A new partitioned table is filled from the old one, which is then
+    dropped and replaced, with its indexes and foreign keys recreated on
+    the new table. Partitions are created from the oldest row up to ahead
+    periods after today, plus a default partition for anything outside
+    them. Runs in one transaction, the table is locked meanwhile.
+    """
+    new = f"{TABLE}_partitioned"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {_quote(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            """
+            SELECT idx.relname, pg_get_indexdef(idx.oid),
+                pg_index.indisprimary, pg_index.indisunique
+            FROM pg_index
+            JOIN pg_class idx ON idx.oid = pg_index.indexrelid
+            WHERE pg_index.indrelid = %s::regclass
+            """,
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+            """,
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT MIN(date) FROM {_quote(TABLE)}")
+        (first,) = cursor.fetchone()
+
+        cursor.execute(
+            f"CREATE TABLE {_quote(new)} (LIKE {_quote(TABLE)} INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (date)"
+        )
+        last = today
+        for _ in range(ahead + 1):
+            last = next_period(period_start(last, interval), interval)
+        ensure_partitions(first or today, last, interval, table=new)
+        cursor.execute(
+            f"CREATE TABLE {_quote(DEFAULT_PARTITION)} "
+            f"PARTITION OF {_quote(new)} DEFAULT"
+        )
+
+        cursor.execute(f"INSERT INTO {_quote(new)} SELECT * FROM {_quote(TABLE)}")
+        cursor.execute(f"DROP TABLE {_quote(TABLE)}")
+        cursor.execute(f"ALTER TABLE {_quote(new)} RENAME TO {_quote(TABLE)}")
+
+        for name, definition, is_primary, is_unique in indexes:
+            if is_primary:
+                cursor.execute(
+                    f"ALTER TABLE {_quote(TABLE)} ADD CONSTRAINT {_quote(name)} "
+                    "PRIMARY KEY (id, date)"
+                )
+            elif is_unique:
+                cursor.execute(
+                    f"ALTER TABLE {_quote(TABLE)} ADD CONSTRAINT {_quote(name)} "
+                    "UNIQUE (daily_entry_id, labour_id, date)"
+                )
+            else:
+                # The definition names the table, which now is the new one
+                cursor.execute(definition)
+
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f"ALTER TABLE {_quote(TABLE)} ADD CONSTRAINT {_quote(name)} "
+                f"{definition}"
+            )
+
+        cursor.execute(f"ANALYZE {_quote(TABLE)}")
+
+
+def detach(before, archive_schema=None):
+    """
+    Detach the partitions that end on or before the given date.
+
+    They stay in the database as plain tables, moved to archive_schema if
+    given, but payroll no longer sees their rows. Only compacted weeks may
+    fall in them: their rows already live in the archive table and their
+    summaries stand in for them, so sync_week and rebuild_labour_ledger get
+    the same totals after the detach. A week that isn't compacted could
+    still be synced or rebuilt from the detached rows, so it is refused.
+    Returns the names of the detached partitions.
+    """
+    old = [(name, start, end) for name, start, end in partitions() if end <= before]
+    if not old:
+        return []
+
+    last_end = max(end for _name, _start, end in old)
+    if models.Week.objects.filter(is_compacted=False, start_date__lt=last_end).exists():
+        raise PartitionError(
+            f"Weeks before {last_end} aren't compacted, compact them before "
+            "detaching."
+        )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if archive_schema:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {_quote(archive_schema)}")
+        for name, _start, _end in old:
+            cursor.execute(
+                f"ALTER TABLE {_quote(TABLE)} DETACH PARTITION {_quote(name)}"
+            )
+            if archive_schema:
+                cursor.execute(
+                    f"ALTER TABLE {_quote(name)} SET SCHEMA {_quote(archive_schema)}"
+                )
+    return [name for name, _start, _end in old]
@@ -0,0 +1,261 @@
+"""
+Importing the punch logs of attendance terminals.
+
+A punch file is a CSV with a code column, the labourer's punch_code, and
+either a timestamp column or date and time columns; other columns are
+ignored. It is read line by line and only the first and last punch of
+each labourer and day are kept, so memory grows with labourers times
+days, not with the size of the file.
+
+The hours between the first and last punch give the day's multiplier, see
+day_multiplier. Every labourer on a week of the site counts as absent on
+the days the file covers but has no punch for. Writes are chunked upserts
+of presence and multiplier, advances and payment types already entered are
+kept.
+"""
+
+import csv
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from django.db import transaction
+
+from labours import models as labours_models
+
+from . import ledger as ledger
+from . import models as models
+
+PunchRules = namedtuple(
+    "PunchRules", ["full_day_hours", "half_day_hours", "overtime_hours"]
+)
+
+# 8 hours is a day, 4 half a day and every 4 hours more another half day
+DEFAULT_RULES = PunchRules(8, 4, 4)
+
+TIME_FORMATS = ["%H:%M:%S", "%H:%M"]
+
+
+class PunchImportError(Exception):
+    pass
+
+
+def _parse_time(value):
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, time_format).time()
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+
+def read_punches(lines):
+    """
+    Yield (code, datetime) per punch of a CSV read from lines. Rows that
+    can't be read are yielded as (None, line number).
+    """
+    reader = csv.DictReader(lines)
+    columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+    if "code" not in columns or not (
+        "timestamp" in columns or {"date", "time"} <= columns.keys()
+    ):
+        raise PunchImportError(
+            "The file needs a code column and a timestamp column, "
+            "or date and time columns."
+        )
+
+    for row in reader:
+        try:
+            code = row[columns["code"]].strip()
+            if "timestamp" in columns:
+                punched = datetime.fromisoformat(row[columns["timestamp"]].strip())
+            else:
+                punched = datetime.combine(
+                    datetime.strptime(row[columns["date"]].strip(), "%Y-%m-%d"),
+                    _parse_time(row[columns["time"]].strip()),
+                )
+        except (AttributeError, ValueError):
+            yield None, reader.line_num
+            continue
+        if not code:
+            yield None, reader.line_num
+            continue
+        yield code, punched.replace(tzinfo=None)
+
+
+def day_multiplier(first, last, punches, rules=DEFAULT_RULES):
+    """
+    (is_present, multiplier) of a day from its first and last punch.
+
+    A single punch, an entry without an exit, counts as half a day.
+    Fewer than half_day_hours is absent, fewer than full_day_hours half a
+    day, then one day plus half a day for every overtime_hours beyond.
+    """
+    if punches == 1:
+        return True, 0.5
+
+    hours = (last - first).total_seconds() / 3600
+    if hours < rules.half_day_hours:
+        return False, 1.0
+    if hours < rules.full_day_hours:
+        return True, 0.5
+    overtime = int((hours - rules.full_day_hours) // rules.overtime_hours)
+    return True, 1 + 0.5 * overtime
+
+
+def import_punches(site_id, lines, rules=DEFAULT_RULES, dry_run=False, batch_size=1000):
+    """
+    Import a punch file into the site's attendance.
+
+    Returns how many punches were read, the changes (inserted, updated,
+    unchanged) with the diff of every row that changes, and what was
+    skipped: unreadable lines, unknown codes, dates without a week, locked
+    weeks and labourers not on the week. With dry_run nothing is written.
+    """
+    days = {}
+    bad_lines = []
+    read = 0
+    for code, punched in read_punches(lines):
+        if code is None:
+            bad_lines.append(punched)
+            continue
+        read += 1
+        key = (code, punched.date())
+        first, last, count = days.get(key, (punched, punched, 0))
+        days[key] = (min(first, punched), max(last, punched), count + 1)
+
+    report = {
+        "punches": read,
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "diff": [],
+        "skipped": {
+            "bad_lines": bad_lines[:100],
+            "unknown_codes": [],
+            "dates_without_week": [],
+            "locked_weeks": [],
+            "not_on_week": 0,
+        },
+        "dry_run": dry_run,
+    }
+    if not days:
+        return report
+    skipped = report["skipped"]
+
+    codes = {code for code, _date in days}
+    dates = {date for _code, date in days}
+    labours = dict(
+        labours_models.Labour.objects.filter(
+            site=site_id, punch_code__in=codes
+        ).values_list("punch_code", "id")
+    )
+    skipped["unknown_codes"] = sorted(codes - labours.keys())
+
+    entries = {
+        entry.date: entry
+        for entry in models.DailyEntry.objects.filter(
+            week__site=site_id, date__in=dates
+        ).select_related("week")
+    }
+    skipped["dates_without_week"] = sorted(dates - entries.keys())
+    skipped["locked_weeks"] = sorted(
+        {
+            entry.week.start_date
+            for entry in entries.values()
+            if not entry.week.admin_unlocked
+        }
+    )
+    entries = {
+        date: entry for date, entry in entries.items() if entry.week.admin_unlocked
+    }
+
+    # Everyone on the weeks is absent on a covered day unless they punched
+    wages = {
+        (week_id, labour_id): wage
+        for week_id, labour_id, wage in models.WeekLabourAssignment.objects.filter(
+            week__in={entry.week_id for entry in entries.values()}
+        ).values_list("week", "labour", "weekly_daily_wage")
+    }
+    labours_by_week = defaultdict(list)
+    for week_id, labour_id in wages:
+        labours_by_week[week_id].append(labour_id)
+    wanted = {
+        (entry.date, labour_id): (False, 1.0)
+        for entry in entries.values()
+        for labour_id in labours_by_week[entry.week_id]
+    }
+    for (code, date), (first, last, count) in days.items():
+        if code not in labours or date not in entries:
+            continue
+        labour_id = labours[code]
+        if (date, labour_id) not in wanted:
+            skipped["not_on_week"] += 1
+            continue
+        wanted[(date, labour_id)] = day_multiplier(first, last, count, rules)
+
+    existing = {
+        (row["date"], row["labour"]): (row["is_present"], row["multiplier"])
+        for row in models.LabourAttendance.objects.filter(
+            site=site_id, date__in=entries.keys()
+        ).values("date", "labour", "is_present", "multiplier")
+    }
+    names = dict(
+        labours_models.Labour.objects.filter(
+            id__in={labour_id for _date, labour_id in wanted}
+        ).values_list("id", "name")
+    )
+
+    upserts = []
+    touched = {}
+    for (date, labour_id), (is_present, multiplier) in sorted(
+        wanted.items(), key=lambda item: (item[0][0], names[item[0][1]])
+    ):
+        before = existing.get((date, labour_id))
+        if before == (is_present, multiplier):
+            report["unchanged"] += 1
+            continue
+        report["inserted" if before is None else "updated"] += 1
+        report["diff"].append(
+            {
+                "date": date,
+                "labour": labour_id,
+                "name": names[labour_id],
+                "before": (
+                    None
+                    if before is None
+                    else {"is_present": before[0], "multiplier": before[1]}
+                ),
+                "after": {"is_present": is_present, "multiplier": multiplier},
+            }
+        )
+
+        entry = entries[date]
+        touched.setdefault(entry.week_id, (entry.week, set()))[1].add(labour_id)
+        upserts.append(
+            models.LabourAttendance(
+                daily_entry=entry,
+                labour_id=labour_id,
+                date=date,
+                week_id=entry.week_id,
+                site_id=site_id,
+                daily_wage=wages[(entry.week_id, labour_id)],
+                is_present=is_present,
+                multiplier=multiplier,
+            )
+        )
+
+    if dry_run or not upserts:
+        return report
+
+    with transaction.atomic():
+        models.LabourAttendance.objects.bulk_create(
+            upserts,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["daily_entry", "labour", "date"],
+            update_fields=["is_present", "multiplier", "daily_wage"],
+        )
+        for week, labour_ids in touched.values():
+            ledger.sync_week(week, labour_ids)
+
+    return report
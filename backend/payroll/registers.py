@@ -0,0 +1,118 @@
+import csv
+from tempfile import SpooledTemporaryFile
+
+from openpyxl import Workbook
+
+from labours import models as labours_models
+
+from . import ledger as ledger
+from . import models as models
+
+COLUMNS = [
+    "Week",
+    "Labour",
+    "Type",
+    "Daily Wage",
+    "Opening Balance",
+    "Days",
+    "Earned",
+    "Advance",
+    "Paid",
+    "Due",
+]
+
+
+def register_rows(weeks, chunk_size=2000):
+    """
+    Yield one register row per (week, labourer), oldest week first.
+
+    Opening balances are the week sheet's, from ledger.opening_totals, so
+    weeks the labourers worked on other sites count too. Each week is read
+    on its own in a handful of queries, only one week is in memory.
+    """
+    for week in weeks.order_by("start_date").iterator(chunk_size=chunk_size):
+        assignments = list(
+            models.WeekLabourAssignment.objects.filter(week=week)
+            .order_by("labour__name")
+            .values_list(
+                "labour",
+                "labour__name",
+                "labour__type",
+                "labour__previous_balance",
+                "weekly_daily_wage",
+                "week_payment__amount_paid",
+            )
+        )
+        if not assignments:
+            continue
+
+        current = ledger.attendance_totals([week.id])
+        opening = ledger.opening_totals(
+            week, [assignment[0] for assignment in assignments]
+        )
+
+        for (
+            labour_id,
+            name,
+            labour_type,
+            previous_balance,
+            wage,
+            paid,
+        ) in assignments:
+            before = opening.get(labour_id, ledger.EMPTY)
+            during = current.get((week.id, labour_id)) or {}
+            units = during.get("units") or 0
+            earned = ledger.earnings(during)
+            advance = during.get("advance") or ledger.ZERO
+            paid = paid or ledger.ZERO
+
+            opening_balance = (
+                previous_balance + before.earned - (before.advance + before.paid)
+            )
+
+            yield [
+                week.start_date.isoformat(),
+                name,
+                labours_models.LabourType(labour_type).label,
+                wage,
+                opening_balance,
+                units,
+                earned,
+                advance,
+                paid,
+                opening_balance + earned - advance,
+            ]
+
+
+class Echo:
+    """File-like object that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_xlsx(rows, chunk_size=64 * 1024):
+    """
+    Write rows with openpyxl's write-only workbook and stream the file.
+
+    The workbook spills to a temporary file once it grows past a few MB,
+    so memory stays flat for big registers.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Payroll")
+    sheet.append(COLUMNS)
+    for row in rows:
+        sheet.append(row)
+
+    with SpooledTemporaryFile(max_size=4 * 1024 * 1024) as buffer:
+        workbook.save(buffer)
+        buffer.seek(0)
+        while chunk := buffer.read(chunk_size):
+            yield chunk
@@ -0,0 +1,12 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Plain JSON, picked with ?format=columnar.
+
+    Views that support it answer with parallel arrays instead of one
+    object per attendance row.
+    """
+
+    format = "columnar"
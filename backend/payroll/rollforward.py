@@ -0,0 +1,91 @@
+from datetime import timedelta
+from time import perf_counter
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from sites import models as sites_models
+
+from . import attendance as attendance
+from . import models as models
+
+
+def next_saturday(today=None):
+    """The Saturday a new week starts on, today if it already is one."""
+    today = today or timezone.now().date()
+    return today + timedelta(days=(5 - today.weekday()) % 7)
+
+
+def roll_forward(start_date=None, site_ids=None):
+    """
+    Open the week starting on start_date for every active site.
+
+    Each site gets its days and the labourers of its latest earlier week,
+    at the same daily wage, with blank attendance ready to fill in. All of
+    it is bulk inserted in a single transaction. Sites that already have
+    the week are skipped, also when a concurrent run opened it first: each
+    site is inserted in a savepoint of its own, so that site is reported
+    as skipped and the others still open. Returns one report row per site
+    with how long it took.
+    """
+    start_date = start_date or next_saturday()
+
+    sites = sites_models.Site.objects.filter(is_active=True, is_deleted=False)
+    if site_ids is not None:
+        sites = sites.filter(id__in=site_ids)
+
+    report = []
+    with transaction.atomic():
+        for site in sites.order_by("name"):
+            started = perf_counter()
+            row = {"site": site.id, "name": site.name, "week": None, "labours": 0}
+            try:
+                with transaction.atomic():
+                    row.update(_open_week(site, start_date))
+            except IntegrityError:
+                row["skipped"] = "Week already exists"
+            row["seconds"] = round(perf_counter() - started, 4)
+            report.append(row)
+
+    return report
+
+
+def _open_week(site, start_date):
+    if models.Week.objects.filter(site=site, start_date=start_date).exists():
+        return {"skipped": "Week already exists"}
+
+    previous = (
+        models.Week.objects.filter(site=site, start_date__lt=start_date)
+        .order_by("-start_date")
+        .first()
+    )
+
+    # bulk_create skips Week.save, so the days are inserted here
+    week = models.Week(site=site, start_date=start_date)
+    models.Week.objects.bulk_create([week])
+    models.DailyEntry.objects.bulk_create(
+        [
+            models.DailyEntry(week=week, date=start_date + timedelta(days=i))
+            for i in range(7)
+        ]
+    )
+
+    assignments = []
+    if previous is not None:
+        assignments = models.WeekLabourAssignment.objects.bulk_create(
+            [
+                models.WeekLabourAssignment(
+                    week=week,
+                    labour_id=labour_id,
+                    weekly_daily_wage=wage,
+                )
+                for labour_id, wage in models.WeekLabourAssignment.objects.filter(
+                    week=previous
+                ).values_list("labour", "weekly_daily_wage")
+            ]
+        )
+        attendance.populate(
+            (week.id, assignment.labour_id) for assignment in assignments
+        )
+
+    return {"week": week.id, "labours": len(assignments)}
@@ -1,20 +1,18 @@
-from django.db.models.functions.comparison import Coalesce
-from django.db.models import (
-    Sum,
-    OuterRef,
-    Subquery,
-    DecimalField,
-    Value,
-    F,
-    ExpressionWrapper,
-)
 from django.db import transaction
 
 from rest_framework import serializers
 
+from labours import models as labours_models
 from labours import serializers as labours_serializer
 
+from . import attendance as attendance
+from . import balances as balances
+from . import columnar as columnar
+from . import compaction as compaction
+from . import ledger as ledger
 from . import models as models
+from . import punches as punches
+from . import snapshots as snapshots
 
 
 class LabourAttendanceRetrieveSerializer(serializers.ModelSerializer):
@@ -60,7 +58,7 @@ class WeekLabourRetrieveSerializer(serializers.ModelSerializer):
 
 
 class DailyEntryRetrieveSerializer(serializers.ModelSerializer):
-    attendance = LabourAttendanceRetrieveSerializer(source="attendances", many=True)
+    attendance = LabourAttendanceRetrieveSerializer(source="attendance_rows", many=True)
 
     class Meta:
         model = models.DailyEntry
@@ -82,7 +80,25 @@ class WeekLabourAssignmentSerializer(serializers.ModelSerializer):
         ]
 
 
+class DailyEntryStatusSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = models.DailyEntry
+        fields = [
+            "id",
+            "date",
+            "is_saved",
+            "admin_unlocked",
+        ]
+
+
 class WeekListSerializer(serializers.ModelSerializer):
+    # Annotated by balances.week_summaries
+    headcount = serializers.IntegerField(read_only=True)
+    earned = serializers.FloatField(read_only=True)
+    advance = serializers.FloatField(read_only=True)
+    paid = serializers.FloatField(read_only=True)
+    days = DailyEntryStatusSerializer(many=True, read_only=True)
 
     class Meta:
         model = models.Week
@@ -91,6 +107,12 @@ class WeekListSerializer(serializers.ModelSerializer):
             "site",
             "start_date",
             "end_date",
+            "is_editable",
+            "headcount",
+            "earned",
+            "advance",
+            "paid",
+            "days",
         ]
 
 
@@ -131,6 +153,8 @@ class WeekCreateUpdateSerializer(serializers.ModelSerializer):
 
         with transaction.atomic():
             if admin_unlocked:
+                # Reopening brings back the attendance of a compacted week
+                compaction.expand_week(instance)
                 instance.admin_unlocked = True
             else:
                 instance.admin_unlocked = False
@@ -147,9 +171,16 @@ class WeekCreateUpdateSerializer(serializers.ModelSerializer):
                         for payment in payments_data
                     ]
                 )
+                ledger.sync_week(instance, source=models.LedgerSource.PAYMENT)
 
             instance.save()
 
+            # A locked week keeps its closing balances for the weeks after it
+            if instance.admin_unlocked:
+                snapshots.thaw_week(instance)
+            else:
+                snapshots.freeze_week(instance)
+
         return instance
 
 
@@ -169,165 +200,12 @@ class WeekRetrieveSerializer(serializers.ModelSerializer):
         ]
 
     def get_labours(self, instance):
-        start_date = instance.start_date
-
-        # -------------------------------------------------------
-        # SUBQUERY 1: WAGE LOOKUP (For Historical Earnings Calculation)
-        # -------------------------------------------------------
-        wage_lookup_sql = models.WeekLabourAssignment.objects.filter(
-            week=OuterRef("daily_entry__week"),
-            labour=OuterRef("labour"),
-        ).values("weekly_daily_wage")[:1]
-
-        # -------------------------------------------------------
-        # SUBQUERY 2: HISTORICAL EARNINGS
-        # Calculation: Sum of (Weekly_Wage * Multiplier) where Is_Present is True
-        # -------------------------------------------------------
-        history_earned_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__date__lt=start_date,
-                is_present=True,
-            )
-            .annotate(
-                # 1. Get the base wage for that specific day/week
-                base_wage=Subquery(wage_lookup_sql, output_field=DecimalField())
-            )
-            .annotate(
-                # 2. Calculate actual pay for that day: Base Wage * Multiplier
-                # We use ExpressionWrapper to ensure the Float(multiplier) * Decimal(wage) returns a Decimal
-                day_pay=ExpressionWrapper(
-                    F("base_wage") * F("multiplier"), output_field=DecimalField()
-                )
-            )
-            .values("labour")
-            .annotate(total=Sum("day_pay"))  # 3. Sum the calculated daily pays
-            .values("total")
-        )
-
-        # -------------------------------------------------------
-        # SUBQUERY 3: HISTORICAL ADVANCES
-        # (Unchanged)
-        # -------------------------------------------------------
-        history_advance_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__date__lt=start_date,
-            )
-            .values("labour")
-            .annotate(total=Sum("advance_taken"))
-            .values("total")
-        )
-
-        # -------------------------------------------------------
-        # SUBQUERY 4: HISTORICAL PAYMENTS
-        # (Unchanged)
-        # -------------------------------------------------------
-        history_paid_subquery = (
-            models.LabourPayment.objects.filter(
-                labour__labour=OuterRef("labour"),
-                labour__week__start_date__lt=start_date,
-            )
-            .values("labour__labour")
-            .annotate(total=Sum("amount_paid"))
-            .values("total")
-        )
-
-        # -------------------------------------------------------
-        # SUBQUERY 5: CURRENT WEEK ACTIVITY
-        # -------------------------------------------------------
-
-        # A. Current Advances (Unchanged)
-        current_advance_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__week=instance,
-            )
-            .values("labour")
-            .annotate(total=Sum("advance_taken"))
-            .values("total")
-        )
-
-        # B. Current "Billable Days" (Sum of Multipliers)
-        # Instead of counting rows (1 day = 1), we sum the multipliers (1 day could be 1.5 or 0.5)
-        current_billable_units_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__week=instance,
-                is_present=True,
-            )
-            .values("labour")
-            .annotate(total_units=Sum("multiplier"))
-            .values("total_units")
-        )
-
-        # -------------------------------------------------------
-        # MAIN QUERY
-        # -------------------------------------------------------
-        assignments = (
-            models.WeekLabourAssignment.objects.filter(week=instance)
-            .select_related("labour")
-            .prefetch_related("week_payment")
-            .annotate(
-                # 1. Bring in all subqueries
-                hist_earned=Coalesce(
-                    Subquery(history_earned_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
-                ),
-                hist_advance=Coalesce(
-                    Subquery(history_advance_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
-                ),
-                hist_paid=Coalesce(
-                    Subquery(history_paid_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
-                ),
-                curr_advance=Coalesce(
-                    Subquery(current_advance_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
-                ),
-                # 2. Calculate Current Earnings
-                # Logic: (Sum of Multipliers for this week) * (This Week's Daily Wage)
-                curr_earned=ExpressionWrapper(
-                    Coalesce(
-                        Subquery(
-                            current_billable_units_subquery, output_field=DecimalField()
-                        ),
-                        Value(0, output_field=DecimalField()),
-                    )
-                    * F("weekly_daily_wage"),
-                    output_field=DecimalField(),
-                ),
-            )
-            .annotate(
-                # 3. Opening Balance
-                opening_balance=(
-                    F("labour__previous_balance")
-                    + F("hist_earned")
-                    - (F("hist_advance") + F("hist_paid"))
-                ),
-                # 4. Current Week Net
-                current_week_net=F("curr_earned") - F("curr_advance"),
-                # 5. Total Due Now
-                total_due_to_date=(
-                    (
-                        F("labour__previous_balance")
-                        + F("hist_earned")
-                        - (F("hist_advance") + F("hist_paid"))
-                    )
-                    + (F("curr_earned") - F("curr_advance"))
-                ),
-            )
-        )
-
-        if not assignments.exists():
-            return []
-
+        assignments = balances.week_balances(instance)
         return WeekLabourRetrieveSerializer(assignments, many=True).data
 
 
 class DailyEntryWithLabourRetrieveSerializer(serializers.ModelSerializer):
-    attendance = LabourAttendanceRetrieveSerializer(source="attendances", many=True)
+    attendance = LabourAttendanceRetrieveSerializer(source="attendance_rows", many=True)
     labours = labours_serializer.LabourSerializer(
         source="week.labours", many=True, read_only=True
     )
@@ -343,6 +221,41 @@ class DailyEntryWithLabourRetrieveSerializer(serializers.ModelSerializer):
         ]
 
 
+class WeekColumnarRetrieveSerializer(WeekRetrieveSerializer):
+    """The week with its attendance as columns, see columnar.week_columns."""
+
+    class Meta(WeekRetrieveSerializer.Meta):
+        fields = [
+            "id",
+            "start_date",
+            "end_date",
+            "labours",
+            "is_editable",
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(columnar.week_columns(instance))
+        return data
+
+
+class DailyEntryColumnarRetrieveSerializer(serializers.ModelSerializer):
+    """The day with its labourers and attendance as columns."""
+
+    class Meta:
+        model = models.DailyEntry
+        fields = [
+            "id",
+            "date",
+            "is_editable",
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(columnar.day_columns(instance))
+        return data
+
+
 class LabourAttendanceUpdateSerializer(serializers.ModelSerializer):
     labour = serializers.UUIDField()
 
@@ -357,20 +270,55 @@ class LabourAttendanceUpdateSerializer(serializers.ModelSerializer):
         ]
 
 
+class AttendanceMutationSerializer(LabourAttendanceUpdateSerializer):
+    key = serializers.CharField(max_length=64)
+    daily_entry = serializers.UUIDField()
+    client_timestamp = serializers.DateTimeField()
+
+    class Meta(LabourAttendanceUpdateSerializer.Meta):
+        fields = [
+            "key",
+            "daily_entry",
+            "client_timestamp",
+            *LabourAttendanceUpdateSerializer.Meta.fields,
+        ]
+
+
+class AttendanceSyncSerializer(serializers.Serializer):
+    # Most mutations taken in one batch, a week offline on a large site
+    MAX_MUTATIONS = 2000
+
+    mutations = AttendanceMutationSerializer(
+        many=True, allow_empty=False, max_length=MAX_MUTATIONS
+    )
+
+
 class DailyEntryUpdateSerializer(serializers.ModelSerializer):
     attendances = LabourAttendanceUpdateSerializer(
         many=True, required=False, write_only=True
     )
 
+    changes = serializers.SerializerMethodField()
+
     class Meta:
         model = models.DailyEntry
-        fields = ["admin_unlocked", "attendances"]
+        fields = ["admin_unlocked", "attendances", "changes"]
+
+    def get_changes(self, instance):
+        # Counts of inserted/updated/deleted/unchanged rows of the last save
+        return getattr(instance, "attendance_changes", None)
 
     def update(self, instance, validated_data):
         attendance_data = validated_data.pop("attendances", None)
         admin_unlocked = validated_data.pop("admin_unlocked", False)
 
         with transaction.atomic():
+            # Reopening or editing a day of a compacted week brings back
+            # its attendance, anything else leaves the week compacted
+            if instance.week.is_compacted and (
+                admin_unlocked or attendance_data is not None
+            ):
+                compaction.expand_week(instance.week)
             if admin_unlocked:
                 instance.admin_unlocked = True
                 instance.is_saved = False
@@ -379,20 +327,10 @@ class DailyEntryUpdateSerializer(serializers.ModelSerializer):
                 instance.is_saved = True
 
             if attendance_data is not None:
-                models.LabourAttendance.objects.filter(daily_entry=instance).delete()
-                models.LabourAttendance.objects.bulk_create(
-                    [
-                        models.LabourAttendance(
-                            daily_entry=instance,
-                            payment_type=item["payment_type"],
-                            labour_id=item["labour"],
-                            is_present=item["is_present"],
-                            advance_taken=item["advance_taken"],
-                            multiplier=item["multiplier"],
-                        )
-                        for item in attendance_data
-                    ]
-                )
+                changes, touched = attendance.save_day(instance, attendance_data)
+                instance.attendance_changes = changes
+                if touched:
+                    ledger.sync_week(instance.week, touched)
 
             instance.save()
 
@@ -404,3 +342,135 @@ class WeekLabourUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         fields = "__all__"
         model = models.WeekLabourAssignment
+
+
+class WeekRollForwardSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False)
+    sites = serializers.ListField(child=serializers.UUIDField(), required=False)
+
+    def validate_start_date(self, value):
+        if value.weekday() != 5:
+            raise serializers.ValidationError("The start date must be a Saturday.")
+        return value
+
+
+class MusterRollQuerySerializer(serializers.Serializer):
+    # Longest range the muster roll is built for, a year including a leap day
+    MAX_DAYS = 366
+
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    def validate(self, attrs):
+        days = (attrs["end_date"] - attrs["start_date"]).days + 1
+        if days < 1:
+            raise serializers.ValidationError(
+                "The end date must not be before the start date."
+            )
+        if days > self.MAX_DAYS:
+            raise serializers.ValidationError(
+                f"The range can't be longer than {self.MAX_DAYS} days."
+            )
+        return attrs
+
+
+class PayrollExportQuerySerializer(serializers.Serializer):
+    # "format" is taken by DRF's renderer selection
+    file_format = serializers.ChoiceField(choices=["csv", "xlsx"], default="csv")
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+
+class PayrollHistorySerializer(serializers.Serializer):
+    week = serializers.UUIDField()
+    start_date = serializers.DateField(source="week_start")
+    site = serializers.CharField(source="week__site__name")
+    days = serializers.IntegerField()
+    units = serializers.FloatField()
+    wage = serializers.FloatField(allow_null=True)
+    earned = serializers.FloatField(source="week_earned")
+    advance = serializers.FloatField(source="week_advance")
+    paid = serializers.FloatField(source="week_paid")
+    # What the labourer is owed after the week, its payment included
+    balance = serializers.FloatField()
+
+
+class PunchImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    dry_run = serializers.BooleanField(default=False)
+    full_day_hours = serializers.FloatField(
+        min_value=0.5, max_value=24, default=punches.DEFAULT_RULES.full_day_hours
+    )
+    half_day_hours = serializers.FloatField(
+        min_value=0, max_value=24, default=punches.DEFAULT_RULES.half_day_hours
+    )
+    overtime_hours = serializers.FloatField(
+        min_value=0.5, max_value=24, default=punches.DEFAULT_RULES.overtime_hours
+    )
+
+    def validate(self, attrs):
+        if attrs["half_day_hours"] > attrs["full_day_hours"]:
+            raise serializers.ValidationError(
+                "Half a day can't be longer than a full day."
+            )
+        return attrs
+
+
+class WageRevisionSerializer(serializers.Serializer):
+    labours = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, required=False
+    )
+    labour_type = serializers.ChoiceField(
+        choices=labours_models.LabourType.choices, required=False
+    )
+    effective_week = serializers.DateField()
+    daily_wage = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    # Only admins may revise locked weeks
+    include_locked = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_effective_week(self, value):
+        if value.weekday() != 5:
+            raise serializers.ValidationError("The week must start on a Saturday.")
+        return value
+
+    def validate(self, attrs):
+        if ("labours" in attrs) == ("labour_type" in attrs):
+            raise serializers.ValidationError(
+                "Give either the labourers or a labour type."
+            )
+        return attrs
+
+
+class WageScenarioSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    # New daily wage = old wage * wage_factor + wage_increase
+    wage_factor = serializers.FloatField(min_value=0, default=1)
+    wage_increase = serializers.FloatField(default=0)
+    minimum_wage = serializers.FloatField(min_value=0, required=False)
+    # Old multiplier -> new multiplier, e.g. {"1.5": 2}
+    multipliers = serializers.DictField(
+        child=serializers.FloatField(min_value=0), required=False
+    )
+    from_date = serializers.DateField(required=False)
+
+    def validate_multipliers(self, value):
+        for old in value:
+            try:
+                float(old)
+            except ValueError:
+                raise serializers.ValidationError(f"{old!r} is not a multiplier.")
+        return value
+
+
+class WageSimulationSerializer(serializers.Serializer):
+    MAX_SCENARIOS = 50
+
+    scenarios = WageScenarioSerializer(many=True, allow_empty=False)
+
+    def validate_scenarios(self, value):
+        if len(value) > self.MAX_SCENARIOS:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_SCENARIOS} scenarios at a time."
+            )
+        return value
@@ -1,26 +1,85 @@
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver
-from .models import Week, LabourAttendance
+
+from . import attendance as attendance
+from . import compaction as compaction
+from . import ledger as ledger
+from .models import LedgerSource, Week, LabourAttendance, WeekLabourAssignment
+
+
+def _by_week(pairs):
+    """{week_id: labour_ids} of (week_id, labour_id) pairs."""
+    labours_by_week = {}
+    for week_id, labour_id in pairs:
+        labours_by_week.setdefault(week_id, set()).add(labour_id)
+    return labours_by_week
+
+
+def _sync_ledger(pairs):
+    """Bring the ledger in line for (week_id, labour_id) pairs."""
+    labours_by_week = _by_week(pairs)
+    for week in Week.objects.filter(id__in=labours_by_week.keys()):
+        ledger.sync_week(week, labours_by_week[week.id], source=LedgerSource.ASSIGNMENT)
+
+
+def _remove_attendance(pairs):
+    """Delete the attendance of (week_id, labour_id) pairs, then sync the ledger."""
+    labours_by_week = _by_week(pairs)
+    for week in Week.objects.filter(id__in=labours_by_week.keys(), is_compacted=True):
+        compaction.expand_week(week)
+    for week_id, labour_ids in labours_by_week.items():
+        LabourAttendance.objects.filter(week=week_id, labour__in=labour_ids).delete()
+    _sync_ledger(pairs)
 
 
 @receiver(m2m_changed, sender=Week.labours.through)
-def manage_labour_attendance(_sender, instance, action, pk_set, **kwargs):
+def manage_labour_attendance(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse means labour.weeks was changed, so instance is a Labour
+    # and pk_set holds week ids
+    def pairs(ids):
+        if reverse:
+            return [(week_id, instance.pk) for week_id in ids]
+        return [(instance.pk, labour_id) for labour_id in ids]
+
     # Action: When Labours are ADDED to the week
     if action == "post_add":
-        days = instance.days.all()
-        for labour_id in pk_set:
-            for day in days:
-                # Creates records if they don't exist
-                LabourAttendance.objects.get_or_create(
-                    daily_entry=day,
-                    labour_id=labour_id,
-                )
+        # Creates records if they don't exist, in a single insert
+        attendance.populate(pairs(pk_set))
+        _sync_ledger(pairs(pk_set))
 
     # Action: When Labours are REMOVED from the week
     elif action == "post_remove":
-        day_ids = instance.days.values_list("id", flat=True)
-
         # Delete all attendance records for the removed labourers in this week
-        LabourAttendance.objects.filter(
-            daily_entry_id__in=day_ids, labour_id__in=pk_set
-        ).delete()
+        _remove_attendance(pairs(pk_set))
+
+    # clear() doesn't say who was removed, remember it before
+    elif action == "pre_clear":
+        if reverse:
+            ids = instance.weeks.values_list("id", flat=True)
+        else:
+            ids = instance.labours.values_list("id", flat=True)
+        instance._cleared_pairs = pairs(list(ids))
+
+    elif action == "post_clear":
+        _remove_attendance(getattr(instance, "_cleared_pairs", []))
+        instance._cleared_pairs = []
+
+
+@receiver(pre_delete, sender=Week)
+def reverse_deleted_week(sender, instance, **kwargs):
+    # Also runs for weeks deleted with their site
+    ledger.reverse_week(instance)
+
+
+@receiver(post_save, sender=WeekLabourAssignment)
+def create_assignment_attendance(sender, instance, created, **kwargs):
+    # Assignments created directly don't go through week.labours.add()
+    if created:
+        attendance.populate([(instance.week_id, instance.labour_id)])
+
+    # The wage may have changed, attendance keeps its own copy, and the
+    # ledger the pay
+    attendance.sync_wages(instance.week_id, [instance.labour_id])
+    ledger.sync_week(
+        instance.week, [instance.labour_id], source=LedgerSource.ASSIGNMENT
+    )
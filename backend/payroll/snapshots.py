@@ -0,0 +1,58 @@
+from . import ledger as ledger
+from . import models as models
+
+
+def freeze_week(week):
+    """
+    Write the closing balance of every labourer of a week being locked.
+
+    Any older snapshot of the week is replaced, so locking twice is fine.
+    The opening and closing balances are the week sheet's, the totals are
+    everything up to the week's end on every site, since opening_totals
+    starts later weeks from them whichever site they are on.
+    """
+    assignments = list(
+        models.WeekLabourAssignment.objects.filter(week=week).select_related("labour")
+    )
+    labour_ids = [assignment.labour_id for assignment in assignments]
+
+    opening = ledger.opening_totals(week, labour_ids)
+    current = ledger.recorded_week_totals(week, labour_ids)
+    # This week and other sites' weeks starting the same day
+    same_start = ledger.week_start_totals(week.start_date, labour_ids)
+
+    snapshots = []
+    for assignment in assignments:
+        before = opening.get(assignment.labour_id, ledger.EMPTY)
+        during = current.get(assignment.labour_id, ledger.EMPTY)
+        through = same_start.get(assignment.labour_id, ledger.EMPTY)
+        opening_balance = (
+            assignment.labour.previous_balance
+            + before.earned
+            - (before.advance + before.paid)
+        )
+        snapshots.append(
+            models.WeekLabourBalanceSnapshot(
+                assignment=assignment,
+                labour_id=assignment.labour_id,
+                week_start=week.start_date,
+                opening_balance=opening_balance,
+                earned=during.earned,
+                advance=during.advance,
+                paid=during.paid,
+                closing_balance=opening_balance
+                + during.earned
+                - (during.advance + during.paid),
+                total_earned=before.earned + through.earned,
+                total_advance=before.advance + through.advance,
+                total_paid=before.paid + through.paid,
+            )
+        )
+
+    thaw_week(week)
+    return models.WeekLabourBalanceSnapshot.objects.bulk_create(snapshots)
+
+
+def thaw_week(week):
+    """Drop the snapshots of a week that an admin reopened."""
+    models.WeekLabourBalanceSnapshot.objects.filter(assignment__week=week).delete()
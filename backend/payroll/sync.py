@@ -0,0 +1,204 @@
+"""
+Replaying attendance recorded by the mobile app while it was offline.
+
+The app queues one mutation per labourer and day it changed, each with the
+time it was made and a key of its own, and sends the queue in one batch
+when it reconnects. The whole batch is checked with a handful of queries,
+applied with one upsert and journalled in one transaction.
+
+A mutation is applied unless the day is unknown or the labourer isn't on
+its week (invalid), the week is locked or the day was already closed when
+the change was made (locked), or a change made later for the same
+labourer and day was applied already (stale). Conflicting mutations come
+back with what the server has, so the app can show it.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import ledger as ledger
+from . import models as models
+from .attendance import ATTENDANCE_FIELDS
+
+
+class SyncConflict(Exception):
+    pass
+
+
+def _check(mutation, day, wages, latest):
+    """The status and detail a mutation gets, given what is known so far."""
+    if day is None:
+        return models.SyncStatus.INVALID, "Unknown day."
+    if (day.week_id, mutation["labour"]) not in wages:
+        return models.SyncStatus.INVALID, "The labourer isn't on this week."
+    if not day.week.admin_unlocked:
+        return models.SyncStatus.LOCKED, "The week is locked."
+
+    made_on = timezone.localdate(mutation["client_timestamp"])
+    if not day.admin_unlocked and (day.is_saved or made_on != day.date):
+        return models.SyncStatus.LOCKED, "The day was closed."
+
+    applied = latest.get((day.id, mutation["labour"]))
+    if applied is not None and applied >= mutation["client_timestamp"]:
+        return models.SyncStatus.STALE, "A later change was already applied."
+
+    return models.SyncStatus.APPLIED, ""
+
+
+def apply_mutations(user, mutations):
+    """
+    Apply a batch of the user's offline attendance mutations.
+
+    Mutations whose key the user sent before are not applied again, they
+    get their recorded outcome with replayed set. A key repeated within
+    the batch counts once. Returns one result per mutation, in order.
+
+    Raises SyncConflict if a concurrent batch recorded one of the keys
+    first, which the days' locks leave only for keys sent with different
+    days; sending the batch again replays it.
+    """
+    first_by_key = {}
+    for mutation in mutations:
+        first_by_key.setdefault(mutation["key"], mutation)
+
+    with transaction.atomic():
+        # Locking the days keeps two batches for the same days in order. A
+        # batch resent while the first is still running waits here, and
+        # then finds the first one's keys recorded
+        days = (
+            models.DailyEntry.objects.select_related("week")
+            .select_for_update(of=("self",))
+            .in_bulk({mutation["daily_entry"] for mutation in first_by_key.values()})
+        )
+        recorded = {
+            key: (status, detail)
+            for key, status, detail in models.AttendanceMutation.objects.filter(
+                user=user, key__in=first_by_key.keys()
+            ).values_list("key", "status", "detail")
+        }
+        fresh = [
+            mutation for key, mutation in first_by_key.items() if key not in recorded
+        ]
+
+        day_ids = {mutation["daily_entry"] for mutation in fresh}
+        labour_ids = {mutation["labour"] for mutation in fresh}
+        wages = {
+            (week_id, labour_id): wage
+            for week_id, labour_id, wage in models.WeekLabourAssignment.objects.filter(
+                week__in={day.week_id for day in days.values()},
+                labour__in=labour_ids,
+            ).values_list("week", "labour", "weekly_daily_wage")
+        }
+        latest = {
+            (row["daily_entry"], row["labour"]): row["latest"]
+            for row in models.AttendanceMutation.objects.filter(
+                daily_entry__in=day_ids,
+                labour__in=labour_ids,
+                status=models.SyncStatus.APPLIED,
+            )
+            .values("daily_entry", "labour")
+            .annotate(latest=Max("client_timestamp"))
+        }
+
+        # Latest first, so an older change in the same batch comes out stale
+        outcomes = {}
+        upserts = []
+        touched = {}
+        for mutation in sorted(
+            fresh, key=lambda mutation: mutation["client_timestamp"], reverse=True
+        ):
+            day = days.get(mutation["daily_entry"])
+            status, detail = _check(mutation, day, wages, latest)
+            outcomes[mutation["key"]] = (status, detail)
+            if status != models.SyncStatus.APPLIED:
+                continue
+
+            latest[(day.id, mutation["labour"])] = mutation["client_timestamp"]
+            touched.setdefault(day.week_id, (day.week, set()))[1].add(
+                mutation["labour"]
+            )
+            upserts.append(
+                models.LabourAttendance(
+                    daily_entry_id=day.id,
+                    labour_id=mutation["labour"],
+                    date=day.date,
+                    week_id=day.week_id,
+                    site_id=day.week.site_id,
+                    daily_wage=wages[(day.week_id, mutation["labour"])],
+                    **{field: mutation[field] for field in ATTENDANCE_FIELDS},
+                )
+            )
+
+        if upserts:
+            models.LabourAttendance.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=["daily_entry", "labour", "date"],
+                update_fields=[*ATTENDANCE_FIELDS, "daily_wage"],
+            )
+        for week, week_labour_ids in touched.values():
+            ledger.sync_week(week, week_labour_ids)
+
+        # Invalid mutations may point at rows that don't exist, only the
+        # others are journalled
+        try:
+            models.AttendanceMutation.objects.bulk_create(
+                [
+                    models.AttendanceMutation(
+                        user=user,
+                        key=mutation["key"],
+                        daily_entry_id=mutation["daily_entry"],
+                        labour_id=mutation["labour"],
+                        client_timestamp=mutation["client_timestamp"],
+                        status=outcomes[mutation["key"]][0],
+                        detail=outcomes[mutation["key"]][1],
+                    )
+                    for mutation in fresh
+                    if outcomes[mutation["key"]][0] != models.SyncStatus.INVALID
+                ]
+            )
+        except IntegrityError:
+            raise SyncConflict("Some of the keys were just recorded, send again.")
+
+        server = _current_attendance(
+            mutation
+            for mutation in fresh
+            if outcomes[mutation["key"]][0]
+            in (models.SyncStatus.STALE, models.SyncStatus.LOCKED)
+        )
+
+    results = []
+    for mutation in mutations:
+        key = mutation["key"]
+        replayed = key in recorded
+        status, detail = recorded[key] if replayed else outcomes[key]
+        result = {
+            "key": key,
+            "status": models.SyncStatus(status).label.lower(),
+            "detail": detail,
+            "replayed": replayed,
+        }
+        if not replayed and (mutation["daily_entry"], mutation["labour"]) in server:
+            result["server"] = server[(mutation["daily_entry"], mutation["labour"])]
+        results.append(result)
+    return results
+
+
+def _current_attendance(mutations):
+    """What the server has for the labourers and days of the mutations."""
+    wanted = {(mutation["daily_entry"], mutation["labour"]) for mutation in mutations}
+    if not wanted:
+        return {}
+
+    rows = models.LabourAttendance.objects.filter(
+        daily_entry__in={day_id for day_id, _labour_id in wanted},
+        labour__in={labour_id for _day_id, labour_id in wanted},
+    ).values("daily_entry", "labour", *ATTENDANCE_FIELDS)
+    return {
+        (row["daily_entry"], row["labour"]): {
+            field: row[field] for field in ATTENDANCE_FIELDS
+        }
+        for row in rows
+        if (row["daily_entry"], row["labour"]) in wanted
+    }
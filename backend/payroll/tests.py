@@ -1,3 +1,1320 @@
-from django.test import TestCase
+import importlib
+import math
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from labours import models as labours_models
+from sites import models as sites_models
+from users import models as users_models
+
+from . import balances
+from . import compaction
+from . import ledger
+from . import liability
+from . import models
+from . import partitions
+from . import punches
+from . import registers
+from . import rollforward
+from . import snapshots
+from . import wages
+from .attendance import ATTENDANCE_FIELDS
+from .management.commands.benchmark_week_balances import legacy_week_balances
+
+SATURDAY = date(2025, 1, 4)
+
+# Silk records every request in the database, and explains the queries
+# of the last one it saw, neither of which should count
+WITHOUT_SILK = [name for name in settings.MIDDLEWARE if not name.startswith("silk.")]
+
+
+def counted(queries):
+    """The SQL of the captured queries, without silk's EXPLAINs."""
+    return [
+        query["sql"]
+        for query in queries.captured_queries
+        if not query["sql"].startswith("EXPLAIN")
+    ]
+
+
+def make_labour(site, name="Labour", previous_balance=0):
+    return labours_models.Labour.objects.create(
+        site=site,
+        name=name,
+        type=labours_models.LabourType.DAILY_WORK,
+        gender=labours_models.GenderType.MALE,
+        previous_balance=Decimal(previous_balance),
+    )
+
+
+def make_week(site, start_date, wages):
+    """A week with the labourers of wages ({labour: daily wage}) on it."""
+    week = models.Week.objects.create(site=site, start_date=start_date)
+    for labour, wage in wages.items():
+        models.WeekLabourAssignment.objects.create(
+            week=week, labour=labour, weekly_daily_wage=Decimal(wage)
+        )
+    return week
+
+
+def work(week, labour, days):
+    """Mark the labourer present on the first days of the week."""
+    present = models.LabourAttendance.objects.filter(week=week, labour=labour).order_by(
+        "date"
+    )[:days]
+    models.LabourAttendance.objects.filter(
+        id__in=list(present.values_list("id", flat=True))
+    ).update(is_present=True)
+    ledger.sync_week(week, [labour.id])
+
+
+class SnapshotTests(TestCase):
+    def test_snapshot_totals_include_other_sites_weeks_starting_the_same_day(self):
+        site, other_site = (
+            sites_models.Site.objects.create(name=name, address="-")
+            for name in ("A", "B")
+        )
+        labour = make_labour(site)
+        week = make_week(site, SATURDAY, {labour: 100})
+        other_week = make_week(other_site, SATURDAY, {labour: 100})
+        work(week, labour, 1)
+        work(other_week, labour, 1)
+
+        week.admin_unlocked = False
+        week.save()
+        snapshots.freeze_week(week)
+
+        next_week = make_week(site, SATURDAY + timedelta(weeks=1), {labour: 100})
+        opening = ledger.opening_totals(next_week, [labour.id])[labour.id]
+        self.assertEqual(opening.earned, Decimal("200"))
+
+        # The same as without the snapshot
+        models.WeekLabourBalanceSnapshot.objects.all().delete()
+        opening = ledger.opening_totals(next_week, [labour.id])[labour.id]
+        self.assertEqual(opening.earned, Decimal("200"))
+
+
+def make_labours(site, count):
+    return [make_labour(site, f"Labour {i}") for i in range(count)]
+
+
+def attendance_batches(rows):
+    """The inserts bulk_create needs for rows attendance rows."""
+    fields = models.LabourAttendance._meta.concrete_fields
+    batch_size = min(1000, connection.ops.bulk_batch_size(fields, [None] * rows))
+    return math.ceil(rows / batch_size)
+
+
+class PopulationTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+
+    def test_adding_labourers_is_the_same_queries_however_many(self):
+        for start_date, count in ((SATURDAY, 2), (SATURDAY + timedelta(weeks=1), 60)):
+            week = make_week(self.site, start_date, {})
+            labours = make_labours(self.site, count)
+            # Nine queries plus the attendance insert, which sqlite splits
+            # into batches of the query parameters it takes
+            with CaptureQueriesContext(connection) as queries:
+                week.labours.add(*labours, through_defaults={"weekly_daily_wage": 500})
+            self.assertEqual(len(counted(queries)), 9 + attendance_batches(count * 7))
+            self.assertEqual(
+                models.LabourAttendance.objects.filter(week=week).count(), count * 7
+            )
+
+    def test_direct_assignments_get_attendance(self):
+        week = make_week(self.site, SATURDAY, {make_labour(self.site): 500})
+        self.assertEqual(models.LabourAttendance.objects.filter(week=week).count(), 7)
+        self.assertEqual(
+            set(
+                models.LabourAttendance.objects.filter(week=week).values_list(
+                    "daily_wage", flat=True
+                )
+            ),
+            {Decimal("500")},
+        )
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class RegisterTests(TestCase):
+    def test_openings_match_the_week_sheet_with_another_site(self):
+        site, other_site = (
+            sites_models.Site.objects.create(name=name, address="-")
+            for name in ('Site "A" ü', "B")
+        )
+        labour = make_labour(site, previous_balance=50)
+        work(make_week(other_site, SATURDAY, {labour: 100}), labour, 2)
+        week = make_week(site, SATURDAY + timedelta(weeks=1), {labour: 100})
+        work(week, labour, 1)
+
+        rows = list(registers.register_rows(models.Week.objects.filter(site=site)))
+        (assignment,) = balances.week_balances(week)
+        self.assertEqual(rows[0][4], assignment.opening_balance)
+        self.assertEqual(rows[0][4], Decimal("250"))
+
+    def test_export_filename_is_quoted(self):
+        site = sites_models.Site.objects.create(name='Site "A" ü', address="-")
+        user = users_models.CustomUser.objects.create_user(
+            "admin@example.com", role=users_models.Roles.ADMIN
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f"/api/sites/{site.id}/payroll-export/")
+        self.assertEqual(
+            response["Content-Disposition"],
+            "attachment; filename*=utf-8''payroll-Site%20%22A%22%20%C3%BC.csv",
+        )
+
+
+class EarningsTests(TestCase):
+    def test_fractional_multipliers_are_not_rounded_before_the_wage(self):
+        site = sites_models.Site.objects.create(name="A", address="-")
+        labour = make_labour(site)
+        week = make_week(site, SATURDAY, {labour: 999})
+        days = models.LabourAttendance.objects.filter(week=week).order_by("date")
+        for day, multiplier in zip(days, [1 / 3, 0.125, 1.5]):
+            day.is_present = True
+            day.multiplier = multiplier
+            day.save()
+
+        totals = ledger.week_totals([week.id])[(week.id, labour.id)]
+        # 333 + 124.875 + 1498.5, rounded once
+        self.assertEqual(totals.earned, Decimal("1956.38"))
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class WeekQueryTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def make_worked_week(self, start_date, count):
+        labours = make_labours(self.site, count)
+        make_week(
+            self.site, start_date - timedelta(weeks=1), dict.fromkeys(labours, 500)
+        )
+        week = make_week(self.site, start_date, dict.fromkeys(labours, 500))
+        for labour in labours:
+            work(week, labour, 3)
+        return week
+
+    def assert_budget(self, url_of, budget):
+        for start_date, count in ((SATURDAY, 2), (SATURDAY + timedelta(weeks=4), 25)):
+            week = self.make_worked_week(start_date, count)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url_of(week))
+            self.assertEqual(response.status_code, 200)
+            sql = counted(queries)
+            self.assertEqual(len(sql), budget, "\n".join(sql))
+            for query in sql:
+                if "payroll_labourattendance" in query:
+                    self.assertNotIn('JOIN "payroll_dailyentry"', query)
+
+    def test_week_sheet_query_budget(self):
+        self.assert_budget(
+            lambda week: f"/api/sites/{self.site.id}/weeks/{week.id}/", 10
+        )
+
+    def test_payment_query_budget(self):
+        self.assert_budget(lambda week: f"/api/weeks/{week.id}/payment/", 7)
+
+    def test_attendance_totals_plan_skips_the_days(self):
+        week = self.make_worked_week(SATURDAY, 2)
+        rows = ledger.grouped_attendance(
+            models.LabourAttendance.objects.filter(week__in=[week.id])
+        )
+        plan = rows.explain()
+        self.assertNotIn("payroll_dailyentry", plan)
+        self.assertIn("payroll_labourattendance", plan)
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL.")
+class PartitionTests(TestCase):
+    def test_only_compacted_weeks_are_detached(self):
+        site = sites_models.Site.objects.create(name="A", address="-")
+        labour = make_labour(site)
+        week = make_week(site, SATURDAY, {labour: 100})
+        work(week, labour, 2)
+        partitions.convert("month", 0, SATURDAY)
+
+        week.admin_unlocked = False
+        week.save()
+        with self.assertRaises(partitions.PartitionError):
+            partitions.detach(date(2025, 3, 1))
+
+        compaction.compact_week(week)
+        before = ledger.week_totals([week.id])
+        self.assertTrue(partitions.detach(date(2025, 3, 1)))
+        self.assertEqual(ledger.week_totals([week.id]), before)
+        self.assertEqual(ledger.sync_week(week, [labour.id]), [])
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class CompactedWeekTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.labour = make_labour(self.site)
+        self.week = make_week(self.site, SATURDAY, {self.labour: 100})
+        work(self.week, self.labour, 2)
+        self.week.admin_unlocked = False
+        self.week.save()
+        compaction.compact_week(self.week)
+        self.day = self.week.days.first()
+        self.url = f"/api/sites/{self.site.id}/weeks/{self.week.id}/"
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def test_week_sheet_shows_archived_attendance(self):
+        days = self.client.get(self.url).json()["daily_entry"]
+        self.assertEqual(
+            [day["attendance"][0]["is_present"] for day in days],
+            [True, True, False, False, False, False, False],
+        )
+
+        columns = self.client.get(self.url, {"format": "columnar"}).json()
+        self.assertEqual(columns["labour_ids"], [str(self.labour.id)])
+        self.assertEqual(columns["daily_entry"][0]["is_present"], [True])
+
+    def test_day_shows_archived_attendance(self):
+        url = f"{self.url}days/{self.day.id}/"
+        (row,) = self.client.get(url).json()["attendance"]
+        self.assertTrue(row["is_present"])
+        columns = self.client.get(url, {"format": "columnar"}).json()
+        self.assertEqual(columns["attendance"]["is_present"], [True])
+
+    def test_saving_a_day_keeps_the_week_compacted(self):
+        url = f"{self.url}days/{self.day.id}/"
+        self.client.patch(url, {"admin_unlocked": False}, format="json")
+        self.week.refresh_from_db()
+        self.assertTrue(self.week.is_compacted)
+
+        self.client.patch(url, {"admin_unlocked": True}, format="json")
+        self.week.refresh_from_db()
+        self.assertFalse(self.week.is_compacted)
+        self.assertEqual(
+            models.LabourAttendance.objects.filter(week=self.week).count(), 7
+        )
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class AttendanceSyncTests(TestCase):
+    def setUp(self):
+        site = sites_models.Site.objects.create(name="A", address="-")
+        self.labour = make_labour(site)
+        week = make_week(site, SATURDAY, {self.labour: 100})
+        self.day = week.days.first()
+        self.day.admin_unlocked = True
+        self.day.save()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def sync(self):
+        return self.client.post(
+            "/api/attendance/sync/",
+            {
+                "mutations": [
+                    {
+                        "key": "one",
+                        "daily_entry": str(self.day.id),
+                        "client_timestamp": "2025-01-04T10:00:00Z",
+                        "labour": str(self.labour.id),
+                        "is_present": True,
+                        "advance_taken": 0,
+                        "payment_type": models.PaymentType.values[0],
+                        "multiplier": 1,
+                    }
+                ]
+            },
+            format="json",
+        )
+
+    def test_resent_batch_is_replayed(self):
+        self.assertFalse(self.sync().json()["results"][0]["replayed"])
+        self.assertTrue(self.sync().json()["results"][0]["replayed"])
+
+    def test_key_recorded_meanwhile_is_a_conflict(self):
+        # What the insert of a batch racing another with the same keys gets
+        with mock.patch.object(
+            models.AttendanceMutation.objects, "bulk_create", side_effect=IntegrityError
+        ):
+            response = self.sync()
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(
+            models.LabourAttendance.objects.filter(is_present=True).exists()
+        )
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class PayrollHistoryTests(TestCase):
+    def test_weeks_without_movement_carry_the_balance(self):
+        site = sites_models.Site.objects.create(name="A", address="-")
+        labour = make_labour(site, previous_balance=50)
+        other = make_labour(site, "Other")
+        for weeks, days in ((0, 2), (1, 0), (2, 1)):
+            week = make_week(
+                site, SATURDAY + timedelta(weeks=weeks), {labour: 100, other: 100}
+            )
+            work(week, labour, days)
+            work(week, other, 3)
+
+        client = APIClient()
+        client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+        url = f"/api/labours/{labour.id}/payroll-history/"
+        rows = client.get(url).json()["results"]
+        self.assertEqual(
+            [(row["days"], row["earned"], row["balance"]) for row in rows],
+            [(1, 100, 350), (0, 0, 250), (2, 200, 250)],
+        )
+
+        # The same balances a page at a time
+        paged = []
+        url += "?page_size=1"
+        while url:
+            page = client.get(url).json()
+            paged.extend(row["balance"] for row in page["results"])
+            url = page["next"]
+        self.assertEqual(paged, [350, 250, 250])
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.labour = make_labour(self.site)
+        self.week = make_week(self.site, SATURDAY, {self.labour: 100})
+        work(self.week, self.labour, 2)
+
+    def assert_in_step(self):
+        recorded = ledger.recorded_week_totals(self.week)
+        for (_week_id, labour_id), totals in ledger.week_totals([self.week.id]).items():
+            self.assertEqual(recorded.pop(labour_id, ledger.EMPTY), totals)
+        # Labourers no longer on the week net to nothing
+        self.assertFalse(any(any(totals) for totals in recorded.values()))
+
+    def test_wage_changed_on_the_assignment_is_in_the_ledger(self):
+        assignment = models.WeekLabourAssignment.objects.get(week=self.week)
+        assignment.weekly_daily_wage = Decimal(150)
+        assignment.save()
+
+        self.assert_in_step()
+        totals = ledger.recorded_week_totals(self.week)[self.labour.id]
+        self.assertEqual(totals.earned, Decimal("300"))
+
+    def test_removed_labourers_are_deleted_in_one_query_per_week(self):
+        others = make_labours(self.site, 3)
+        self.week.labours.add(*others, through_defaults={"weekly_daily_wage": 100})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.week.labours.remove(self.labour, *others)
+        deletes = [
+            sql
+            for sql in counted(queries)
+            if sql.startswith('DELETE FROM "payroll_labourattendance"')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse(models.LabourAttendance.objects.exists())
+        self.assert_in_step()
+
+    def test_check_reports_a_corrupted_row(self):
+        call_command("rebuild_labour_ledger", check=True, stdout=StringIO())
+
+        models.LabourLedgerEntry.objects.filter(labour=self.labour).update(
+            earned=Decimal("1")
+        )
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_labour_ledger", check=True, stdout=out)
+        self.assertIn(f"Week {self.week.id} labour {self.labour.id}", out.getvalue())
+
+    def test_backfill_rounds_pay_like_the_ledger(self):
+        days = models.LabourAttendance.objects.filter(week=self.week).order_by("date")
+        for day, multiplier in zip(days, [1 / 3, 0.125, 1.5]):
+            day.is_present = True
+            day.multiplier = multiplier
+            day.save()
+        models.LabourLedgerEntry.objects.all().delete()
+
+        backfill = importlib.import_module(
+            "payroll.migrations.0007_backfill_labour_ledger"
+        )
+        backfill.backfill_ledger(django_apps, None)
+
+        self.assertEqual(
+            models.LabourLedgerEntry.objects.get(labour=self.labour).earned,
+            ledger.week_totals([self.week.id])[(self.week.id, self.labour.id)].earned,
+        )
+
+
+def pay(week, labour, amount):
+    models.LabourPayment.objects.create(
+        labour=models.WeekLabourAssignment.objects.get(week=week, labour=labour),
+        amount_paid=Decimal(amount),
+    )
+    ledger.sync_week(week, [labour.id], source=models.LedgerSource.PAYMENT)
+
+
+def set_days(week, labour, days):
+    """Set (is_present, multiplier, advance) on the week's days in order."""
+    rows = models.LabourAttendance.objects.filter(week=week, labour=labour)
+    for row, (is_present, multiplier, advance) in zip(rows.order_by("date"), days):
+        row.is_present = is_present
+        row.multiplier = multiplier
+        row.advance_taken = Decimal(advance)
+        row.save()
+    ledger.sync_week(week, [labour.id])
+
+
+class BalanceEngineTests(TestCase):
+    def test_same_balances_as_the_subqueries_it_replaced(self):
+        site, other_site = (
+            sites_models.Site.objects.create(name=name, address="-")
+            for name in ("A", "B")
+        )
+        labours = [make_labour(site, "One", 300), make_labour(site, "Two", 0)]
+        weeks = []
+        for i, wage in enumerate((500, 550, 600)):
+            weeks.append(
+                make_week(
+                    site,
+                    SATURDAY + timedelta(weeks=i),
+                    {labour: wage for labour in labours},
+                )
+            )
+        # Worked on another site in between
+        set_days(
+            make_week(other_site, SATURDAY + timedelta(weeks=1), {labours[0]: 700}),
+            labours[0],
+            [(True, 1, 50)],
+        )
+        for week in weeks:
+            set_days(
+                week,
+                labours[0],
+                [(True, 1.5, 100), (True, 0.5, 0), (False, 1, 200), (True, 1, 0)],
+            )
+            set_days(week, labours[1], [(True, 1, 0), (True, 1, 0)])
+        pay(weeks[0], labours[0], 1000)
+        pay(weeks[0], labours[1], 900)
+        pay(weeks[1], labours[0], 800)
+
+        legacy = {
+            assignment.labour_id: assignment
+            for assignment in legacy_week_balances(weeks[2])
+        }
+        for assignment in balances.week_balances(weeks[2]):
+            old = legacy[assignment.labour_id]
+            self.assertEqual(
+                (
+                    assignment.opening_balance,
+                    assignment.hist_earned,
+                    assignment.hist_advance,
+                    assignment.hist_paid,
+                    assignment.curr_earned,
+                    assignment.curr_advance,
+                    assignment.total_due_to_date,
+                ),
+                (
+                    old.opening_balance,
+                    old.hist_earned,
+                    old.hist_advance,
+                    old.hist_paid,
+                    old.curr_earned,
+                    old.curr_advance,
+                    old.opening_balance + old.curr_earned - old.curr_advance,
+                ),
+            )
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class DaySaveTests(TestCase):
+    def setUp(self):
+        site = sites_models.Site.objects.create(name="A", address="-")
+        self.changed, self.same, self.removed, self.new = make_labours(site, 4)
+        week = make_week(
+            site,
+            SATURDAY,
+            dict.fromkeys([self.changed, self.same, self.removed, self.new], 100),
+        )
+        self.day = week.days.first()
+        self.day.admin_unlocked = True
+        self.day.save()
+        models.LabourAttendance.objects.filter(
+            daily_entry=self.day, labour=self.new
+        ).delete()
+        self.url = f"/api/sites/{site.id}/weeks/{week.id}/days/{self.day.id}/"
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def ids(self):
+        return dict(
+            models.LabourAttendance.objects.filter(daily_entry=self.day).values_list(
+                "labour", "id"
+            )
+        )
+
+    def item(self, labour, is_present=False):
+        return {
+            "labour": str(labour.id),
+            "is_present": is_present,
+            "advance_taken": "0.00",
+            "payment_type": models.PaymentType.BANK_TRANSFER,
+            "multiplier": 1,
+        }
+
+    def test_only_what_changed_is_written(self):
+        before = self.ids()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                self.url,
+                {
+                    "attendances": [
+                        self.item(self.changed, is_present=True),
+                        self.item(self.same),
+                        self.item(self.new, is_present=True),
+                    ]
+                },
+                format="json",
+            )
+
+        self.assertEqual(
+            response.json()["changes"],
+            {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1},
+        )
+        after = self.ids()
+        self.assertEqual(after.keys(), {self.changed.id, self.same.id, self.new.id})
+        self.assertEqual(after[self.changed.id], before[self.changed.id])
+        self.assertEqual(after[self.same.id], before[self.same.id])
+        self.assertEqual(
+            set(
+                models.LabourAttendance.objects.filter(
+                    daily_entry=self.day, is_present=True
+                ).values_list("labour", flat=True)
+            ),
+            {self.changed.id, self.new.id},
+        )
+        # The unchanged labourer's row isn't in any write
+        writes = [
+            sql
+            for sql in counted(queries)
+            if sql.startswith(("INSERT", "UPDATE", "DELETE"))
+            and "payroll_labourattendance" in sql
+        ]
+        self.assertTrue(writes)
+        for sql in writes:
+            for value in (self.same.id, before[self.same.id]):
+                self.assertNotIn(value.hex, sql)
+                self.assertNotIn(str(value), sql)
+
+
+class RollForwardTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.labours = make_labours(self.site, 2)
+        make_week(self.site, SATURDAY, {self.labours[0]: 500, self.labours[1]: 650})
+        self.next_start = SATURDAY + timedelta(weeks=1)
+
+    def test_labourers_and_wages_are_carried_over(self):
+        new_site = sites_models.Site.objects.create(name="B", address="-")
+        report = rollforward.roll_forward(self.next_start)
+
+        self.assertEqual(
+            [(row["name"], row["labours"]) for row in report], [("A", 2), ("B", 0)]
+        )
+        week = models.Week.objects.get(site=self.site, start_date=self.next_start)
+        self.assertEqual(str(report[0]["week"]), str(week.id))
+        self.assertEqual(
+            set(
+                models.WeekLabourAssignment.objects.filter(week=week).values_list(
+                    "labour", "weekly_daily_wage"
+                )
+            ),
+            {(self.labours[0].id, Decimal(500)), (self.labours[1].id, Decimal(650))},
+        )
+        self.assertEqual(week.days.count(), 7)
+        self.assertEqual(
+            models.LabourAttendance.objects.filter(week=week).count(), 2 * 7
+        )
+        self.assertTrue(
+            models.Week.objects.filter(site=new_site, start_date=self.next_start)
+        )
+
+    def test_existing_weeks_are_skipped(self):
+        rollforward.roll_forward(self.next_start)
+        (row,) = rollforward.roll_forward(self.next_start)
+        self.assertEqual(row["skipped"], "Week already exists")
+        self.assertEqual(
+            models.Week.objects.filter(start_date=self.next_start).count(), 1
+        )
+
+    def test_week_opened_by_a_concurrent_run_skips_only_that_site(self):
+        sites_models.Site.objects.create(name="B", address="-")
+        # The other run commits between the check and the insert of A
+        make_week(self.site, self.next_start, {})
+        with mock.patch.object(QuerySet, "exists", return_value=False):
+            report = rollforward.roll_forward(self.next_start)
+
+        self.assertEqual(report[0]["skipped"], "Week already exists")
+        self.assertNotIn("skipped", report[1])
+        self.assertEqual(
+            models.Week.objects.filter(start_date=self.next_start).count(), 2
+        )
+
+    def test_command_reports_every_site(self):
+        out = StringIO()
+        call_command(
+            "roll_forward_weeks",
+            start_date=self.next_start,
+            stdout=out,
+        )
+        self.assertIn("2 labourers", out.getvalue())
+        self.assertIn(f"Week of {self.next_start}: 1 sites", out.getvalue())
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class MusterRollTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.url = f"/api/sites/{self.site.id}/muster-roll/"
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def muster_roll(self, start_date, end_date):
+        response = self.client.get(
+            f"{self.url}?start_date={start_date}&end_date={end_date}"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_budget_is_the_same_for_a_week_and_a_year(self):
+        labours = make_labours(self.site, 3)
+        # Weeks on both sides of the new year, one of them compacted
+        start = SATURDAY - timedelta(weeks=4)
+        for i in range(12):
+            week = make_week(
+                self.site, start + timedelta(weeks=i), dict.fromkeys(labours, 500)
+            )
+            for labour in labours:
+                work(week, labour, 2)
+        week.admin_unlocked = False
+        week.save()
+        compaction.compact_week(week)
+
+        counts = []
+        for end_date in (start + timedelta(days=6), start + timedelta(days=365)):
+            with CaptureQueriesContext(connection) as queries:
+                roll = self.muster_roll(start, end_date)
+            counts.append(len(counted(queries)))
+            self.assertEqual(len(roll["labours"]), 3)
+        # The site and the attendance rows
+        self.assertEqual(counts, [2, 2])
+        self.assertEqual(roll["labours"][0]["total_days"], 12 * 2)
+
+    def test_rows_are_pivoted_per_labourer_and_date(self):
+        asha, bala = make_labour(self.site, "Asha"), make_labour(self.site, "Bala")
+        first = make_week(self.site, SATURDAY, {asha: 500, bala: 500})
+        set_days(first, asha, [(True, 1, 50), (True, 1.5, 0), (False, 1, 20)])
+        set_days(first, bala, [(True, 0.5, 0)])
+        first.admin_unlocked = False
+        first.save()
+        compaction.compact_week(first)
+        second = make_week(self.site, SATURDAY + timedelta(weeks=1), {asha: 500})
+        set_days(second, asha, [(True, 1, 10)])
+
+        roll = self.muster_roll(SATURDAY, SATURDAY + timedelta(days=8))
+        self.assertEqual(
+            roll["dates"],
+            [str(SATURDAY + timedelta(days=i)) for i in range(9)],
+        )
+        asha_row, bala_row = roll["labours"]
+        self.assertEqual(asha_row["id"], str(asha.id))
+        self.assertEqual(asha_row["name"], "Asha")
+        self.assertEqual(
+            asha_row["present"], [True, True] + [False] * 5 + [True, False]
+        )
+        self.assertEqual(asha_row["multiplier"], [1, 1.5] + [0] * 5 + [1, 0])
+        self.assertEqual(asha_row["advance"], [50, 0, 20] + [0] * 4 + [10, 0])
+        self.assertEqual(
+            (
+                asha_row["total_days"],
+                asha_row["total_units"],
+                asha_row["total_advance"],
+            ),
+            (3, 3.5, 80),
+        )
+
+        # Not on the second week
+        self.assertEqual(bala_row["present"], [True] + [False] * 6 + [None, None])
+        self.assertEqual(bala_row["multiplier"], [0.5] + [0] * 8)
+        self.assertEqual(
+            (
+                bala_row["total_days"],
+                bala_row["total_units"],
+                bala_row["total_advance"],
+            ),
+            (1, 0.5, 0),
+        )
+
+
+class LiabilityTests(TestCase):
+    TODAY = SATURDAY + timedelta(days=3)
+
+    def make_site(self, name):
+        site = sites_models.Site.objects.create(name=name, address="-")
+        labours = [make_labour(site, "One", 200), make_labour(site, "Two")]
+        before = make_week(site, SATURDAY - timedelta(weeks=1), {labours[0]: 100})
+        set_days(before, labours[0], [(True, 1, 30)])
+        pay(before, labours[0], 100)
+        week = make_week(site, SATURDAY, dict.fromkeys(labours, 100))
+        for labour in labours:
+            # A third of the wage a day, two days by bank transfer and two
+            # in cash
+            set_days(week, labour, [(True, 1 / 3, 10)] * 4)
+            models.LabourAttendance.objects.filter(
+                week=week, labour=labour, date__gte=SATURDAY + timedelta(days=2)
+            ).update(payment_type=models.PaymentType.CASH)
+        return week
+
+    def test_due_is_the_week_sheet_total_due(self):
+        week = self.make_site("A")
+        (site,) = liability.payroll_liability(self.TODAY)["sites"]
+
+        assignments = balances.week_balances(week)
+        self.assertEqual(
+            site["total_due"],
+            sum(assignment.total_due_to_date for assignment in assignments),
+        )
+        # 133.333..., rounded once rather than as 66.67 per payment type
+        self.assertEqual(
+            {assignment.curr_earned for assignment in assignments}, {Decimal("133.33")}
+        )
+        self.assertEqual(site["total_due"], Decimal("170") + 2 * Decimal("93.33"))
+        self.assertEqual(
+            (site["advance"], site["advance_cash"], site["advance_bank_transfer"]),
+            (Decimal("80"), Decimal("40"), Decimal("40")),
+        )
+
+    def test_query_budget_is_the_same_for_one_site_and_many(self):
+        counts = []
+        for names in (["A"], ["B", "C", "D"]):
+            for name in names:
+                self.make_site(name)
+            with CaptureQueriesContext(connection) as queries:
+                report = liability.payroll_liability(self.TODAY)
+            counts.append(len(counted(queries)))
+            self.assertEqual(len(report["sites"]), len(names) + len(counts) - 1)
+        self.assertEqual(counts[0], counts[1])
+
+
+def columnar_rows(labour_ids, columns):
+    """The attendance rows of a day's columns, without the empty slots."""
+    return [
+        {
+            "labour": labour_id,
+            **{field: columns[field][i] for field in ATTENDANCE_FIELDS},
+        }
+        for i, labour_id in enumerate(labour_ids)
+        if columns["is_present"][i] is not None
+    ]
+
+
+def by_labour(rows):
+    return sorted(rows, key=lambda row: row["labour"])
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class ColumnarTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.labours = make_labours(self.site, 3)
+        self.week = make_week(self.site, SATURDAY, dict.fromkeys(self.labours, 500))
+        set_days(self.week, self.labours[0], [(True, 1, 50), (True, 1 / 3, 0)])
+        set_days(self.week, self.labours[1], [(False, 1, 20), (True, 1.5, 0)])
+        models.LabourAttendance.objects.filter(
+            week=self.week, labour=self.labours[1]
+        ).update(payment_type=models.PaymentType.CASH)
+        # No row for the third labourer on the first day
+        self.day = self.week.days.order_by("date").first()
+        models.LabourAttendance.objects.filter(
+            daily_entry=self.day, labour=self.labours[2]
+        ).delete()
+        self.url = f"/api/sites/{self.site.id}/weeks/{self.week.id}/"
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def get(self, url):
+        rows = self.client.get(url).json()
+        columns = self.client.get(f"{url}?format=columnar").json()
+        return rows, columns
+
+    def assert_week_round_trips(self):
+        rows, columns = self.get(self.url)
+        for field in ("id", "start_date", "end_date", "labours", "is_editable"):
+            self.assertEqual(columns[field], rows[field])
+        self.assertEqual(len(columns["daily_entry"]), 7)
+        for day, day_columns in zip(rows["daily_entry"], columns["daily_entry"]):
+            for field in ("id", "date", "is_editable"):
+                self.assertEqual(day_columns[field], day[field])
+            self.assertEqual(
+                by_labour(columnar_rows(columns["labour_ids"], day_columns)),
+                by_labour(day["attendance"]),
+            )
+        self.assertEqual(len(rows["daily_entry"][0]["attendance"]), 2)
+
+    def assert_day_round_trips(self):
+        rows, columns = self.get(f"{self.url}days/{self.day.id}/")
+        for field in ("id", "date", "is_editable"):
+            self.assertEqual(columns[field], rows[field])
+        labours = columns["labours"]
+        self.assertEqual(
+            [
+                dict(zip(labours, values))
+                for values in zip(*(labours[field] for field in labours))
+            ],
+            sorted(rows["labours"], key=lambda labour: labour["name"]),
+        )
+        self.assertEqual(
+            by_labour(columnar_rows(labours["id"], columns["attendance"])),
+            by_labour(rows["attendance"]),
+        )
+
+    def test_week_has_the_rows_of_the_default_json(self):
+        self.assert_week_round_trips()
+        self.week.admin_unlocked = False
+        self.week.save()
+        compaction.compact_week(self.week)
+        self.assert_week_round_trips()
+
+    def test_day_has_the_rows_of_the_default_json(self):
+        self.assert_day_round_trips()
+        self.week.admin_unlocked = False
+        self.week.save()
+        compaction.compact_week(self.week)
+        self.assert_day_round_trips()
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class WeekListTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        labours = make_labours(self.site, 3)
+        self.weeks = []
+        for i in range(5):
+            week = make_week(
+                self.site,
+                SATURDAY + timedelta(weeks=i),
+                dict.fromkeys(labours[: 1 + i % 3], 300 + i),
+            )
+            set_days(week, labours[0], [(True, 1 / 3, 10), (True, 1.5, 0)] * (1 + i))
+            pay(week, labours[0], 100 * i)
+            self.weeks.append(week)
+        self.url = f"/api/sites/{self.site.id}/weeks/"
+        self.client = APIClient()
+        self.client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+
+    def test_summaries_are_the_week_balances(self):
+        rows = self.client.get(self.url).json()
+
+        # Without ?page_size= or a cursor the plain list comes back
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [str(week.id) for week in reversed(self.weeks)],
+        )
+        for row, week in zip(rows, reversed(self.weeks)):
+            assignments = balances.week_balances(week)
+            self.assertEqual(row["headcount"], len(assignments))
+            self.assertEqual(
+                row["earned"],
+                float(sum(assignment.curr_earned for assignment in assignments)),
+            )
+            self.assertEqual(
+                row["advance"],
+                float(sum(assignment.curr_advance for assignment in assignments)),
+            )
+            self.assertEqual(
+                row["paid"],
+                float(
+                    sum(
+                        models.LabourPayment.objects.filter(
+                            labour__week=week
+                        ).values_list("amount_paid", flat=True)
+                    )
+                ),
+            )
+            self.assertEqual(len(row["days"]), 7)
+
+    def test_cursor_pages_have_every_week_once(self):
+        unpaged = self.client.get(self.url).json()
+
+        rows, counts = [], []
+        url = f"{self.url}?page_size=2"
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(url).json()
+            counts.append(len(counted(queries)))
+            self.assertLessEqual(len(page["results"]), 2)
+            rows += page["results"]
+            url = page["next"]
+
+        self.assertEqual(len(counts), 3)
+        self.assertEqual(rows, unpaged)
+        # The week list and the days of the page, whatever the page
+        self.assertEqual(set(counts), {2})
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class WageRevisionTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.labours = make_labours(self.site, 2)
+        self.weeks = []
+        for i in range(3):
+            week = make_week(
+                self.site,
+                SATURDAY + timedelta(weeks=i),
+                dict.fromkeys(self.labours, 500),
+            )
+            for labour in self.labours:
+                work(week, labour, 2)
+            self.weeks.append(week)
+        self.locked = self.weeks[1]
+        self.locked.admin_unlocked = False
+        self.locked.save()
+        self.url = f"/api/sites/{self.site.id}/wage-revision/"
+
+    def revise(self, **kwargs):
+        return wages.revise_wages(
+            self.site.id,
+            Decimal(600),
+            SATURDAY,
+            labour_ids=[labour.id for labour in self.labours],
+            **kwargs,
+        )
+
+    def wages_of(self, week):
+        return set(
+            models.WeekLabourAssignment.objects.filter(week=week).values_list(
+                "weekly_daily_wage", flat=True
+            )
+        ) | set(
+            models.LabourAttendance.objects.filter(week=week).values_list(
+                "daily_wage", flat=True
+            )
+        )
+
+    def post(self, role, **data):
+        client = APIClient()
+        client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                f"{role.name.lower()}@example.com", role=role
+            )
+        )
+        return client.post(
+            self.url,
+            {
+                "labours": [str(labour.id) for labour in self.labours],
+                "effective_week": str(SATURDAY),
+                "daily_wage": "600",
+                **data,
+            },
+            format="json",
+        )
+
+    def test_locked_weeks_are_skipped_without_the_override(self):
+        result = self.revise()
+
+        self.assertEqual(result["skipped_locked_weeks"], [self.locked.start_date])
+        self.assertEqual((result["weeks"], result["revised"]), (2, 4))
+        self.assertEqual(self.wages_of(self.locked), {Decimal(500)})
+        for week in (self.weeks[0], self.weeks[2]):
+            self.assertEqual(self.wages_of(week), {Decimal(600)})
+        # Two days at 100 more, in two weeks, for two labourers
+        self.assertEqual(result["total_balance_delta"], Decimal(800))
+
+        result = self.revise(include_locked=True)
+        self.assertEqual(result["skipped_locked_weeks"], [])
+        self.assertEqual(self.wages_of(self.locked), {Decimal(600)})
+        self.assertEqual(result["total_balance_delta"], Decimal(400))
+        self.locked.refresh_from_db()
+        self.assertFalse(self.locked.admin_unlocked)
+
+    def test_only_admins_revise_locked_weeks(self):
+        response = self.post(users_models.Roles.HEAD_OFFICE, include_locked=True)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.wages_of(self.locked), {Decimal(500)})
+
+        response = self.post(users_models.Roles.ADMIN, include_locked=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.wages_of(self.locked), {Decimal(600)})
+
+    def test_dry_run_reports_the_impact_and_writes_nothing(self):
+        entries = models.LabourLedgerEntry.objects.count()
+        totals = ledger.week_totals([week.id for week in self.weeks])
+
+        result = self.revise(dry_run=True)
+
+        self.assertTrue(result["dry_run"])
+        self.assertEqual(result["total_balance_delta"], Decimal(800))
+        self.assertEqual(
+            [row["balance_delta"] for row in result["labours"]],
+            [Decimal(400), Decimal(400)],
+        )
+        for week in self.weeks:
+            self.assertEqual(self.wages_of(week), {Decimal(500)})
+        self.assertEqual(models.LabourLedgerEntry.objects.count(), entries)
+        self.assertEqual(ledger.week_totals([week.id for week in self.weeks]), totals)
+
+    def test_wages_are_updated_in_one_statement_per_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.revise(include_locked=True)
+
+        updates = [sql for sql in counted(queries) if sql.startswith("UPDATE")]
+        for table in ("payroll_weeklabourassignment", "payroll_labourattendance"):
+            self.assertEqual(
+                len([sql for sql in updates if f'UPDATE "{table}"' in sql]),
+                1,
+                "\n".join(updates),
+            )
+
+
+PUNCHES = """code,timestamp
+A1,2025-01-04T08:00:00
+A1,2025-01-04T17:30:00
+B1,2025-01-04 09:00
+B1,2025-01-04T14:00
+A1,2025-01-05T08:00:00
+B1,not a time
+"""
+
+
+@override_settings(MIDDLEWARE=WITHOUT_SILK)
+class PunchImportTests(TestCase):
+    def setUp(self):
+        self.site = sites_models.Site.objects.create(name="A", address="-")
+        self.asha, self.bala = make_labour(self.site, "Asha"), make_labour(
+            self.site, "Bala"
+        )
+        for labour, code in ((self.asha, "A1"), (self.bala, "B1")):
+            labour.punch_code = code
+            labour.save()
+        self.week = make_week(self.site, SATURDAY, {self.asha: 500, self.bala: 500})
+
+    def days(self):
+        """(is_present, multiplier) per (labour, date) of the first two days."""
+        return {
+            (labour, day): (is_present, multiplier)
+            for labour, day, is_present, multiplier in models.LabourAttendance.objects.filter(
+                week=self.week, date__lte=SATURDAY + timedelta(days=1)
+            ).values_list(
+                "labour", "date", "is_present", "multiplier"
+            )
+        }
+
+    def test_day_multiplier_rules(self):
+        start = datetime(2025, 1, 4, 8)
+        for hours, expected in (
+            (3.9, (False, 1.0)),
+            (4, (True, 0.5)),
+            (7.9, (True, 0.5)),
+            (8, (True, 1.0)),
+            (11.9, (True, 1.0)),
+            (12, (True, 1.5)),
+            (16, (True, 2.0)),
+        ):
+            with self.subTest(hours=hours):
+                end = start + timedelta(hours=hours)
+                self.assertEqual(punches.day_multiplier(start, end, 2), expected)
+        # An entry without an exit
+        self.assertEqual(punches.day_multiplier(start, start, 1), (True, 0.5))
+
+        rules = punches.PunchRules(full_day_hours=9, half_day_hours=5, overtime_hours=2)
+        end = start + timedelta(hours=4.5)
+        self.assertEqual(punches.day_multiplier(start, end, 2, rules), (False, 1.0))
+        end = start + timedelta(hours=11)
+        self.assertEqual(punches.day_multiplier(start, end, 2, rules), (True, 1.5))
+
+    def test_dry_run_reports_the_diff_and_writes_nothing(self):
+        before = self.days()
+        entries = models.LabourLedgerEntry.objects.count()
+
+        report = punches.import_punches(self.site.id, StringIO(PUNCHES), dry_run=True)
+
+        self.assertEqual(report["punches"], 5)
+        self.assertEqual(report["skipped"]["bad_lines"], [7])
+        self.assertEqual(
+            (report["inserted"], report["updated"], report["unchanged"]), (0, 3, 1)
+        )
+        self.assertEqual(
+            [
+                (change["date"], change["name"], change["after"])
+                for change in report["diff"]
+            ],
+            [
+                (SATURDAY, "Asha", {"is_present": True, "multiplier": 1.0}),
+                (SATURDAY, "Bala", {"is_present": True, "multiplier": 0.5}),
+                (
+                    SATURDAY + timedelta(days=1),
+                    "Asha",
+                    {"is_present": True, "multiplier": 0.5},
+                ),
+            ],
+        )
+        self.assertEqual(
+            report["diff"][0]["before"], {"is_present": False, "multiplier": 1.0}
+        )
+        self.assertEqual(self.days(), before)
+        self.assertEqual(models.LabourLedgerEntry.objects.count(), entries)
+
+    def test_reimport_upserts_in_chunks(self):
+        # A row missing from the week is inserted, the others updated
+        models.LabourAttendance.objects.filter(
+            week=self.week, labour=self.bala, date=SATURDAY
+        ).delete()
+        ids = set(
+            models.LabourAttendance.objects.filter(week=self.week).values_list(
+                "id", flat=True
+            )
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            report = punches.import_punches(
+                self.site.id, StringIO(PUNCHES), batch_size=2
+            )
+        self.assertEqual((report["inserted"], report["updated"]), (1, 2))
+        upserts = [
+            sql
+            for sql in counted(queries)
+            if sql.startswith('INSERT INTO "payroll_labourattendance"')
+        ]
+        # Three rows in chunks of two
+        self.assertEqual(len(upserts), 2)
+        self.assertIn("ON CONFLICT", upserts[0])
+
+        days = self.days()
+        self.assertEqual(days[(self.asha.id, SATURDAY)], (True, 1.0))
+        self.assertEqual(days[(self.bala.id, SATURDAY)], (True, 0.5))
+        self.assertEqual(
+            days[(self.asha.id, SATURDAY + timedelta(days=1))], (True, 0.5)
+        )
+        self.assertLessEqual(
+            ids,
+            set(
+                models.LabourAttendance.objects.filter(week=self.week).values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+        self.assertEqual(
+            models.LabourAttendance.objects.filter(week=self.week).count(), 14
+        )
+        # The ledger is synced: a day and a half at 500
+        recorded = ledger.recorded_week_totals(self.week)
+        self.assertEqual(recorded[self.asha.id].earned, Decimal(750))
+
+        report = punches.import_punches(self.site.id, StringIO(PUNCHES))
+        self.assertEqual(
+            (report["inserted"], report["updated"], report["unchanged"]), (0, 0, 4)
+        )
+        self.assertEqual(self.days(), days)
+
+    def test_malformed_file_is_a_bad_request(self):
+        client = APIClient()
+        client.force_authenticate(
+            users_models.CustomUser.objects.create_user(
+                "admin@example.com", role=users_models.Roles.ADMIN
+            )
+        )
+        url = f"/api/sites/{self.site.id}/punch-import/"
+        for content in (b"name,when\nA1,2025-01-04\n", b"code,timestamp\n\xff\xfe\n"):
+            with self.subTest(content=content):
+                response = client.post(
+                    url,
+                    {"file": SimpleUploadedFile("punches.csv", content)},
+                    format="multipart",
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("file", response.json())
+
+        response = client.post(
+            url,
+            {"file": SimpleUploadedFile("punches.csv", PUNCHES.encode())},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 3)
+
+    def test_command_imports_the_file(self):
+        with NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write(PUNCHES)
+            file.flush()
+
+            out = StringIO()
+            call_command(
+                "import_punches",
+                file.name,
+                site=str(self.site.id),
+                dry_run=True,
+                stdout=out,
+            )
+            self.assertIn("Would write 0 new and 3 changed days", out.getvalue())
+            self.assertIn("Skipped bad lines: [7]", out.getvalue())
+            self.assertFalse(self.days()[(self.asha.id, SATURDAY)][0])
+
+            out = StringIO()
+            call_command(
+                "import_punches", file.name, site=str(self.site.id), stdout=out
+            )
+            self.assertIn("Wrote 0 new and 3 changed days", out.getvalue())
+            self.assertTrue(self.days()[(self.asha.id, SATURDAY)][0])
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "import_punches",
+                "missing.csv",
+                site=str(self.site.id),
+                stdout=StringIO(),
+            )
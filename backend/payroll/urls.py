@@ -36,10 +36,50 @@ week_detail = views.WeekViewSet.as_view(
 
 
 urlpatterns = [
+    path(
+        "payroll/liability/",
+        views.PayrollLiabilityView.as_view(),
+    ),
+    path(
+        "attendance/sync/",
+        views.AttendanceSyncView.as_view(),
+    ),
+    path(
+        "weeks/roll-forward/",
+        views.WeekRollForwardView.as_view(),
+    ),
     path(
         "weeks/<uuid:week_id>/payment/",
         views.WeekPaymentListSerializer.as_view(),
     ),
+    path(
+        "labours/<uuid:labour_id>/payroll-history/",
+        views.LabourPayrollHistoryView.as_view(),
+    ),
+    path(
+        "sites/<uuid:site_id>/muster-roll/",
+        views.MusterRollView.as_view(),
+    ),
+    path(
+        "sites/<uuid:site_id>/payroll-export/",
+        views.PayrollExportView.as_view(),
+    ),
+    path(
+        "sites/<uuid:site_id>/weeks/<uuid:week_id>/export/",
+        views.PayrollExportView.as_view(),
+    ),
+    path(
+        "sites/<uuid:site_id>/punch-import/",
+        views.PunchImportView.as_view(),
+    ),
+    path(
+        "sites/<uuid:site_id>/wage-revision/",
+        views.WageRevisionView.as_view(),
+    ),
+    path(
+        "sites/<uuid:site_id>/wage-simulation/",
+        views.WageSimulationView.as_view(),
+    ),
     path(
         "sites/<uuid:site_id>/weeks/",
         week_list,
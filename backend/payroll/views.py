@@ -1,17 +1,35 @@
-from django.db.models.fields import DecimalField
-from django.db.models.aggregates import Sum
-from django.db.models.expressions import OuterRef
-from django.db.models.expressions import F
-from django.db.models.functions.comparison import Coalesce
-from django.db.models.expressions import Value
-from django.db.models.expressions import Subquery
+import io
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework import generics
+from rest_framework.settings import api_settings
 
+from ks_constructions import pagination as pagination
+from labours import models as labours_models
 from sites import models as sites_models
-
+from users import models as users_models
+from users import permissions as users_permissions
+
+from . import balances as balances
+from . import compaction as compaction
+from . import history as history
+from . import ledger as ledger
+from . import liability as liability
+from . import muster as muster
+from . import punches as punches
+from . import registers as registers
+from . import renderers as renderers
+from . import rollforward as rollforward
 from . import serializers as serializers
+from . import simulator as simulator
+from . import sync as sync
+from . import wages as wages
 from . import models as models
 
 
@@ -31,26 +49,74 @@ class WeekLabourAssignmentViewSet(ModelViewSet):
             week__site=site,
         ).select_related("labour")
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            compaction.expand_week(serializer.validated_data["week"])
+            instance = serializer.save()
+            ledger.sync_week(
+                instance.week,
+                [instance.labour_id],
+                source=models.LedgerSource.ASSIGNMENT,
+            )
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            compaction.expand_week(serializer.instance.week)
+            previous_labour = serializer.instance.labour_id
+            instance = serializer.save()
+            ledger.sync_week(
+                instance.week,
+                {previous_labour, instance.labour_id},
+                source=models.LedgerSource.ASSIGNMENT,
+            )
+
     def perform_destroy(self, instance):
-        models.LabourAttendance.objects.filter(
-            labour=instance.labour,
-            daily_entry__week=instance.week,
-        ).delete()
-        instance.delete()
+        with transaction.atomic():
+            compaction.expand_week(instance.week)
+            models.LabourAttendance.objects.filter(
+                labour=instance.labour,
+                week=instance.week,
+            ).delete()
+            instance.delete()
+            ledger.sync_week(
+                instance.week,
+                [instance.labour_id],
+                source=models.LedgerSource.ASSIGNMENT,
+            )
+
+
+def is_columnar(request):
+    renderer = getattr(request, "accepted_renderer", None)
+    return renderer is not None and renderer.format == "columnar"
+
+
+class WeekCursorPagination(pagination.OptionalCursorPagination):
+    ordering = "-start_date"
 
 
 class WeekViewSet(ModelViewSet):
+    pagination_class = WeekCursorPagination
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES,
+        renderers.ColumnarJSONRenderer,
+    ]
 
     def get_queryset(self):
         site_id = self.kwargs.get("site_id")
         queryset = models.Week.objects.filter(site_id=site_id)
 
-        if self.action in ["retrieve"]:
-            queryset = queryset.prefetch_related("days__attendances")
+        if self.action in ["retrieve"] and not is_columnar(self.request):
+            queryset = queryset.prefetch_related(
+                "days__attendances", "days__archived_attendances"
+            )
+        if self.action == "list":
+            queryset = balances.week_summaries(queryset).order_by("-start_date")
 
         return queryset
 
     def get_serializer_class(self):
+        if self.action == "retrieve" and is_columnar(self.request):
+            return serializers.WeekColumnarRetrieveSerializer
         if self.action == "retrieve":
             return serializers.WeekRetrieveSerializer
         if self.action == "list":
@@ -62,10 +128,21 @@ class WeekViewSet(ModelViewSet):
         site_instance = generics.get_object_or_404(sites_models.Site, pk=site_id)
         serializer.save(site=site_instance)
 
+    def perform_destroy(self, instance):
+        # The ledger is reversed by the pre_delete signal
+        with transaction.atomic():
+            instance.delete()
+
 
 class DailyEntryRetrieveUpdateView(generics.RetrieveUpdateAPIView):
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES,
+        renderers.ColumnarJSONRenderer,
+    ]
 
     def get_serializer_class(self):
+        if self.request.method == "GET" and is_columnar(self.request):
+            return serializers.DailyEntryColumnarRetrieveSerializer
         if self.request.method == "GET":
             return serializers.DailyEntryWithLabourRetrieveSerializer
         return serializers.DailyEntryUpdateSerializer
@@ -79,143 +156,227 @@ class DailyEntryRetrieveUpdateView(generics.RetrieveUpdateAPIView):
             id=pk,
         )
 
+        if self.request.method == "GET" and is_columnar(self.request):
+            return queryset.select_related("week")
         if self.request.method == "GET":
-            return queryset.prefetch_related("attendances", "week__labours")
+            return queryset.prefetch_related(
+                "attendances", "archived_attendances", "week__labours"
+            )
         return queryset
 
 
+class PayrollHistoryPagination(pagination.KeysetPagination):
+    ordering = ("-week_start", "-week")
+
+
+class LabourPayrollHistoryView(generics.ListAPIView):
+    serializer_class = serializers.PayrollHistorySerializer
+    pagination_class = PayrollHistoryPagination
+
+    def list(self, request, *args, **kwargs):
+        labour = generics.get_object_or_404(
+            labours_models.Labour, pk=self.kwargs.get("labour_id")
+        )
+        page = self.paginate_queryset(history.weeks(labour))
+        serializer = self.get_serializer(
+            history.with_attendance(labour, page), many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+
 class WeekPaymentListSerializer(generics.ListAPIView):
     serializer_class = serializers.WeekLabourRetrieveSerializer
 
     def get_queryset(self):
         week_id = self.kwargs.get("week_id")
         instance = generics.get_object_or_404(models.Week, id=week_id)
+        return balances.week_balances(instance)
 
-        start_date = instance.start_date
+    def list(self, _request, *args, **kwargs):
+        queryset = self.get_queryset()
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
-        # 1. WAGE LOOKUP (For past earnings calculation)
-        wage_lookup_sql = models.WeekLabourAssignment.objects.filter(
-            week=OuterRef("daily_entry__week"),
-            labour=OuterRef("labour"),
-        ).values("weekly_daily_wage")[:1]
 
-        # 2. HISTORICAL EARNINGS (Sum of [Wage * Present] for all days BEFORE this week)
-        history_earned_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__date__lt=start_date,
-                is_present=True,
-            )
-            .annotate(
-                wage_for_day=Subquery(wage_lookup_sql, output_field=DecimalField())
-            )
-            .values("labour")
-            .annotate(total=Sum("wage_for_day"))
-            .values("total")
+class WeekRollForwardView(generics.GenericAPIView):
+    serializer_class = serializers.WeekRollForwardSerializer
+    permission_classes = [users_permissions.IsHeadOfficeOrAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        start_date = serializer.validated_data.get(
+            "start_date", rollforward.next_saturday()
+        )
+        report = rollforward.roll_forward(
+            start_date, serializer.validated_data.get("sites")
         )
 
-        # 3. HISTORICAL ADVANCES (Sum of advances taken BEFORE this week)
-        history_advance_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__date__lt=start_date,
-            )
-            .values("labour")
-            .annotate(total=Sum("advance_taken"))
-            .values("total")
-        )
-
-        # 4. HISTORICAL PAYMENTS (*** NEW ***)
-        # Sum of actual money paid out in PREVIOUS weeks
-        history_paid_subquery = (
-            models.LabourPayment.objects.filter(
-                # Link Payment -> Assignment -> Labour
-                labour__labour=OuterRef("labour"),
-                # Link Payment -> Assignment -> Week -> Start Date (Strictly Past)
-                labour__week__start_date__lt=start_date,
-            )
-            .values("labour__labour")
-            .annotate(total=Sum("amount_paid"))
-            .values("total")
+        return Response(
+            {"start_date": start_date, "sites": report},
+            status=status.HTTP_201_CREATED,
         )
 
-        current_advance_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__week=instance,
-            )
-            .values("labour")
-            .annotate(total=Sum("advance_taken"))
-            .values("total")
+
+class MusterRollView(generics.GenericAPIView):
+    serializer_class = serializers.MusterRollQuerySerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        site = generics.get_object_or_404(
+            sites_models.Site, pk=self.kwargs.get("site_id")
         )
 
-        current_present_count_subquery = (
-            models.LabourAttendance.objects.filter(
-                labour=OuterRef("labour"),
-                daily_entry__week=instance,
-                is_present=True,
+        return Response(
+            muster.muster_roll(
+                site.id,
+                serializer.validated_data["start_date"],
+                serializer.validated_data["end_date"],
             )
-            .values("labour")
-            .annotate(cnt=Sum(Value(1)))
-            .values("cnt")
-        )
-
-        # -------------------------------------------------------
-        # MAIN QUERY
-        # -------------------------------------------------------
-        return (
-            models.WeekLabourAssignment.objects.filter(week=instance)
-            .select_related("labour")
-            .prefetch_related("week_payment")
-            .annotate(
-                # Bring in all subqueries (Coalesce handles Null -> 0)
-                hist_earned=Coalesce(
-                    Subquery(history_earned_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
-                ),
-                hist_advance=Coalesce(
-                    Subquery(history_advance_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
-                ),
-                # *** ADDED HIST_PAID ***
-                hist_paid=Coalesce(
-                    Subquery(history_paid_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
-                ),
-                curr_advance=Coalesce(
-                    Subquery(current_advance_subquery, output_field=DecimalField()),
-                    Value(0, output_field=DecimalField()),
+        )
+
+
+class PayrollExportView(generics.GenericAPIView):
+    serializer_class = serializers.PayrollExportQuerySerializer
+
+    CONTENT_TYPES = {
+        "csv": "text/csv",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        site = generics.get_object_or_404(
+            sites_models.Site, pk=self.kwargs.get("site_id")
+        )
+        weeks = models.Week.objects.filter(site=site)
+
+        # One week, a date range or the whole site
+        if self.kwargs.get("week_id"):
+            weeks = weeks.filter(id=self.kwargs.get("week_id"))
+        if params.get("start_date"):
+            weeks = weeks.filter(start_date__gte=params["start_date"])
+        if params.get("end_date"):
+            weeks = weeks.filter(start_date__lte=params["end_date"])
+
+        rows = registers.register_rows(weeks)
+        file_format = params["file_format"]
+        if file_format == "xlsx":
+            content = registers.stream_xlsx(rows)
+        else:
+            content = registers.stream_csv(rows)
+
+        response = StreamingHttpResponse(
+            content, content_type=self.CONTENT_TYPES[file_format]
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, f"payroll-{site.name}.{file_format}"
+        )
+        return response
+
+
+class PayrollLiabilityView(generics.GenericAPIView):
+    permission_classes = [users_permissions.IsHeadOfficeOrAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return Response(liability.payroll_liability())
+
+
+class WageSimulationView(generics.GenericAPIView):
+    serializer_class = serializers.WageSimulationSerializer
+    permission_classes = [users_permissions.IsHeadOfficeOrAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        site = generics.get_object_or_404(
+            sites_models.Site, pk=self.kwargs.get("site_id")
+        )
+
+        return Response(
+            simulator.wage_simulation(site.id, serializer.validated_data["scenarios"])
+        )
+
+
+class PunchImportView(generics.GenericAPIView):
+    serializer_class = serializers.PunchImportSerializer
+    permission_classes = [users_permissions.IsHeadOfficeOrAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        site = generics.get_object_or_404(
+            sites_models.Site, pk=self.kwargs.get("site_id")
+        )
+
+        # Read as text line by line, never loaded whole
+        lines = io.TextIOWrapper(data["file"].file, encoding="utf-8-sig", newline="")
+        try:
+            report = punches.import_punches(
+                site.id,
+                lines,
+                punches.PunchRules(
+                    data["full_day_hours"],
+                    data["half_day_hours"],
+                    data["overtime_hours"],
                 ),
-                curr_earned=Coalesce(
-                    Subquery(
-                        current_present_count_subquery, output_field=DecimalField()
-                    ),
-                    Value(0, output_field=DecimalField()),
-                )
-                * F("weekly_daily_wage"),
+                dry_run=data["dry_run"],
             )
-            .annotate(
-                # Opening Balance = (Old Balance + History Earned) - (History Advances + History Payments)
-                opening_balance=(
-                    F("labour__previous_balance")
-                    + F("hist_earned")
-                    - (F("hist_advance") + F("hist_paid"))
-                ),
-                # Net for this week
-                current_week_net=F("curr_earned") - F("curr_advance"),
-                # Total Due Now = Opening Balance + Current Net
-                total_due_to_date=(
-                    (
-                        F("labour__previous_balance")
-                        + F("hist_earned")
-                        - (F("hist_advance") + F("hist_paid"))
-                    )
-                    + (F("curr_earned") - F("curr_advance"))
-                ),
+        except (punches.PunchImportError, UnicodeDecodeError) as error:
+            raise ValidationError({"file": [str(error)]})
+
+        return Response(report)
+
+
+class WageRevisionView(generics.GenericAPIView):
+    serializer_class = serializers.WageRevisionSerializer
+    permission_classes = [users_permissions.IsHeadOfficeOrAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if data["include_locked"] and request.user.role != users_models.Roles.ADMIN:
+            raise PermissionDenied("Only admins can revise wages of locked weeks.")
+
+        site = generics.get_object_or_404(
+            sites_models.Site, pk=self.kwargs.get("site_id")
+        )
+
+        return Response(
+            wages.revise_wages(
+                site.id,
+                data["daily_wage"],
+                data["effective_week"],
+                labour_ids=data.get("labours"),
+                labour_type=data.get("labour_type"),
+                include_locked=data["include_locked"],
+                dry_run=data["dry_run"],
             )
         )
 
-    def list(self, _request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+
+class AttendanceSyncView(generics.GenericAPIView):
+    serializer_class = serializers.AttendanceSyncSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            results = sync.apply_mutations(
+                request.user, serializer.validated_data["mutations"]
+            )
+        except sync.SyncConflict as error:
+            return Response({"detail": str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response({"results": results})
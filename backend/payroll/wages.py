@@ -0,0 +1,122 @@
+"""
+Revising the daily wage of many labourers over many weeks at once.
+
+The assignments and their attendance rows are updated with one statement
+each, then the ledger is synced per week, which also gives the balance
+impact: the earnings appended are exactly what the revision changed.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from labours import models as labours_models
+
+from . import attendance as attendance
+from . import compaction as compaction
+from . import ledger as ledger
+from . import models as models
+from . import snapshots as snapshots
+
+
+def revise_wages(
+    site_id,
+    daily_wage,
+    effective_week,
+    labour_ids=None,
+    labour_type=None,
+    include_locked=False,
+    dry_run=False,
+):
+    """
+    Set the daily wage of the site's labourers, given by id or by type, in
+    every week from effective_week on.
+
+    Locked weeks are left alone unless include_locked is set, compacted
+    ones are expanded first and locked ones get their snapshots frozen
+    again. With dry_run everything is rolled back and only the impact is
+    returned.
+    """
+    assignments = models.WeekLabourAssignment.objects.filter(
+        week__site=site_id,
+        week__start_date__gte=effective_week,
+    )
+    if labour_ids is not None:
+        assignments = assignments.filter(labour__in=labour_ids)
+    if labour_type is not None:
+        assignments = assignments.filter(labour__type=labour_type)
+
+    with transaction.atomic():
+        skipped = []
+        if not include_locked:
+            skipped = list(
+                assignments.filter(week__admin_unlocked=False)
+                .values_list("week__start_date", flat=True)
+                .distinct()
+            )
+            assignments = assignments.filter(week__admin_unlocked=True)
+
+        weeks = list(
+            models.Week.objects.filter(id__in=assignments.values("week")).order_by(
+                "start_date"
+            )
+        )
+        for week in weeks:
+            compaction.expand_week(week)
+
+        pairs = list(assignments.values_list("week", "labour"))
+        revised = assignments.exclude(weekly_daily_wage=daily_wage).update(
+            weekly_daily_wage=daily_wage
+        )
+
+        labours_by_week = defaultdict(set)
+        for week_id, labour_id in pairs:
+            labours_by_week[week_id].add(labour_id)
+        revised_labours = {labour_id for _week_id, labour_id in pairs}
+
+        # The rows of the revised weeks and labourers, their wages come
+        # from the assignments just updated
+        models.LabourAttendance.objects.filter(
+            week__in=labours_by_week.keys(), labour__in=revised_labours
+        ).update(daily_wage=attendance.assignment_wage())
+
+        impact = defaultdict(lambda: ledger.ZERO)
+        for week in weeks:
+            for entry in ledger.sync_week(
+                week,
+                labours_by_week[week.id],
+                source=models.LedgerSource.WAGE_REVISION,
+            ):
+                impact[entry.labour_id] += entry.earned
+
+        for week in weeks:
+            if not week.admin_unlocked:
+                snapshots.freeze_week(week)
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    names = dict(
+        labours_models.Labour.objects.filter(id__in=revised_labours).values_list(
+            "id", "name"
+        )
+    )
+    return {
+        "assignments": len(pairs),
+        "revised": revised,
+        "weeks": len(weeks),
+        "skipped_locked_weeks": sorted(skipped),
+        "total_balance_delta": sum(impact.values(), ledger.ZERO),
+        "labours": sorted(
+            (
+                {
+                    "id": labour_id,
+                    "name": names[labour_id],
+                    "balance_delta": impact[labour_id],
+                }
+                for labour_id in revised_labours
+            ),
+            key=lambda row: row["name"],
+        ),
+        "dry_run": dry_run,
+    }
@@ -0,0 +1,13 @@
+from rest_framework.permissions import BasePermission
+
+from .models import Roles
+
+
+class IsHeadOfficeOrAdmin(BasePermission):
+    message = "Only Head Office and Admin users can do this."
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role in [
+            Roles.HEAD_OFFICE,
+            Roles.ADMIN,
+        ]
@@ -5,6 +5,7 @@ from django.db.models.functions.text import Lower
 from rest_framework import viewsets
 from django.db.models import Sum
 
+from ks_constructions import grid
 from users import models as users_models
 from orders import models as orders_models
 
@@ -35,7 +36,22 @@ class VendorPaymentDeleteView(viewsets.generics.DestroyAPIView):
         return queryset
 
 
-class VendorViewSet(viewsets.ModelViewSet):
+VENDOR_GRID = grid.Grid(
+    {
+        "name": grid.GridField("name", "text"),
+        "address": grid.GridField("address", "text"),
+        "notes": grid.GridField("notes", "text"),
+        "gst_number": grid.GridField("gst_number", "text"),
+        "created_at": grid.GridField("created_at", "datetime"),
+        "amount_paid": grid.GridField("amount_paid", "number"),
+        "order_cost": grid.GridField("order_cost", "number"),
+    },
+    model=models.Vendor,
+)
+
+
+class VendorViewSet(grid.GridListMixin, viewsets.ModelViewSet):
+    grid = VENDOR_GRID
 
     def get_serializer_class(self):
         if self.action == "retrieve":